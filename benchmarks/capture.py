@@ -0,0 +1,70 @@
+import os, tempfile, time
+import cv2, numpy as np
+from pipelines.experiments.capture import DecimatedCapture
+from argparse import ArgumentParser as ArgParser
+
+# Parse arguments
+_parser = ArgParser(description="Benchmark CPU time per processed frame of decimated capture.")
+_parser.add_argument("--video", type=str, dest="VIDEO_PATH", default=None,
+    help="Video to read, a synthetic one is generated if not given")
+_parser.add_argument("--frames", type=int, dest="FRAMES", default=300)
+_parser.add_argument("--fps", type=float, dest="CAPTURE_FPS", default=2)
+_parser.add_argument("--videofps", type=float, dest="VIDEO_FPS", default=30)
+
+_args = _parser.parse_args()
+
+
+def create_video(path, frames, fps, width=1920, height=1080):
+    # Noisy gradients, so that frames do not compress to nothing
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    gradient = np.linspace(0, 255, width, dtype=np.uint8)[None, :, None].repeat(height, axis=0).repeat(3, axis=2)
+    rng = np.random.default_rng(0)
+    for i in range(frames):
+        noise = rng.integers(0, 32, size=(height // 8, width // 8, 3), dtype=np.uint8)
+        writer.write(gradient + cv2.resize(noise, (width, height)) + i % 64)
+    writer.release()
+
+
+def read_every_frame(cap, frames_per_second, video_fps):
+    # The previous capture loop, which decodes every frame and discards most
+    every_n_frames = frames_per_second / float(video_fps)
+    capture_acc = 0
+    frame_counter = 0
+    while cap.isOpened():
+        frame_counter += 1
+        ret, frame = cap.read()
+        capture_acc += every_n_frames
+        if capture_acc < 1.0:
+            continue
+        capture_acc -= 1.0
+        if not ret or frame is None:
+            break
+        yield frame_counter, frame
+
+
+def measure(video_path, create_frames):
+    cap = cv2.VideoCapture(video_path)
+    wall, cpu = time.perf_counter(), time.process_time()
+    processed = sum(1 for _ in create_frames(cap))
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    cap.release()
+    return processed, cpu / processed, wall / processed
+
+
+if __name__ == "__main__":
+    video_path = _args.VIDEO_PATH
+    if video_path is None:
+        video_path = os.path.join(tempfile.mkdtemp(), "benchmark.mp4")
+        create_video(video_path, _args.FRAMES, _args.VIDEO_FPS)
+
+    implementations = [
+        ("read every frame", lambda cap: read_every_frame(cap, _args.CAPTURE_FPS, _args.VIDEO_FPS)),
+        ("grab/retrieve", lambda cap: DecimatedCapture(cap, _args.CAPTURE_FPS, _args.VIDEO_FPS, realtime=False)),
+        ("seek", lambda cap: DecimatedCapture(cap, _args.CAPTURE_FPS, _args.VIDEO_FPS, realtime=False, seek=True)),
+    ]
+
+    print(f"{video_path} sampled at {_args.CAPTURE_FPS} of {_args.VIDEO_FPS} fps:")
+    print(f"  {'implementation':<18}{'frames':>8}{'CPU ms/frame':>15}{'wall ms/frame':>16}")
+    for name, create_frames in implementations:
+        processed, cpu, wall = measure(video_path, create_frames)
+        print(f"  {name:<18}{processed:>8}{cpu * 1000:>15.2f}{wall * 1000:>16.2f}")
@@ -0,0 +1,30 @@
+import timeit
+from edgenet.codec import AVAILABLE_CODECS
+from edgenet.message import EdgeNetMessage
+from .messages import create_result_message, create_metrics_message
+from argparse import ArgumentParser as ArgParser
+
+# Parse arguments
+_parser = ArgParser(description="Benchmark the EdgeNet wire codecs.")
+_parser.add_argument("--number", type=int, dest="NUMBER", default=10000)
+_parser.add_argument("--looped", type=int, dest="LOOPED", default=1000)
+
+_args = _parser.parse_args()
+
+
+def benchmark(label, message, number):
+    print(f"{label}:")
+    print(f"  {'codec':<10}{'bytes':>10}{'encode/s':>14}{'decode/s':>14}")
+    for name, codec in AVAILABLE_CODECS.items():
+        frame = message.encode(codec)
+        encode_time = timeit.timeit(lambda: message.encode(codec), number=number)
+        decode_time = timeit.timeit(lambda: EdgeNetMessage.create_from_frame(frame, codec), number=number)
+        print(f"  {name:<10}{len(frame):>10}{number/encode_time:>14.0f}{number/decode_time:>14.0f}")
+
+
+if __name__ == "__main__":
+    benchmark("RESULT", create_result_message(), _args.NUMBER)
+    benchmark(
+        f"METRICS ({_args.LOOPED} loops)", create_metrics_message(_args.LOOPED),
+        max(1, _args.NUMBER // _args.LOOPED)
+    )
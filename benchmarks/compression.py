@@ -0,0 +1,77 @@
+import time, zlib
+from edgenet.codec import AVAILABLE_CODECS
+from edgenet.compression import EdgeNetCompression, ThresholdPerMessageDeflate
+from websockets.frames import Frame, OP_TEXT, OP_BINARY
+from .messages import create_result_message, create_metrics_message
+from argparse import ArgumentParser as ArgParser
+
+# Parse arguments
+_parser = ArgParser(description="Benchmark permessage-deflate settings on EdgeNet traffic.")
+_parser.add_argument("--number", type=int, dest="NUMBER", default=2000)
+_parser.add_argument("--looped", type=int, dest="LOOPED", default=1000)
+_parser.add_argument("--bandwidth", type=float, dest="BANDWIDTH_KBIT", default=500,
+    help="Link speed in Kbit/s used to estimate time on the wire")
+
+_args = _parser.parse_args()
+
+# (label, settings) pairs to compare
+SETTINGS = [
+    ("off",          EdgeNetCompression(enabled=False)),
+    ("level 1",      EdgeNetCompression(level=1)),
+    ("level 6",      EdgeNetCompression(level=6)),
+    ("level 9",      EdgeNetCompression(level=9)),
+    ("window 9",     EdgeNetCompression(window_bits=9)),
+    ("window 15",    EdgeNetCompression(window_bits=15)),
+    ("threshold 1k", EdgeNetCompression(threshold=1024)),
+]
+
+
+def create_encoder(compression):
+    # Client-side extension as negotiated with the same settings on the server
+    if not compression.enabled: return None
+    return ThresholdPerMessageDeflate(
+        False, False, compression.window_bits, compression.window_bits,
+        compression.compress_settings, threshold=compression.threshold
+    )
+
+
+def benchmark(label, frames, bandwidth_kbit):
+    raw_bytes = sum(len(frame.data) for frame in frames)
+    print(f"{label}: {len(frames)} frames, {raw_bytes} bytes")
+    print(f"  {'settings':<14}{'bytes':>10}{'saved':>8}{'frames/s':>12}{'wire (s)':>10}")
+    for name, compression in SETTINGS:
+        encoder = create_encoder(compression)
+
+        if encoder is None:
+            wire_bytes, rate = raw_bytes, "-"
+        else:
+            start = time.perf_counter()
+            wire_bytes = sum(len(encoder.encode(frame).data) for frame in frames)
+            rate = f"{len(frames) / (time.perf_counter() - start):.0f}"
+
+        saved     = 1 - wire_bytes / raw_bytes
+        wire_time = wire_bytes * 8 / (bandwidth_kbit * 1000)
+        print(f"  {name:<14}{wire_bytes:>10}{saved:>8.1%}{rate:>12}{wire_time:>10.2f}")
+
+
+def create_frames(messages, codec):
+    opcode = OP_BINARY if codec.is_binary else OP_TEXT
+    frames = []
+    for message in messages:
+        data = message.encode(codec)
+        frames.append(Frame(opcode, data if codec.is_binary else data.encode()))
+    return frames
+
+
+if __name__ == "__main__":
+    result_messages  = [create_result_message(i) for i in range(_args.NUMBER)]
+    metrics_messages = [create_metrics_message(_args.LOOPED) for _ in range(max(1, _args.NUMBER // _args.LOOPED))]
+
+    print(f"zlib {zlib.ZLIB_RUNTIME_VERSION}, estimated wire time at {_args.BANDWIDTH_KBIT:g} Kbit/s\n")
+    for name, codec in AVAILABLE_CODECS.items():
+        benchmark(f"RESULT [{name}]", create_frames(result_messages, codec), _args.BANDWIDTH_KBIT)
+        benchmark(
+            f"METRICS ({_args.LOOPED} loops) [{name}]",
+            create_frames(metrics_messages, codec), _args.BANDWIDTH_KBIT
+        )
+        print()
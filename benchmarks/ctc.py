@@ -0,0 +1,79 @@
+import time
+import numpy as np
+from pipelines.experiments.ctc import ctc_decode, CTC_BEAM_WIDTH
+from pipelines.experiments.recognition import DECODE_DICT
+from argparse import ArgumentParser as ArgParser
+
+# TensorFlow is optional, the decoder is only timed without it. Without it,
+# the repository's tensorflow/ model directory imports as a namespace package.
+try:
+    import tensorflow as tf
+    tf.keras
+except (ImportError, AttributeError):
+    tf = None
+
+# Parse arguments
+_parser = ArgParser(description="Benchmark the NumPy CTC decoder against tf.keras.backend.ctc_decode.")
+_parser.add_argument("--outputs", type=str, dest="OUTPUTS_PATH", default=None,
+    help="Recorded recognition outputs, a (plates, time steps, classes) .npy file. Synthetic ones are generated if not given.")
+_parser.add_argument("--plates", type=int, dest="PLATES", default=200)
+_parser.add_argument("--steps", type=int, dest="STEPS", default=24)
+_parser.add_argument("--beamwidth", type=int, dest="BEAM_WIDTH", default=CTC_BEAM_WIDTH)
+_parser.add_argument("--record", type=str, dest="RECORD_PATH", default=None,
+    help="Saves the outputs and the plates that TensorFlow decodes them to into a .npz file, e.g. tests/fixtures/ctc_decode.npz")
+
+_args = _parser.parse_args()
+
+
+def create_outputs(plates, steps, classes=36):
+    # Softmax outputs peaked on a few classes per step, like those of a trained model
+    rng = np.random.default_rng(0)
+    return rng.dirichlet(np.full(classes, 0.1), size=(plates, steps)).astype(np.float32)
+
+
+def decode_numpy(outputs, greedy):
+    return ctc_decode(outputs, outputs.shape[1], greedy=greedy, beam_width=_args.BEAM_WIDTH)
+
+
+def decode_tensorflow(outputs, greedy):
+    # One call per plate, as the pipelines used to
+    decoded_plates = []
+    for output_data in outputs:
+        decoded = tf.keras.backend.ctc_decode(
+            output_data[None], (outputs.shape[1],), greedy=greedy, beam_width=_args.BEAM_WIDTH
+        )
+        decoded_plates.append([int(i) for i in np.array(decoded[0][0][0]) if i > -1])
+    return decoded_plates
+
+
+def measure(decode, outputs, greedy):
+    elapsed = time.perf_counter()
+    decoded_plates = decode(outputs, greedy)
+    return decoded_plates, (time.perf_counter() - elapsed) / len(outputs)
+
+
+if __name__ == "__main__":
+    if _args.OUTPUTS_PATH is None:
+        outputs = create_outputs(_args.PLATES, _args.STEPS)
+    else:
+        outputs = np.load(_args.OUTPUTS_PATH).astype(np.float32)
+
+    print(f"{len(outputs)} plates of {outputs.shape[1]} steps and {outputs.shape[2]} classes, beam width {_args.BEAM_WIDTH}:")
+    print(f"  {'decoder':<12}{'NumPy ms/plate':>16}{'TF ms/plate':>13}{'identical':>11}")
+    for name, greedy in [("greedy", True), ("beam search", False)]:
+        decoded_plates, elapsed = measure(decode_numpy, outputs, greedy)
+        if tf is None:
+            print(f"  {name:<12}{elapsed * 1000:>16.3f}{'-':>13}{'-':>11}")
+            continue
+
+        expected, tf_elapsed = measure(decode_tensorflow, outputs, greedy)
+        identical = sum(plate == expected_plate for plate, expected_plate in zip(decoded_plates, expected))
+        print(f"  {name:<12}{elapsed * 1000:>16.3f}{tf_elapsed * 1000:>13.3f}{identical:>6}/{len(outputs)}")
+
+    if _args.RECORD_PATH is not None:
+        if tf is None: raise SystemExit("Recording decoded plates needs TensorFlow.")
+        np.savez_compressed(_args.RECORD_PATH, outputs=outputs, **{
+            key: np.array(["".join(DECODE_DICT[i] for i in plate) for plate in decode_tensorflow(outputs, greedy)])
+            for key, greedy in [("greedy", True), ("beam_search", False)]
+        })
+        print(f"Recorded to {_args.RECORD_PATH}")
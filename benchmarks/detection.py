@@ -0,0 +1,66 @@
+import time, tracemalloc
+import cv2, numpy as np
+from pipelines.experiments.detection import FrameNormalizer
+from argparse import ArgumentParser as ArgParser
+
+# Parse arguments
+_parser = ArgParser(description="Benchmark time and heap allocations per frame of detection input preparation.")
+_parser.add_argument("--frames", type=int, dest="FRAMES", default=200)
+_parser.add_argument("--size", type=int, dest="SIZE", default=320,
+    help="Width and height of the detection input")
+
+_args = _parser.parse_args()
+
+
+def prepare_legacy(frame, size):
+    # The previous preparation, handed to interpreter.set_tensor
+    resized = cv2.resize(frame, (size, size), interpolation=cv2.INTER_AREA)
+    input_data = resized.astype(np.float32)
+    input_data /= 255.
+    return np.expand_dims(input_data, axis=0)
+
+
+def measure(prepare, frames):
+    # Seconds and peak traced bytes per frame, after a warm-up frame
+    prepare(frames[0])
+
+    elapsed = time.perf_counter()
+    for frame in frames: prepare(frame)
+    elapsed = time.perf_counter() - elapsed
+
+    tracemalloc.start()
+    peaks = []
+    for frame in frames:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        prepare(frame)
+        peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    tracemalloc.stop()
+
+    return elapsed / len(frames), max(peaks)
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 256, size=(1080, 1920, 3), dtype=np.uint8) for _ in range(4)]
+    frames = [frames[i % len(frames)] for i in range(_args.FRAMES)]
+
+    # Stands in for the view of the interpreter's input tensor
+    input_tensor = np.empty((1, _args.SIZE, _args.SIZE, 3), dtype=np.float32)
+    normalize = FrameNormalizer(_args.SIZE, _args.SIZE)
+
+    implementations = [
+        ("legacy", lambda frame: prepare_legacy(frame, _args.SIZE)),
+        ("preallocated", lambda frame: normalize(frame, input_tensor[0])),
+    ]
+
+    # Both produce the same input
+    normalize(frames[0], input_tensor[0])
+    assert np.array_equal(prepare_legacy(frames[0], _args.SIZE), input_tensor)
+
+    print(f"1080p frames to {_args.SIZE}x{_args.SIZE} float32 inputs:")
+    print(f"  {'implementation':<16}{'ms/frame':>10}{'peak KiB/frame':>16}")
+    for name, prepare in implementations:
+        elapsed, peak = measure(prepare, frames)
+        print(f"  {name:<16}{elapsed * 1000:>10.3f}{peak / 1024:>16.1f}")
+    print(f"  uint8 buffer reallocations: {normalize.allocations}")
@@ -0,0 +1,93 @@
+import os, time, resource, tempfile, datetime, multiprocessing
+import numpy as np
+import gpxpy
+from gpx.parser import read_track
+from gpx.wrappers import GPXCollection, GPXEntry
+from argparse import ArgumentParser as ArgParser
+
+# Parse arguments
+_parser = ArgParser(description="Benchmark GPX parsing time and memory.")
+_parser.add_argument("--points", type=int, dest="POINTS", default=100000)
+_parser.add_argument("--lookups", type=int, dest="LOOKUPS", default=10000)
+
+_args = _parser.parse_args()
+
+
+def write_gpx(file, number_of_points):
+    # A 1 Hz track in the same format as experiment-files/
+    start_time = datetime.datetime(2020, 9, 24, 4, 9, 25)
+    file.write('<?xml version="1.0" encoding="utf-8"?>\n')
+    file.write('<gpx version="1.0" xmlns="http://www.topografix.com/GPX/1/0">\n<trk>\n<trkseg>\n')
+    for i in range(number_of_points):
+        dttm = (start_time + datetime.timedelta(seconds=i)).isoformat()
+        file.write(
+            f'<trkpt lat="{14.6490481666667 + i * 1e-5}" lon="{121.068924666667 - i * 1e-5}">\n'
+            f'  <ele>{63.9 + i % 10}</ele>\n  <time>{dttm}Z</time>\n  <speed>{i % 20}</speed>\n</trkpt>\n'
+        )
+    file.write('</trkseg>\n</trk>\n</gpx>\n')
+
+
+def parse_gpxpy(gpx_file_path):
+    # The previous parser, with a GPXEntry per point
+    with open(gpx_file_path, 'r') as gpx_file:
+        gpx_file_obj = gpxpy.parse(gpx_file)
+    return [
+        GPXEntry(point.time.replace(tzinfo=None), point.latitude, point.longitude, ele=point.elevation, speed=point.speed)
+        for segment in gpx_file_obj.tracks[0].segments
+        for point in segment.points
+    ]
+
+
+def parse_streaming(gpx_file_path):
+    return read_track(gpx_file_path)
+
+
+def measure(parse, gpx_file_path, queue):
+    # Runs in a fresh process so that peak RSS is not shared between parsers
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    parsed = parse(gpx_file_path)
+    elapsed = time.perf_counter() - start
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    queue.put((elapsed, (rss_after - rss_before) / 1024, len(parsed)))
+
+
+def benchmark_lookups(gpx_file_path, number_of_lookups):
+    track = read_track(gpx_file_path)
+    gpx_collection = GPXCollection(gpx_file_path, track.times[0].item(), track=track)
+
+    start_time = gpx_collection.start_time
+    seconds    = np.random.default_rng(0).uniform(0, len(track) - 1, number_of_lookups)
+    dttms      = [start_time + datetime.timedelta(seconds=s) for s in seconds]
+
+    start = time.perf_counter()
+    for dttm in dttms: gpx_collection.get_latest_entry(dttm)
+    one_by_one = time.perf_counter() - start
+
+    start = time.perf_counter()
+    gpx_collection.get_latest_latlngs(dttms)
+    bulk = time.perf_counter() - start
+
+    print(f"{number_of_lookups} lookups: {number_of_lookups/one_by_one:.0f}/s one by one, {number_of_lookups/bulk:.0f}/s in bulk")
+
+
+if __name__ == "__main__":
+    context = multiprocessing.get_context("fork")
+
+    with tempfile.NamedTemporaryFile("w", suffix=".gpx", delete=False) as file:
+        write_gpx(file, _args.POINTS)
+    try:
+        print(f"{_args.POINTS} points, {os.path.getsize(file.name) / 2**20:.1f} MiB")
+        print(f"  {'parser':<12}{'seconds':>10}{'peak RSS (MiB)':>16}")
+        for name, parse in [("gpxpy", parse_gpxpy), ("streaming", parse_streaming)]:
+            queue = context.Queue()
+            process = context.Process(target=measure, args=(parse, file.name, queue))
+            process.start()
+            elapsed, rss, _ = queue.get()
+            process.join()
+            print(f"  {name:<12}{elapsed:>10.2f}{rss:>16.1f}")
+
+        benchmark_lookups(file.name, _args.LOOKUPS)
+    finally:
+        os.remove(file.name)
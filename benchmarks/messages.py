@@ -0,0 +1,32 @@
+from datetime import datetime
+from edgenet.message import EdgeNetMessage
+from metrics.time import Timer
+
+
+def create_result_message(index=0):
+    # Same shape as the edge-only pipeline's RESULT messages, varied by index
+    time_now = datetime.now()
+    return EdgeNetMessage.create_result_message(
+        "local", "edge-heavy_2_1_None_local_I0", {
+            "time_recognized": time_now.isoformat(),
+            "time_captured": time_now.isoformat(),
+            "plate": f"ABC{1234 + index * 7 % 8766}",
+            "confidence": 50 + index * 13 % 50,
+            "lat": 14.6490481666667 + index * 1e-5,
+            "lng": 121.068924666667 - index * 1e-5,
+        }
+    )
+
+
+def create_metrics_message(looped_count):
+    # A Timer with a few looped sections of looped_count entries each
+    timer = Timer("capture_video")
+    timer.start_section("edge-initialization")
+    timer.end_section("edge-initialization")
+    for _ in range(looped_count):
+        for section_id in ["edge-frame-capture", "edge-plate-detection", "edge-plate-recognition"]:
+            timer.start_looped_section(section_id)
+            timer.end_looped_section(section_id)
+    timer.end_function()
+
+    return EdgeNetMessage.create_metrics_message("local", "edge-heavy_2_1_None_local_I0", timer)
@@ -0,0 +1,65 @@
+import time
+import cv2, numpy as np, tensorflow as tf
+from pipelines.experiments.edge_only.constants import RECOG_MODEL_PATH
+from pipelines.experiments.recognition import PlateRecognizer, SEQUENCE_LENGTH, DECODE_DICT
+from argparse import ArgumentParser as ArgParser
+
+# Parse arguments
+_parser = ArgParser(description="Benchmark plate recognition throughput, one crop at a time vs. batched per frame.")
+_parser.add_argument("--model", type=str, dest="MODEL_PATH", default=RECOG_MODEL_PATH)
+_parser.add_argument("--plates", type=int, nargs="+", dest="PLATES", default=[1, 4, 16],
+    help="Plates per frame")
+_parser.add_argument("--frames", type=int, dest="FRAMES", default=50)
+
+_args = _parser.parse_args()
+
+
+def load_interpreter(model_path):
+    interpreter = tf.lite.Interpreter(model_path=model_path)
+    interpreter.allocate_tensors()
+    return interpreter
+
+
+def recognize_each(interpreter, crops):
+    # The previous recognition, a batch of one and a decode per crop
+    input_index  = interpreter.get_input_details()[0]["index"]
+    output_index = interpreter.get_output_details()[0]["index"]
+
+    texts = []
+    for crop in crops:
+        test_image = np.expand_dims(cv2.resize(crop, (94, 24)) / 256, axis=0).astype(np.float32)
+        interpreter.set_tensor(input_index, test_image)
+        interpreter.invoke()
+        output_data = interpreter.get_tensor(output_index)
+        decoded = tf.keras.backend.ctc_decode(output_data, (SEQUENCE_LENGTH,), greedy=False)
+        texts.append("".join(DECODE_DICT[i] for i in np.array(decoded[0][0][0]) if i > -1))
+    return texts
+
+
+def measure(recognize, frames):
+    # Plates per second, after a warm-up frame
+    recognize(frames[0])
+    elapsed = time.perf_counter()
+    for crops in frames: recognize(crops)
+    elapsed = time.perf_counter() - elapsed
+    return sum(len(crops) for crops in frames) / elapsed
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    single     = load_interpreter(_args.MODEL_PATH)
+    recognizer = PlateRecognizer(load_interpreter(_args.MODEL_PATH))
+
+    print(f"{_args.MODEL_PATH}, {_args.FRAMES} frames:")
+    print(f"  {'plates/frame':<14}{'each plates/s':>15}{'batched plates/s':>18}{'speedup':>9}")
+    for plates in _args.PLATES:
+        # Crops of about the size that detection boxes cut out of 1080p frames
+        frames = [
+            [rng.integers(0, 256, size=(60, 200, 3), dtype=np.uint8) for _ in range(plates)]
+            for _ in range(_args.FRAMES)
+        ]
+        assert recognize_each(single, frames[0]) == recognizer.recognize(frames[0])
+
+        each    = measure(lambda crops: recognize_each(single, crops), frames)
+        batched = measure(recognizer.recognize, frames)
+        print(f"  {plates:<14}{each:>15.1f}{batched:>18.1f}{batched / each:>8.2f}x")
@@ -0,0 +1,117 @@
+import json, time, tracemalloc
+from dateutil.parser import parse as dttm_parse
+from metrics.time import Timer, TimerSection
+from argparse import ArgumentParser as ArgParser
+
+# Parse arguments
+_parser = ArgParser(description="Benchmark the overhead of Timer looped sections.")
+_parser.add_argument("--number", type=int, dest="NUMBER", default=1000000)
+
+_args = _parser.parse_args()
+
+
+def time_legacy(number):
+    # The previous looped sections, a TimerSection object per iteration
+    looped_sections = {}
+    for _ in range(number):
+        if "section" in looped_sections:
+            looped_sections["section"].append(TimerSection())
+        else:
+            looped_sections["section"] = [TimerSection()]
+        looped_sections["section"][-1].end_section()
+    return looped_sections
+
+
+def time_looped(number):
+    timer = Timer("benchmark")
+    for _ in range(number):
+        timer.start_looped_section("section")
+        timer.end_looped_section("section")
+    return timer
+
+
+def time_context(number):
+    timer = Timer("benchmark")
+    for _ in range(number):
+        with timer.looped_section("section"):
+            pass
+    return timer
+
+
+def time_aggregated(number):
+    timer = Timer("benchmark", aggregate=True)
+    for _ in range(number):
+        timer.start_looped_section("section")
+        timer.end_looped_section("section")
+    return timer
+
+
+def decode_legacy(raw_dict):
+    # The previous Timer.create_from_dict, with an object per looped section
+    def create_section(section_dict):
+        section = TimerSection()
+        section.start, section.end = section_dict["start"], section_dict["end"]
+        return section
+
+    return (
+        create_section(raw_dict["function_time"]),
+        { name: create_section(d) for name, d in raw_dict["sections"].items() },
+        { name: [create_section(d) for d in l] for name, l in raw_dict["looped_sections"].items() },
+        dttm_parse(raw_dict["function_started"]), dttm_parse(raw_dict["function_ended"]),
+    )
+
+
+def measure_decode(decode, raw_dict):
+    start = time.perf_counter()
+    decode(raw_dict)
+    return time.perf_counter() - start
+
+
+def time_empty(number):
+    for _ in range(number):
+        pass
+
+
+def measure(func, number):
+    start = time.perf_counter_ns()
+    func(number)
+    elapsed = time.perf_counter_ns() - start
+
+    tracemalloc.start()
+    kept = func(number)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return elapsed / number, peak / number
+
+
+if __name__ == "__main__":
+    loop_overhead, _ = measure(time_empty, _args.NUMBER)
+
+    print(f"{_args.NUMBER} looped sections (start + end), loop overhead of {loop_overhead:.0f} ns excluded:")
+    print(f"  {'implementation':<18}{'ns/section':>12}{'bytes/section':>16}")
+    for name, func in [("legacy objects", time_legacy), ("arrays", time_looped), ("arrays (with)", time_context),
+        ("aggregated", time_aggregated)]:
+        per_section, memory = measure(func, _args.NUMBER)
+        print(f"  {name:<18}{per_section - loop_overhead:>12.0f}{memory:>16.1f}")
+
+    # METRICS payload of the looped section, as sent by Timer.to_dict
+    print(f"Serialized looped section after {_args.NUMBER} iterations:")
+    for name, func in [("arrays", time_looped), ("aggregated", time_aggregated)]:
+        timer = func(_args.NUMBER)
+        timer.end_function()
+        size = len(json.dumps(timer.to_dict()["looped_sections"]))
+        print(f"  {name:<18}{size:>12} bytes")
+
+    # Decoding of METRICS on the server, in the legacy (list of sections) format
+    timer = time_looped(_args.NUMBER)
+    timer.end_function()
+    raw_dict = json.loads(json.dumps(timer.to_dict()))
+    legacy_dict = dict(raw_dict, looped_sections={
+        name: [{"start": s.start, "end": s.end} for s in section_list]
+        for name, section_list in timer.looped_sections.items()
+    })
+    print(f"Timer.create_from_dict with {_args.NUMBER} looped sections:")
+    print(f"  {'legacy objects':<18}{measure_decode(decode_legacy, legacy_dict) * 1000:>12.1f} ms")
+    print(f"  {'arrays (legacy)':<18}{measure_decode(Timer.create_from_dict, legacy_dict) * 1000:>12.1f} ms")
+    print(f"  {'arrays':<18}{measure_decode(Timer.create_from_dict, raw_dict) * 1000:>12.1f} ms")
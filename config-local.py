@@ -17,6 +17,14 @@ SYSTEM_ARCH = "amd64" # For most Linux servers
 #    run even though a termination messsage is received.
 # -- Note: this is overriden by test.py in order to do tests gracefully
 TERMINATE_CLIENTS_ON_RECEIVE = True
+# -- permessage-deflate compression of websocket frames, must be set the same
+#    on both the edge and the cloud. Frames smaller than the threshold are
+#    sent uncompressed. See `python3 -m benchmarks.compression` for trade-offs.
+COMPRESSION_ENABLED            = True
+COMPRESSION_LEVEL              = 6
+COMPRESSION_WINDOW_BITS        = 12
+COMPRESSION_MEMORY_LEVEL       = 5
+COMPRESSION_THRESHOLD_IN_BYTES = 64
 
 # Experiment configuration
 # -- Video and GPX information
@@ -0,0 +1,64 @@
+import base64
+import numpy as np
+from .constants import *
+
+
+class EdgeNetAttachment:
+    """
+    A wrapper for an ndarray buffer sent alongside an EdgeNet message.
+    """
+    def __init__(self, data, dtype, shape, encoding=ATTACHMENT_RAW):
+        self.data     = data
+        self.dtype    = dtype
+        self.shape    = tuple(shape)
+        self.encoding = encoding
+
+    def __repr__(self):
+        return f"<EdgeNetAttachment {self.encoding} {self.dtype}{list(self.shape)}: {len(self.data)} bytes>"
+
+    @classmethod
+    def create_from_ndarray(cls, array, encoding=ATTACHMENT_RAW):
+        if encoding == ATTACHMENT_RAW:
+            data = np.ascontiguousarray(array).tobytes()
+        elif encoding in (ATTACHMENT_JPEG, ATTACHMENT_PNG):
+            import cv2 # Only needed for compressed crops
+
+            if array.dtype != np.uint8:
+                raise EdgeNetAttachmentException(f"Only uint8 arrays can be sent as {encoding}, got {array.dtype}.")
+            success, encoded = cv2.imencode(f".{encoding}", array)
+            if not success:
+                raise EdgeNetAttachmentException(f"Failed to encode array as {encoding}.")
+            data = encoded.tobytes()
+        else:
+            raise EdgeNetAttachmentException(f"Unknown attachment encoding [{encoding}].")
+
+        return cls(data, array.dtype.str, array.shape, encoding=encoding)
+
+    def to_ndarray(self):
+        # Raw buffers are wrapped without copying, and are thus read-only
+        if self.encoding == ATTACHMENT_RAW:
+            return np.frombuffer(self.data, dtype=self.dtype).reshape(self.shape)
+
+        import cv2 # Only needed for compressed crops
+
+        buffer = np.frombuffer(self.data, dtype=np.uint8)
+        return cv2.imdecode(buffer, cv2.IMREAD_UNCHANGED).reshape(self.shape)
+
+    def to_dict(self, binary=False):
+        # Binary codecs carry the bytes as-is, JSON needs them in base64
+        return {
+            "data": self.data if binary else base64.b64encode(self.data).decode(),
+            "dtype": self.dtype,
+            "shape": list(self.shape),
+            "encoding": self.encoding,
+        }
+
+    @classmethod
+    def create_from_dict(cls, raw_dict):
+        data = raw_dict["data"]
+        if isinstance(data, str):
+            data = base64.b64decode(data)
+        return cls(data, raw_dict["dtype"], raw_dict["shape"], encoding=raw_dict["encoding"])
+
+
+class EdgeNetAttachmentException(Exception): pass
@@ -1,14 +1,23 @@
-import uuid, asyncio, json, threading, os
+import uuid, asyncio, threading, functools, os, traceback
 import websockets
+from concurrent.futures import Future, wait as wait_for_futures
 
 from edgenet.constants import *
 from .message import EdgeNetMessage
+from .codec import AVAILABLE_CODECS, JSONCodec, get_codec
+from .compression import EdgeNetCompression, get_compression_stats
+from .executor import EdgeNetExecutor, call_in_process
+from .clock import wall_clock
 from config import *
 
 class EdgeNetClient:
     def __init__(
         self, server_url, session_id=None, 
-        terminate_on_receive=TERMINATE_CLIENTS_ON_RECEIVE
+        terminate_on_receive=TERMINATE_CLIENTS_ON_RECEIVE,
+        sender_queue_size=SENDER_QUEUE_SIZE, codecs=WIRE_CODECS,
+        max_workers=MAX_COMMAND_WORKERS, max_processes=MAX_COMMAND_PROCESSES,
+        batch_results=False, result_batch_size=RESULT_BATCH_SIZE,
+        result_flush_interval=RESULT_FLUSH_INTERVAL_IN_SECONDS, compression=None
     ):
         self.server_url           = server_url
         self.terminate_on_receive = terminate_on_receive
@@ -22,20 +31,55 @@ class EdgeNetClient:
         # Connection is initially null
         self.connection = None
 
-        # Collection of open threads to be cleaned up
-        self.job_threads = {}
+        # Codecs offered during handshake, JSON is used until the server picks one
+        self.codecs = [c for c in codecs if c in AVAILABLE_CODECS]
+        self.codec  = JSONCodec
+
+        # permessage-deflate settings, taken from config if not given
+        self.compression = EdgeNetCompression() if compression is None else compression
+
+        # Outbound send pipeline, drained by the client's own loop (see run)
+        self.loop           = None
+        self.outbound       = None
+        self.outbound_task  = None
+        self.outbound_slots = threading.BoundedSemaphore(sender_queue_size)
+
+        # Opt-in coalescing of each job's results into RESULT_BATCH messages,
+        # flushed once full or once the oldest result waited long enough
+        self.batch_results         = batch_results
+        self.result_batch_size     = result_batch_size
+        self.result_flush_interval = result_flush_interval
+
+        # Collection of queued sends per job to be waited on before finishing
+        self.job_sends = {}
+
+        # Bounded pool for executing received commands
+        self.executor = EdgeNetExecutor(max_workers=max_workers, max_processes=max_processes)
         
         logging.info(f"EdgeNetClient for host {server_url} instantiated with session ID {self.session_id[-12:]}")
 
     def run(self, run_forever=True):
         loop = asyncio.get_event_loop()
+        self.loop     = loop
+        self.outbound = asyncio.Queue()
+
         loop.run_until_complete(self.perform_handshake())
+        self.outbound_task = loop.create_task(self.drain_outbound())
         loop.create_task(self.handle_commands())
         
         if run_forever: loop.run_forever()
 
+    @property
+    def compression_stats(self):
+        # Bytes saved by permessage-deflate on frames sent to the server
+        if self.connection is None: return None
+        return get_compression_stats(self.connection)
+
     async def _close(self):
+        # Flush everything still queued before closing the connection
+        await self.outbound.join()
         await self.connection.close()
+        self.outbound_task.cancel()
 
     def close(self, close_forever=False):
         loop = asyncio.get_event_loop()
@@ -50,7 +94,9 @@ class EdgeNetClient:
         backoff_time = INITIAL_BACKOFF_TIME_IN_SECONDS
         while True:
             try:
-                self.connection = await websockets.connect(self.server_url)
+                self.connection = await websockets.connect(
+                    self.server_url, **self.compression.client_kwargs()
+                )
                 break
             except ConnectionRefusedError:
                 pass
@@ -61,7 +107,9 @@ class EdgeNetClient:
             await asyncio.sleep(backoff_time)
             backoff_time = min( 2*backoff_time, MAX_BACKOFF_TIME_IN_SECONDS )
 
-        handshake_message = EdgeNetMessage.create_client_handshake_message(self.session_id)
+        handshake_message = EdgeNetMessage.create_client_handshake_message(
+            self.session_id, codecs=self.codecs
+        )
         
         await self.send(handshake_message)
         logging.info(f"Connection to server established.")
@@ -74,165 +122,235 @@ class EdgeNetClient:
                 break
             except websockets.ConnectionClosedError:
                 break
+            received = wall_clock()
 
             logging.debug("Message received from server!")
-            message = EdgeNetMessage.create_from_json(msg)
+            message = EdgeNetMessage.create_from_frame(msg, self.codec)
+
+            # Server's reply to our handshake, with the codec it picked
+            if message.msg_type == MSG_CONNECTION:
+                self.codec = get_codec(message.codec)
+                logging.debug(f"Server selected the [{self.codec.name}] wire codec.")
+                continue
+
+            # Replied to right away, bypassing the outbound queue and its delays
+            if message.msg_type == MSG_CLOCK:
+                await self.send(EdgeNetMessage.create_clock_reply_message(
+                    self.session_id, message.t0, received
+                ))
+                continue
 
             if message.msg_type == MSG_TERMINATE:
                 await self._close()
                 if self.terminate_on_receive:
                     os.kill(os.getpid(), 9)
 
-            t = threading.Thread(target=self.parse_message, args=(message,))
-            t.start()
-            # asyncio.create_task(self._parse_message(msg))
-            
+            if message.msg_type in (MSG_COMMAND, MSG_COMMAND_POLL):
+                self.loop.create_task(self.run_command(message))
+
+    async def run_command(self, message):
+        func = self.get_function(message.function_name)
+        error = None # Traceback of a failed call, sent with the FINISH message
 
-    async def _parse_message(self, message):
         # If message is a command from the server:
         if message.msg_type == MSG_COMMAND:
             logging.debug(f"Message is of COMMAND type, running function with name [{message.function_name}] with job ID:[{message.job_id[-12:]}]")
 
-            func = self.get_function(message.function_name)
-            result = func(*message.args, **message.kwargs)
-            
-            logging.debug(f"Function call for job ID:[{message.job_id[-12:]}] completed, sending the result...")
-            
-            # Create result message
-            result_message = EdgeNetMessage.create_result_message(
-                self.session_id, message.job_id, result
-            )
-            await self.send(result_message)
-            
-            logging.debug(f"Result message sent! Now sending FINISH message for job ID:{message.job_id[-12:]}...")
-            
-            await self.send_job_finished(message.job_id)
+            try:
+                result = await self.executor.run(
+                    message.function_name, func, *message.args, **message.kwargs
+                )
+            except Exception:
+                logging.exception(f"Function call for job ID:[{message.job_id[-12:]}] failed.")
+                error = traceback.format_exc()
+            else:
+                logging.debug(f"Function call for job ID:[{message.job_id[-12:]}] completed, sending the result...")
+
+                # Create result message
+                result_message = EdgeNetMessage.create_result_message(
+                    self.session_id, message.job_id, result
+                )
+                await self.send_queued(result_message)
+
+                logging.debug(f"Result message sent! Now sending FINISH message for job ID:{message.job_id[-12:]}...")
 
-            logging.debug(f"FINISH message sent for job ID:[{message.job_id[-12:]}]!")
-        
         # If message is a polling command
         if message.msg_type == MSG_COMMAND_POLL:
-            func = self.get_function(message.function_name)
-            result = func(message, *message.args, **message.kwargs)
-            await self.send_job_finished(message.job_id)
-
-    def parse_message(self, msg):
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        loop.run_until_complete(self._parse_message(msg))
-
-    async def call_function_in_other_thread(self, func, msg, *args, **kwargs):
-        def func_call(func, result_list, *args, **kwargs):
-            result_list.append(func(*args, **kwargs))
-
-        result_list = []
-        full_args = [func, result_list] + list(args)
-        function_thread = threading.Thread(
-            target=func_call, args=full_args, kwargs=kwargs, daemon=True
-        )
+            # The uses_sender wrapper always runs in a thread, and forks a
+            # worker process itself when the function is in process mode
+            call = functools.partial(func, message, *message.args, **message.kwargs)
 
-        function_thread.start()
-        function_thread.join()
+            try:
+                await self.executor.submit(message.function_name, call, EXECUTION_THREAD)
+            except Exception:
+                logging.exception(f"Polling function call for job ID:[{message.job_id[-12:]}] failed.")
+                error = traceback.format_exc()
+
+        # Also sent for failed calls, so that the server fails their job instead of waiting on it
+        await self.send_queued(EdgeNetMessage.create_job_finished_message(
+            self.session_id, message.job_id, executor_stats=self.executor.stats, error=error
+        ))
 
-        return result_list[0]
+        logging.debug(f"FINISH message sent for job ID:[{message.job_id[-12:]}]!")
 
-    async def call_polling_function_in_other_thread(self, func, msg, *args, **kwargs):
-        def func_call(func, msg, result_list, *args, **kwargs):
-            result_list.append(func(msg, *args, **kwargs))
+    async def send(self, message: EdgeNetMessage):
+        await self.connection.send(message.encode(self.codec))
+
+    def send_threadsafe(self, message: EdgeNetMessage):
+        """
+        Queues a message into the outbound pipeline from a thread other than
+        the client's loop. Blocks while the queue is full, and returns a
+        concurrent.futures.Future that resolves once the message is sent.
+        Coroutines on the client's loop use send_queued instead.
+        """
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        if running_loop is not None and running_loop is self.loop:
+            # Blocking for a slot here would stop the loop that frees them
+            raise EdgeNetClientException("send_threadsafe cannot be called from the client's loop, use send_queued.")
+
+        sent = Future()
+        self.outbound_slots.acquire()
+        self.loop.call_soon_threadsafe(self.outbound.put_nowait, (message, sent))
+        return sent
+
+    async def send_queued(self, message: EdgeNetMessage):
+        # Counterpart of send_threadsafe for coroutines on the client's loop
+        if not self.outbound_slots.acquire(blocking=False):
+            await self.loop.run_in_executor(None, self.outbound_slots.acquire)
+
+        sent = Future()
+        self.outbound.put_nowait((message, sent))
+        await asyncio.wrap_future(sent)
+
+    async def drain_outbound(self):
+        # Single consumer, so messages go out in the order they were queued
+        batches = {} # Job ID -> pending [(message, sent), ...]
 
-        result_list = []
-        full_args = [func, msg, result_list] + list(args)
-        function_thread = threading.Thread(
-            target=func_call, args=full_args, kwargs=kwargs, daemon=True
+        while True:
+            message, sent = await self.outbound.get()
+            try:
+                # A flush marker, where sent is the batch it was scheduled for
+                if message is None:
+                    job_id = sent[0][0].job_id
+                    if batches.get(job_id) is sent:
+                        await self.flush_batch(batches.pop(job_id))
+                    continue
+
+                self.outbound_slots.release()
+                job_id = getattr(message, "job_id", None)
+
+                if self.batch_results and message.msg_type == MSG_RESULT:
+                    if job_id not in batches:
+                        batches[job_id] = []
+                        self.loop.call_later(
+                            self.result_flush_interval,
+                            self.outbound.put_nowait, (None, batches[job_id])
+                        )
+                    batches[job_id].append((message, sent))
+
+                    if len(batches[job_id]) >= self.result_batch_size:
+                        await self.flush_batch(batches.pop(job_id))
+                    continue
+
+                # Results still batched for this job go first
+                if job_id in batches:
+                    await self.flush_batch(batches.pop(job_id))
+
+                await self.send_and_resolve(message, [sent])
+            finally:
+                self.outbound.task_done()
+
+    async def flush_batch(self, batch):
+        messages = [message for message, _ in batch]
+        batch_message = EdgeNetMessage.create_result_batch_message(
+            self.session_id, messages[0].job_id, messages
         )
+        await self.send_and_resolve(batch_message, [sent for _, sent in batch])
 
-        function_thread.start()
-        function_thread.join()
-
-        await self.send_job_finished(msg.job_id)
-
-        return result_list[0]
-
-    async def send(self, message: EdgeNetMessage):
-        msg_dict = {
-            "session_id": message.session_id,
-            "msg_type": message.msg_type
-        }
-        for e in message.extras:
-            msg_dict[e] = getattr(message, e)
-
-        await self.connection.send(json.dumps(msg_dict))
-
-    async def send_job_finished(self, job_id):
-        await self.send(EdgeNetMessage.create_job_finished_message(
-            self.session_id, job_id
-        ))
+    async def send_and_resolve(self, message, sent_list):
+        try:
+            await self.send(message)
+            for sent in sent_list: sent.set_result(True)
+        except Exception as e:
+            logging.warning(f"Failed to send {message.msg_type} message: {e!r}")
+            for sent in sent_list: sent.set_exception(e)
 
     def get_function(self, function_name):
         return getattr(self, function_name)
 
-    def register_function(self, function_name, function_method):
+    def register_function(
+        self, function_name, function_method, 
+        mode=EXECUTION_THREAD, max_concurrency=None
+    ):
+        # mode=EXECUTION_PROCESS runs the function in a worker process, and 
+        # max_concurrency limits how many of its calls may run at once
+        self.executor.configure(function_name, mode=mode, max_concurrency=max_concurrency)
         setattr(self, function_name, function_method)
         logging.debug(f"Function registered with name [{function_name}].")
         return True
 
     def uses_sender(self, func):
         def wrapper(message, *args, **kwargs):
-            # Asyncio caller for sending results
-            def _send_result(result):
-                result_message = EdgeNetMessage.create_result_message(
-                    self.session_id, message.job_id, result
-                )
+            sender = self.create_sender(message)
 
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
+            # Initialize job send list
+            self.job_sends[message.job_id] = []
 
-                loop.run_until_complete(self.send(result_message))
-                loop.close()
-
-            # Thread starter for the caller above, for concurrency
-            def send_result(result):
-                _thread = threading.Thread(target=_send_result, args=[result])
-                _thread.start()
-                self.job_threads[message.job_id].append(_thread)
-                logging.debug("Timer metrics successfully sent to server.")
-
-            # Asyncio caller for sending results
-            def _send_metrics(timer_object):
-                metrics_message = EdgeNetMessage.create_metrics_message(
-                    self.session_id, message.job_id, timer_object # Transform to dict
-                )
+            try:
+                if self.executor.get_mode(message.function_name) == EXECUTION_PROCESS:
+                    # Results and metrics are relayed back from the worker process
+                    result = call_in_process(func, sender, *args, **kwargs)
+                else:
+                    result = func(sender, *args, **kwargs)
 
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
+                # Wait until everything queued for this job has been sent
+                wait_for_futures(self.job_sends[message.job_id])
+            finally:
+                del self.job_sends[message.job_id]
 
-                loop.run_until_complete(self.send(metrics_message))
-                loop.close()
-                logging.info(f"Metrics for {timer_object.call_id[-12:]} successfully sent to server.")
+            return result
 
-            # Thread starter for the caller above, for concurrency
-            def send_metrics(timer_object):
-                _thread = threading.Thread(target=_send_metrics, args=[timer_object])
-                _thread.start()
-                self.job_threads[message.job_id].append(_thread)
+        return wrapper
 
-            # Make a generic class
-            class Sender: pass
+    def create_sender(self, message):
+        # Queues a result into the client's outbound pipeline
+        def send_result(result, attachments=None):
+            result_message = EdgeNetMessage.create_result_message(
+                self.session_id, message.job_id, result, attachments=attachments
+            )
+            self.job_sends[message.job_id].append(
+                self.send_threadsafe(result_message)
+            )
 
-            # Assign sender functions
-            sender = Sender()
-            sender.send_result  = send_result
-            sender.send_metrics = send_metrics
+        # Queues metrics into the client's outbound pipeline
+        # -- partial=True for metrics sent while the function is still running.
+        # -- Those and any metrics of the same Timer after them are sent as
+        # -- deltas, which only hold what was recorded since the previous one.
+        def send_metrics(timer_object, partial=False):
+            delta = partial or timer_object.delta_cursors is not None
+            if delta and timer_object.interval is None: # Not a delta already, e.g. from a ProxySender
+                timer_object = timer_object.create_delta()
+            metrics_message = EdgeNetMessage.create_metrics_message(
+                self.session_id, message.job_id, timer_object, delta=delta # Transform to dict
+            )
+            sent = self.send_threadsafe(metrics_message)
+            sent.add_done_callback(lambda _: logging.info(
+                f"Metrics for {timer_object.call_id[-12:]} successfully sent to server."
+            ))
+            self.job_sends[message.job_id].append(sent)
 
-            # Initialize job thread list
-            self.job_threads[message.job_id] = []
+        # Make a generic class
+        class Sender: pass
 
-            result = func(sender, *args, **kwargs)
+        # Assign sender functions
+        sender = Sender()
+        sender.send_result  = send_result
+        sender.send_metrics = send_metrics
 
-            # Cleanup for all the job threads
-            for thread in self.job_threads[message.job_id]:
-                thread.join()
+        return sender
 
-            return result
 
-        return wrapper
+class EdgeNetClientException(Exception): pass
@@ -0,0 +1,57 @@
+import datetime
+from collections import deque
+from .constants import *
+
+# Naive local times are what pipelines stamp their results with, so offsets
+# are measured between those, time zones included
+EPOCH = datetime.datetime(1970, 1, 1)
+
+
+def wall_clock():
+    # Seconds of the naive local datetime.now() since EPOCH
+    return (datetime.datetime.now() - EPOCH).total_seconds()
+
+
+class EdgeNetClock:
+    """
+    NTP-style estimate of the offset between a client's clock and the server's,
+    from CLOCK exchanges of four timestamps:
+    - t0: request sent by the server
+    - t1: request received by the client
+    - t2: reply sent by the client
+    - t3: reply received by the server
+    """
+    def __init__(self, window=CLOCK_SYNC_WINDOW):
+        # Latest (offset, round_trip_time) samples
+        self.samples = deque(maxlen=window)
+
+    def __repr__(self):
+        if not self.synchronized: return "<EdgeNetClock unsynchronized>"
+        return f"<EdgeNetClock offset={self.offset:.6f}s rtt={self.round_trip_time:.6f}s>"
+
+    def register_sample(self, t0, t1, t2, t3):
+        offset          = ((t1 - t0) + (t2 - t3)) / 2
+        round_trip_time = (t3 - t0) - (t2 - t1)
+        self.samples.append((offset, round_trip_time))
+
+    @property
+    def synchronized(self): return len(self.samples) > 0
+
+    @property
+    def best_sample(self):
+        # The exchange with the shortest round trip had the least room for
+        # asymmetric delays, like NTP's clock filter
+        if not self.synchronized:
+            raise EdgeNetClockException("No clock samples have been received yet.")
+        return min(self.samples, key=lambda sample: sample[1])
+
+    @property
+    def offset(self):
+        # Seconds that the client's clock is ahead of the server's
+        return self.best_sample[0]
+
+    @property
+    def round_trip_time(self): return self.best_sample[1]
+
+
+class EdgeNetClockException(Exception): pass
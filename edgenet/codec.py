@@ -0,0 +1,85 @@
+import json
+from .constants import *
+
+# Binary codecs are optional, peers fall back to JSON without them
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+
+
+class JSONCodec:
+    """
+    Wire codec for JSON text frames, understood by every EdgeNet peer
+    """
+    name      = CODEC_JSON
+    is_binary = False
+
+    @staticmethod
+    def encode(msg_dict): return json.dumps(msg_dict)
+
+    @staticmethod
+    def decode(frame): return json.loads(frame, strict=False)
+
+
+class MsgPackCodec:
+    """
+    Wire codec for MessagePack binary frames
+    """
+    name      = CODEC_MSGPACK
+    is_binary = True
+
+    @staticmethod
+    def encode(msg_dict): return msgpack.packb(msg_dict, use_bin_type=True)
+
+    @staticmethod
+    def decode(frame): return msgpack.unpackb(frame, raw=False)
+
+
+class CBORCodec:
+    """
+    Wire codec for CBOR binary frames
+    """
+    name      = CODEC_CBOR
+    is_binary = True
+
+    @staticmethod
+    def encode(msg_dict): return cbor2.dumps(msg_dict)
+
+    @staticmethod
+    def decode(frame): return cbor2.loads(frame)
+
+
+# Codecs that can be used with the installed packages
+AVAILABLE_CODECS = { JSONCodec.name: JSONCodec }
+if msgpack is not None: AVAILABLE_CODECS[MsgPackCodec.name] = MsgPackCodec
+if cbor2 is not None:   AVAILABLE_CODECS[CBORCodec.name]    = CBORCodec
+
+
+def get_codec(name):
+    if name not in AVAILABLE_CODECS:
+        raise EdgeNetCodecException(f"Wire codec [{name}] is not available.")
+    return AVAILABLE_CODECS[name]
+
+
+def negotiate_codec(offered, supported):
+    # Pick the first codec offered by the peer that we can also use
+    for name in offered:
+        if name in supported and name in AVAILABLE_CODECS:
+            return AVAILABLE_CODECS[name]
+    return JSONCodec
+
+
+def decode_frame(frame, codec=JSONCodec):
+    # Text frames are always JSON, binary frames use the negotiated codec
+    if isinstance(frame, str):
+        return JSONCodec.decode(frame)
+    return codec.decode(frame)
+
+
+class EdgeNetCodecException(Exception): pass
@@ -0,0 +1,144 @@
+from websockets.extensions.permessage_deflate import (
+    PerMessageDeflate, ClientPerMessageDeflateFactory, ServerPerMessageDeflateFactory
+)
+from websockets import frames
+from .constants import *
+from config import *
+
+
+class EdgeNetCompression:
+    """
+    permessage-deflate settings shared by an EdgeNetServer and its EdgeNetClients
+    """
+    def __init__(
+        self, enabled=COMPRESSION_ENABLED, level=COMPRESSION_LEVEL,
+        window_bits=COMPRESSION_WINDOW_BITS, memory_level=COMPRESSION_MEMORY_LEVEL,
+        threshold=COMPRESSION_THRESHOLD_IN_BYTES
+    ):
+        if not (8 <= window_bits <= 15):
+            raise EdgeNetCompressionException(f"Window bits should be between 8 and 15, got {window_bits}.")
+        if not (-1 <= level <= 9):
+            raise EdgeNetCompressionException(f"Compression level should be between -1 and 9, got {level}.")
+
+        self.enabled      = enabled
+        self.level        = level
+        self.window_bits  = window_bits
+        self.memory_level = memory_level
+        self.threshold    = threshold # Frames smaller than this are sent as-is
+
+    def __repr__(self):
+        if not self.enabled: return "<EdgeNetCompression disabled>"
+        return f"<EdgeNetCompression level={self.level} window_bits={self.window_bits} threshold={self.threshold}>"
+
+    @property
+    def compress_settings(self):
+        return { "level": self.level, "memLevel": self.memory_level }
+
+    def client_kwargs(self):
+        # Keyword arguments for websockets.connect
+        if not self.enabled: return { "compression": None }
+        return {
+            "compression": None, # Replaced by the factory below
+            "extensions": [EdgeNetClientDeflateFactory(
+                self.threshold,
+                server_max_window_bits=self.window_bits,
+                client_max_window_bits=self.window_bits,
+                compress_settings=self.compress_settings,
+            )]
+        }
+
+    def server_kwargs(self):
+        # Keyword arguments for websockets.serve
+        if not self.enabled: return { "compression": None }
+        return {
+            "compression": None,
+            "extensions": [EdgeNetServerDeflateFactory(
+                self.threshold,
+                server_max_window_bits=self.window_bits,
+                client_max_window_bits=self.window_bits,
+                compress_settings=self.compress_settings,
+            )]
+        }
+
+
+class ThresholdPerMessageDeflate(PerMessageDeflate):
+    """
+    permessage-deflate that leaves messages below a size threshold uncompressed.
+    """
+    def __init__(self, *args, threshold=0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.threshold        = threshold
+        self.encode_cont_data = False
+
+        # Byte counts of compressed messages, before and after
+        self.bytes_in  = 0
+        self.bytes_out = 0
+        self.frames_compressed = 0
+        self.frames_skipped    = 0
+
+    @classmethod
+    def create_from_extension(cls, extension, threshold):
+        return cls(
+            extension.remote_no_context_takeover, extension.local_no_context_takeover,
+            extension.remote_max_window_bits, extension.local_max_window_bits,
+            extension.compress_settings, threshold=threshold
+        )
+
+    @property
+    def stats(self):
+        return {
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "bytes_saved": self.bytes_in - self.bytes_out,
+            "frames_compressed": self.frames_compressed,
+            "frames_skipped": self.frames_skipped,
+        }
+
+    def encode(self, frame):
+        if frame.opcode in frames.CTRL_OPCODES:
+            return frame
+
+        # Uncompressed messages are allowed by RFC 7692 as long as RSV1 is
+        # unset, and leave the shared compression context untouched
+        if frame.opcode is not frames.OP_CONT:
+            self.encode_cont_data = len(frame.data) >= self.threshold
+        if not self.encode_cont_data:
+            self.frames_skipped += 1
+            return frame
+
+        encoded = super().encode(frame)
+        self.bytes_in  += len(frame.data)
+        self.bytes_out += len(encoded.data)
+        self.frames_compressed += 1
+        return encoded
+
+
+class EdgeNetClientDeflateFactory(ClientPerMessageDeflateFactory):
+    def __init__(self, threshold, **kwargs):
+        super().__init__(**kwargs)
+        self.threshold = threshold
+
+    def process_response_params(self, params, accepted_extensions):
+        extension = super().process_response_params(params, accepted_extensions)
+        return ThresholdPerMessageDeflate.create_from_extension(extension, self.threshold)
+
+
+class EdgeNetServerDeflateFactory(ServerPerMessageDeflateFactory):
+    def __init__(self, threshold, **kwargs):
+        super().__init__(**kwargs)
+        self.threshold = threshold
+
+    def process_request_params(self, params, accepted_extensions):
+        response_params, extension = super().process_request_params(params, accepted_extensions)
+        return response_params, ThresholdPerMessageDeflate.create_from_extension(extension, self.threshold)
+
+
+def get_compression_stats(connection):
+    # Stats of the negotiated extension of a websockets connection, if any
+    for extension in getattr(connection, "extensions", []):
+        if isinstance(extension, ThresholdPerMessageDeflate):
+            return extension.stats
+    return None
+
+
+class EdgeNetCompressionException(Exception): pass
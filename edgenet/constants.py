@@ -1,6 +1,21 @@
 # Connection settings
 SERVER_PING_TIMEOUT = None
 
+# permessage-deflate defaults, overridable in config.py
+COMPRESSION_ENABLED            = True
+COMPRESSION_LEVEL              = 6  # zlib level, 1 (fastest) to 9 (smallest)
+COMPRESSION_WINDOW_BITS        = 12 # LZ77 window of 2^n bytes, 8 to 15
+COMPRESSION_MEMORY_LEVEL       = 5  # zlib memLevel, 1 to 9
+COMPRESSION_THRESHOLD_IN_BYTES = 64 # Smaller frames are sent uncompressed
+
+# Received frames at least this large are decoded in a worker thread
+DECODE_IN_THREAD_THRESHOLD_IN_BYTES = 64 * 1024
+
+# Clock synchronization constants, see edgenet.clock
+CLOCK_SYNC_HANDSHAKE_SAMPLES   = 4  # CLOCK requests sent right after a handshake
+CLOCK_SYNC_INTERVAL_IN_SECONDS = 10 # Between periodic CLOCK requests afterwards
+CLOCK_SYNC_WINDOW              = 8  # Latest samples an estimate is picked from
+
 # Session constants
 SESSION_CONNECTED    = "CONNECTED"
 SESSION_DISCONNECTED = "DISCONNECTED"
@@ -10,15 +25,48 @@ SESSION_TERMINATED   = "TERMINATED"
 INITIAL_BACKOFF_TIME_IN_SECONDS = 0.25
 MAX_BACKOFF_TIME_IN_SECONDS     = 8
 
+# Client constants
+SENDER_QUEUE_SIZE = 256 # Max. messages waiting in a client's outbound queue
+
+# Result batching constants (opt-in, see EdgeNetClient's batch_results)
+RESULT_BATCH_SIZE                = 32   # Results per RESULT_BATCH message
+RESULT_FLUSH_INTERVAL_IN_SECONDS = 0.05 # Max. time a result waits in a batch
+BATCH_SHARED_FIELDS              = ("session_id", "msg_type", "job_id")
+
+# Command execution constants
+EXECUTION_THREAD      = "thread"
+EXECUTION_PROCESS     = "process"
+MAX_COMMAND_WORKERS   = 8    # Max. commands running at once on a client
+MAX_COMMAND_PROCESSES = None # Defaults to the number of CPUs
+
+# Worker process pipe constants
+PROXY_RESULT  = "RESULT"
+PROXY_METRICS = "METRICS"
+PROXY_RETURN  = "RETURN"
+PROXY_ERROR   = "ERROR"
+
 # Message constants
 MSG_CONNECTION   = "CONNECTION"
 MSG_COMMAND      = "COMMAND"
 MSG_COMMAND_POLL = "COMMAND_POLL"
 MSG_COMMAND      = "COMMAND"
 MSG_RESULT       = "RESULT"
+MSG_RESULT_BATCH = "RESULT_BATCH"
 MSG_FINISH       = "FINISH"
 MSG_METRICS      = "METRICS"
 MSG_TERMINATE    = "TERMINATE"
+MSG_CLOCK        = "CLOCK"
+
+# Wire codec constants
+CODEC_JSON    = "json"
+CODEC_MSGPACK = "msgpack"
+CODEC_CBOR    = "cbor"
+WIRE_CODECS   = [CODEC_MSGPACK, CODEC_CBOR, CODEC_JSON] # In order of preference
+
+# Attachment encoding constants
+ATTACHMENT_RAW  = "raw"
+ATTACHMENT_JPEG = "jpg"
+ATTACHMENT_PNG  = "png"
 
 # Job results location
 CSV_RESULTS_LOCATION   = "experiment-results/"
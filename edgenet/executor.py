@@ -0,0 +1,203 @@
+import asyncio, threading, functools, multiprocessing, traceback, os, sys
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from .constants import *
+
+
+class EdgeNetExecutor:
+    """
+    A bounded pool that executes the commands received by an EdgeNetClient.
+    """
+    def __init__(self, max_workers=MAX_COMMAND_WORKERS, max_processes=MAX_COMMAND_PROCESSES):
+        self.max_workers   = max_workers
+        self.max_processes = max_processes
+
+        self.thread_pool  = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="edgenet-command"
+        )
+        self.process_pool = None # Only spawned once a function needs it
+
+        # Per-function configuration
+        self.modes  = {}
+        self.limits = {}
+        # -- Semaphores for the limits above, created on the client's loop
+        self.semaphores = {}
+
+        # Queue-depth metrics
+        self.lock        = threading.Lock()
+        self.queued      = 0
+        self.running     = 0
+        self.completed   = 0
+        self.peak_queued = 0
+
+    @property
+    def stats(self):
+        with self.lock:
+            return {
+                "queued": self.queued,
+                "running": self.running,
+                "completed": self.completed,
+                "peak_queued": self.peak_queued,
+                "max_workers": self.max_workers,
+            }
+
+    def configure(self, function_name, mode=EXECUTION_THREAD, max_concurrency=None):
+        if mode not in (EXECUTION_THREAD, EXECUTION_PROCESS):
+            raise EdgeNetExecutorException(f"Unknown execution mode [{mode}].")
+        if max_concurrency is not None and max_concurrency < 1:
+            raise EdgeNetExecutorException(f"Concurrency limit of [{function_name}] should be at least 1.")
+
+        self.modes[function_name]  = mode
+        self.limits[function_name] = max_concurrency
+        self.semaphores.pop(function_name, None)
+
+    def get_mode(self, function_name): return self.modes.get(function_name, EXECUTION_THREAD)
+
+    def get_semaphore(self, function_name):
+        limit = self.limits.get(function_name)
+        if limit is None: return None
+        if function_name not in self.semaphores:
+            self.semaphores[function_name] = asyncio.Semaphore(limit)
+        return self.semaphores[function_name]
+
+    def get_process_pool(self):
+        if self.process_pool is None:
+            self.process_pool = ProcessPoolExecutor(max_workers=self.max_processes)
+        return self.process_pool
+
+    async def run(self, function_name, func, *args, **kwargs):
+        # Must be awaited from the client's loop
+        call = functools.partial(func, *args, **kwargs)
+        return await self.submit(function_name, call, self.get_mode(function_name))
+
+    async def submit(self, function_name, call, mode):
+        # Same as run, but with an already bound call and an explicit mode
+        with self.lock:
+            self.queued += 1
+            self.peak_queued = max(self.peak_queued, self.queued)
+
+        started = [] # Set once the call leaves the queue
+        semaphore = self.get_semaphore(function_name)
+
+        try:
+            if semaphore is not None:
+                await semaphore.acquire()
+
+            try:
+                loop = asyncio.get_event_loop()
+
+                if mode == EXECUTION_PROCESS:
+                    # Picklable calls only, counted as running once submitted
+                    self.mark_running(started)
+                    return await loop.run_in_executor(self.get_process_pool(), call)
+
+                return await loop.run_in_executor(self.thread_pool, self.track, call, started)
+            finally:
+                if semaphore is not None:
+                    semaphore.release()
+        finally:
+            with self.lock:
+                if started:
+                    self.running   -= 1
+                    self.completed += 1
+                else:
+                    self.queued -= 1
+
+    def track(self, call, started):
+        # Runs in a worker thread, the call is no longer queued from here on
+        self.mark_running(started)
+        return call()
+
+    def mark_running(self, started):
+        with self.lock:
+            self.queued  -= 1
+            self.running += 1
+            started.append(True)
+
+    def shutdown(self, wait=False):
+        self.thread_pool.shutdown(wait=wait)
+        if self.process_pool is not None:
+            self.process_pool.shutdown(wait=wait)
+
+
+class ProxySender:
+    """
+    A sender for functions running in a worker process, which forwards
+    results and metrics through a pipe to the client's process.
+    """
+    def __init__(self, connection):
+        self.connection = connection
+
+    def send_result(self, result, attachments=None):
+        self.connection.send((PROXY_RESULT, (result, attachments)))
+
+    def send_metrics(self, timer_object, partial=False):
+        # Deltas are taken here, where the Timer keeps recording
+        if partial or timer_object.delta_cursors is not None:
+            timer_object, partial = timer_object.create_delta(), True
+        self.connection.send((PROXY_METRICS, (timer_object, partial)))
+
+
+def run_with_proxy_sender(func, connection, args, kwargs):
+    # Entry point of the worker process. It exits right away, without the
+    # atexit handlers and thread shutdown it inherited from the client, which
+    # fail in a child forked from a thread and would make its exit code 1.
+    exitcode = 1
+    try:
+        result = func(ProxySender(connection), *args, **kwargs)
+        connection.send((PROXY_RETURN, result))
+        exitcode = 0
+    except Exception:
+        connection.send((PROXY_ERROR, traceback.format_exc()))
+    finally:
+        connection.close()
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(exitcode)
+
+
+def call_in_process(func, sender, *args, **kwargs):
+    """
+    Calls func(sender, *args, **kwargs) in a forked worker process, and relays
+    whatever it sends to the given sender until it returns. Raises an
+    EdgeNetExecutorException if it fails, or exits without returning.
+    """
+    # Forking passes func as is, so decorated closures need not be picklable
+    context = multiprocessing.get_context("fork")
+    receiver, connection = context.Pipe(duplex=False)
+    process = context.Process(
+        target=run_with_proxy_sender, args=(func, connection, args, kwargs), daemon=True
+    )
+    process.start()
+    connection.close() # Only the worker writes to the pipe
+
+    result, returned = None, False
+    try:
+        while True:
+            try:
+                kind, payload = receiver.recv()
+            except EOFError:
+                break # Worker is done
+
+            if kind == PROXY_RESULT:
+                result_data, attachments = payload
+                sender.send_result(result_data, attachments=attachments)
+            elif kind == PROXY_METRICS:
+                timer_object, partial = payload
+                sender.send_metrics(timer_object, partial=partial)
+            elif kind == PROXY_RETURN:
+                result, returned = payload, True
+            elif kind == PROXY_ERROR:
+                raise EdgeNetExecutorException(f"Function failed in worker process:\n{payload}")
+    finally:
+        receiver.close()
+        process.join()
+
+    # e.g. killed for running out of memory, or crashed in native code
+    if process.exitcode != 0 or not returned:
+        raise EdgeNetExecutorException(
+            f"Worker process exited with code {process.exitcode} before returning."
+        )
+    return result
+
+
+class EdgeNetExecutorException(Exception): pass
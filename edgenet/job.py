@@ -1,7 +1,9 @@
-import time, csv
-from datetime import datetime
+import asyncio, threading, csv, time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError, as_completed
+from datetime import datetime, timedelta
 from .constants import *
 from .message import EdgeNetMessage
+from metrics.time import Timer
 
 
 class EdgeNetJob:
@@ -17,14 +19,31 @@ class EdgeNetJob:
 
         self.results = []
         self.metrics = {} # Timer object here later
+        self.partial_metrics = {} # Merged deltas of each call that has not ended yet
+        self.latest_deltas   = {} # Latest delta of each call, for live throughput
 
-        # Spin lock for finishing a job
-        self.finished = False
+        # Completion primitives, signalled by EdgeNetServer.handler
+        # -- Resolves to this job once a FINISH message is received, or
+        # -- raises an EdgeNetJobException if it carries the client's error
+        self.completion = Future()
+        self.error      = None # Traceback of the command, if it failed on the client
+        # -- Notified every time a Timer object is registered
+        self.metrics_received = threading.Condition()
 
         # Some validation:
         if not callable(callback) and callback is not None:
             raise EdgeNetJobException("Provided callback is not callable.")
     
+    def __await__(self):
+        # Allows `await job` from any event loop
+        return self.as_asyncio_future().__await__()
+
+    @property
+    def finished(self): return self.completion.done()
+
+    @property
+    def failed(self): return self.error is not None
+
     @property
     def raw_results(self):
         return [r.result for r in self.results]
@@ -50,12 +69,14 @@ class EdgeNetJob:
             kwargs        = self.kwargs
         )
 
-    def register_result_from_message(self, message: EdgeNetMessage):
+    def register_result_from_message(self, message: EdgeNetMessage, clock_offset=None):
         new_result = EdgeNetJobResult(
             message.session_id,
             message.result,
             message.sent_dttm,
-            datetime.now().isoformat()
+            datetime.now().isoformat(),
+            attachments=getattr(message, "attachments", None),
+            clock_offset=clock_offset
         )
 
         # Append to own results list 
@@ -65,34 +86,150 @@ class EdgeNetJob:
         if self.callback:
             self.callback(new_result)
 
-    def register_metrics(self, timer_obj): self.metrics[timer_obj.call_id] = timer_obj
+    def register_metrics(self, timer_obj, delta=False):
+        with self.metrics_received:
+            if delta:
+                # Merged into the Timer of the call, complete once its function has ended
+                call_id = timer_obj.call_id
+                self.latest_deltas[call_id] = timer_obj
+                merged = self.partial_metrics.pop(call_id, None)
+                if merged is None:
+                    merged = Timer(timer_obj.function_name, call_id, aggregate=timer_obj.aggregate)
+                timer_obj = merged.merge(timer_obj)
+
+                if timer_obj.function_ended is None:
+                    self.partial_metrics[call_id] = timer_obj
+                    return
+
+            self.partial_metrics.pop(timer_obj.call_id, None)
+            self.metrics[timer_obj.call_id] = timer_obj
+            self.metrics_received.notify_all()
+
+    def get_throughput(self, section_id):
+        # Iterations of a looped section per second, summed over the latest delta of each call
+        with self.metrics_received:
+            return sum(timer_obj.get_throughput(section_id) for timer_obj in self.latest_deltas.values())
 
     def finish_job(self):
-        self.finished = True
-
-    def wait_until_finished(self):
-        while not self.finished: time.sleep(0.01) # TODO: Improve this spin lock
-
-    def wait_for_metrics(self, number_of_metrics=1):
-        while len(self.metrics) != number_of_metrics: time.sleep(0.01) # TODO: Improve this spin lock
+        if not self.completion.done():
+            self.completion.set_result(self)
+
+    def fail_job(self, error):
+        # Waiting on (or awaiting) the job raises instead of returning
+        if not self.completion.done():
+            self.error = error
+            self.completion.set_exception(EdgeNetJobException(f"Job {self.job_id} failed on the client:\n{error}"))
+
+    def as_asyncio_future(self, loop=None):
+        return asyncio.wrap_future(self.completion, loop=loop)
+
+    def wait_until_finished(self, timeout=None):
+        try:
+            self.completion.result(timeout=timeout)
+        except FutureTimeoutError:
+            raise EdgeNetJobException(f"Job {self.job_id} did not finish within {timeout} seconds.")
+
+    def wait_for_metrics(self, number_of_metrics=1, timeout=None):
+        with self.metrics_received:
+            received = self.metrics_received.wait_for(
+                lambda: len(self.metrics) >= number_of_metrics, timeout=timeout
+            )
+        if not received:
+            raise EdgeNetJobException(f"Job {self.job_id} did not receive {number_of_metrics} metrics within {timeout} seconds.")
 
     def results_to_csv(self):
-        data = [(self.job_id, str(r.result), r.session_id, r.sent_dttm, r.recv_dttm) for r in self.results]
+        data = [(self.job_id, str(r.result), r.session_id, r.sent_dttm, r.recv_dttm, r.clock_offset) for r in self.results]
 
         with open(f"{CSV_RESULTS_LOCATION}{self.job_id}{CSV_FORMAT_JOB_RESULTS}", "a+") as fp:
             writer = csv.writer(fp, delimiter=",")
             writer.writerows(data)
 
 
+class EdgeNetJobGroup:
+    """
+    A group of jobs for the same command, sent to many sessions through
+    EdgeNetServer.send_commands
+    """
+    def __init__(self, function_name, jobs, errors=None):
+        self.function_name = function_name
+        self.jobs   = jobs # Keyed by session ID
+        self.errors = errors or {} # Sessions the command could not be sent to
+
+    def __len__(self): return len(self.jobs)
+
+    def __iter__(self): return iter(self.jobs.values())
+
+    def __getitem__(self, session_id): return self.jobs[session_id]
+
+    def __await__(self):
+        # Allows `await group` from any event loop, resolving to its jobs
+        return asyncio.gather(*[job.as_asyncio_future() for job in self]).__await__()
+
+    @property
+    def finished(self): return all(job.finished for job in self)
+
+    @property
+    def progress(self):
+        # Number of finished jobs over the number of jobs
+        return sum(job.finished for job in self), len(self)
+
+    @property
+    def results(self):
+        return [r for job in self for r in job.results]
+
+    def as_completed(self, timeout=None):
+        # Yields jobs in the order they finish
+        futures = { job.completion: job for job in self }
+        try:
+            for future in as_completed(futures, timeout=timeout):
+                yield futures[future]
+        except FutureTimeoutError:
+            finished, total = self.progress
+            raise EdgeNetJobException(f"Only {finished}/{total} jobs of {self.function_name} finished within {timeout} seconds.")
+
+    def wait_until_finished(self, timeout=None):
+        # The timeout applies to the whole group, not to each job
+        for _ in self.as_completed(timeout=timeout): pass
+
+    def wait_for_metrics(self, number_of_metrics=1, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for job in self:
+            remaining = None if deadline is None else max(0, deadline - time.monotonic())
+            job.wait_for_metrics(number_of_metrics, timeout=remaining)
+
+    def results_to_csv(self):
+        for job in self: job.results_to_csv()
+
+
 class EdgeNetJobResult:
     """
     A wrapper for a job result
     """
-    def __init__(self, session_id, result, sent_dttm, recv_dttm):
-        self.session_id = session_id
-        self.result     = result
-        self.sent_dttm  = sent_dttm
-        self.recv_dttm  = recv_dttm
+    def __init__(self, session_id, result, sent_dttm, recv_dttm, attachments=None, clock_offset=None):
+        self.session_id  = session_id
+        self.result      = result
+        self.sent_dttm   = sent_dttm
+        self.recv_dttm   = recv_dttm
+        self.attachments = attachments or {}
+
+        # Seconds that the edge's clock was ahead of the server's when received,
+        # None if it was not estimated yet (see edgenet.clock)
+        self.clock_offset = clock_offset
+
+    def to_server_time(self, edge_dttm):
+        # A naive datetime (or ISO string) of the edge's clock, in the server's
+        if isinstance(edge_dttm, str):
+            edge_dttm = datetime.fromisoformat(edge_dttm)
+        if self.clock_offset is None: return edge_dttm
+        return edge_dttm - timedelta(seconds=self.clock_offset)
+
+    @property
+    def corrected_sent_dttm(self): return self.to_server_time(self.sent_dttm)
+
+    @property
+    def latency(self):
+        # Seconds between sending on the edge and receiving on the server
+        return (datetime.fromisoformat(self.recv_dttm) - self.corrected_sent_dttm).total_seconds()
 
     @property
     def args(self): return self.result["args"]
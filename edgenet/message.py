@@ -2,6 +2,9 @@ import json
 from datetime import datetime
 from time import strftime
 from .constants import *
+from .codec import JSONCodec, decode_frame
+from .attachment import EdgeNetAttachment
+from .clock import wall_clock
 
 
 class EdgeNetMessage:
@@ -17,37 +20,136 @@ class EdgeNetMessage:
         for k, v, in kwargs.items():
             setattr(self, k, v)
 
+    def to_dict(self, binary=False):
+        msg_dict = {
+            "session_id": self.session_id,
+            "msg_type": self.msg_type
+        }
+        for e in self.extras:
+            msg_dict[e] = getattr(self, e)
+
+        if "attachments" in msg_dict:
+            msg_dict["attachments"] = {
+                name: attachment.to_dict(binary=binary)
+                for name, attachment in self.attachments.items()
+            }
+
+        # Batched results share the batch's session, type and job ID
+        if self.msg_type == MSG_RESULT_BATCH:
+            msg_dict["results"] = [
+                {k: v for k, v in m.to_dict(binary=binary).items() if k not in BATCH_SHARED_FIELDS}
+                for m in self.results
+            ]
+
+        return msg_dict
+
+    def encode(self, codec=JSONCodec):
+        return codec.encode(self.to_dict(binary=codec.is_binary))
+
+    @classmethod
+    def create_from_dict(cls, msg_dict):
+        if "attachments" in msg_dict:
+            msg_dict["attachments"] = {
+                name: EdgeNetAttachment.create_from_dict(attachment_dict)
+                for name, attachment_dict in msg_dict["attachments"].items()
+            }
+        if msg_dict["msg_type"] == MSG_RESULT_BATCH:
+            msg_dict["results"] = [
+                cls.create_from_dict({
+                    "session_id": msg_dict["session_id"], "msg_type": MSG_RESULT,
+                    "job_id": msg_dict["job_id"], **result_dict
+                })
+                for result_dict in msg_dict["results"]
+            ]
+        return cls(**msg_dict)
+
     @classmethod
     def create_from_json(cls, raw_json):
         json_dict = json.loads(raw_json,strict=False)
-        return cls(**json_dict)
+        return cls.create_from_dict(json_dict)
+
+    @classmethod
+    def create_from_frame(cls, frame, codec=JSONCodec):
+        return cls.create_from_dict(decode_frame(frame, codec))
+
+    @classmethod
+    def create_client_handshake_message(cls, session_id, codecs=None):
+        # Legacy clients do not offer any codecs, and are kept on JSON
+        if codecs is None:
+            return cls(session_id, MSG_CONNECTION)
+        return cls(session_id, MSG_CONNECTION, codecs=codecs)
 
     @classmethod
-    def create_client_handshake_message(cls, session_id):
-        return cls(session_id, MSG_CONNECTION)
+    def create_server_handshake_message(cls, session_id, codec):
+        return cls(session_id, MSG_CONNECTION, codec=codec)
 
     @classmethod
-    def create_result_message(cls, session_id, job_id, result):
+    def create_clock_request_message(cls, session_id):
+        return cls(session_id, MSG_CLOCK, t0=wall_clock())
+
+    @classmethod
+    def create_clock_reply_message(cls, session_id, t0, received):
+        # received is the wall_clock() of when the request arrived
+        return cls(session_id, MSG_CLOCK, t0=t0, t1=received, t2=wall_clock())
+
+    @classmethod
+    def create_result_message(cls, session_id, job_id, result, attachments=None):
+        # Results without attachments keep the legacy message format
+        if not attachments:
+            return cls(
+                session_id, MSG_RESULT,
+                job_id=job_id,
+                result=result,
+                sent_dttm=datetime.now().isoformat()
+            )
+
+        # Plain ndarrays are sent as raw buffers
+        attachments = {
+            name: a if isinstance(a, EdgeNetAttachment) else EdgeNetAttachment.create_from_ndarray(a)
+            for name, a in attachments.items()
+        }
         return cls(
             session_id, MSG_RESULT,
             job_id=job_id,
             result=result,
+            attachments=attachments,
             sent_dttm=datetime.now().isoformat()
         )
 
     @classmethod
-    def create_metrics_message(cls, session_id, job_id, timer_obj):
+    def create_result_batch_message(cls, session_id, job_id, result_messages):
+        return cls(
+            session_id, MSG_RESULT_BATCH,
+            job_id=job_id,
+            results=result_messages,
+        )
+
+    @classmethod
+    def create_metrics_message(cls, session_id, job_id, timer_obj, delta=False):
+        if not delta:
+            return cls(
+                session_id, MSG_METRICS,
+                job_id=job_id,
+                metrics=timer_obj.to_dict(),
+                sent_dttm=datetime.now().isoformat()
+            )
+        # A Timer from Timer.create_delta, merged into the call's Timer on the server
         return cls(
             session_id, MSG_METRICS,
             job_id=job_id,
             metrics=timer_obj.to_dict(),
+            delta=True,
             sent_dttm=datetime.now().isoformat()
         )
 
     @classmethod
-    def create_job_finished_message(cls, session_id, job_id):
+    def create_job_finished_message(cls, session_id, job_id, executor_stats=None, error=None):
+        # error is the traceback of a command that failed on the client
+        extras = {}
+        if executor_stats is not None: extras["executor_stats"] = executor_stats
+        if error is not None: extras["error"] = error
         return cls(
-            session_id, MSG_FINISH, job_id=job_id, 
+            session_id, MSG_FINISH, job_id=job_id, **extras
         )
 
     @classmethod
@@ -1,28 +1,48 @@
-import asyncio, uuid, json
+import asyncio, threading, uuid
 import websockets
 from metrics.time import Timer
 from .session import EdgeNetSession
 from .message import EdgeNetMessage
-from .job import EdgeNetJob, EdgeNetJobResult
+from .job import EdgeNetJob, EdgeNetJobGroup, EdgeNetJobResult
+from .codec import JSONCodec, negotiate_codec
+from .compression import EdgeNetCompression
+from .clock import wall_clock
 from .constants import *
 from config import *
 
 
 class EdgeNetServer:
-    def __init__(self, hostname="0.0.0.0", port=8888):
+    def __init__(
+        self, hostname="0.0.0.0", port=8888, codecs=WIRE_CODECS, compression=None,
+        clock_sync_interval=CLOCK_SYNC_INTERVAL_IN_SECONDS
+    ):
         self.hostname   = hostname
         self.port       = port
         self.is_running = True
 
+        # Wire codecs accepted from clients during handshake
+        self.codecs = codecs
+
+        # permessage-deflate settings, taken from config if not given
+        self.compression = EdgeNetCompression() if compression is None else compression
+
+        # Seconds between CLOCK requests to each session, None to only send them after handshakes
+        self.clock_sync_interval = clock_sync_interval
+
         # Set empty dict to store sessions
         self.sessions = {}
         self.jobs     = {}
 
+        # Loop owned by the server's thread, set once it is serving
+        self.loop       = None
+        self.loop_ready = threading.Event()
+
         logging.debug(f"EdgeNetServer for host {hostname}:{port} instantiated.")
 
     def run(self):
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
+        self.loop = loop
         loop.run_until_complete(self.serve())
 
     def send_command_external(
@@ -30,31 +50,110 @@ class EdgeNetServer:
         is_polling=False, callback=None, job_id=None,
         **kwargs
     ):
-        loop = asyncio.get_event_loop()
-        result = loop.run_until_complete(self.send_command(
-            session_id, function_name, is_polling=is_polling, job_id=job_id,
-            callback=callback,
-            *args, **kwargs
+        # Blocks until the command is sent, from any thread other than the server's own
+        self.check_not_in_loop_thread("send_command")
+        return self.submit_command(
+            session_id, function_name, *args,
+            is_polling=is_polling, callback=callback, job_id=job_id,
+            **kwargs
+        ).result()
+
+    def send_terminate_external(self, session_id):
+        self.check_not_in_loop_thread("send_terminate")
+        return self.submit_terminate(session_id).result()
+
+    def submit_command(
+        self, session_id, function_name, *args,
+        is_polling=False, callback=None, job_id=None,
+        **kwargs
+    ):
+        # Returns a concurrent.futures.Future that resolves to the EdgeNetJob once sent
+        return self.run_in_loop(self.send_command(
+            session_id, function_name, *args,
+            is_polling=is_polling, callback=callback, job_id=job_id,
+            **kwargs
         ))
 
-        return result
+    def submit_terminate(self, session_id):
+        # Returns a concurrent.futures.Future that resolves to the terminated EdgeNetSession
+        return self.run_in_loop(self.send_terminate(session_id))
 
-    def send_terminate_external(self, session_id):
-        loop = asyncio.get_event_loop()
-        result = loop.run_until_complete(self.send_terminate(session_id))
+    def run_in_loop(self, coro, timeout=None):
+        # Schedules a coroutine on the server's loop from any other thread
+        if not self.loop_ready.wait(timeout=timeout):
+            coro.close()
+            raise EdgeNetServerException(f"Server did not start serving within {timeout} seconds.")
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def broadcast_command(
+        self, session_ids, function_name, *args,
+        is_polling=False, callback=None, job_ids=None,
+        **kwargs
+    ):
+        # Blocks until the command is sent to every session, from any thread
+        # other than the server's own
+        self.check_not_in_loop_thread("send_commands")
+        return self.submit_commands(
+            session_ids, function_name, *args,
+            is_polling=is_polling, callback=callback, job_ids=job_ids,
+            **kwargs
+        ).result()
+
+    def submit_commands(
+        self, session_ids, function_name, *args,
+        is_polling=False, callback=None, job_ids=None,
+        **kwargs
+    ):
+        # Returns a concurrent.futures.Future that resolves to the EdgeNetJobGroup once sent
+        return self.run_in_loop(self.send_commands(
+            session_ids, function_name, *args,
+            is_polling=is_polling, callback=callback, job_ids=job_ids,
+            **kwargs
+        ))
 
-        return result
+    def in_loop_thread(self):
+        try:
+            return asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            return False
+
+    def check_not_in_loop_thread(self, coroutine_name):
+        # Blocking on the server's loop from within would deadlock it
+        if self.in_loop_thread():
+            raise EdgeNetServerException(f"Use `await {coroutine_name}(...)` from the server's loop instead.")
 
     async def serve(self, stop=asyncio.Future()):
         # Main server loop
-        async with websockets.serve(self.handler, self.hostname, self.port, ping_timeout=SERVER_PING_TIMEOUT):
+        async with websockets.serve(
+            self.handler, self.hostname, self.port, ping_timeout=SERVER_PING_TIMEOUT,
+            **self.compression.server_kwargs()
+        ):
+            self.loop_ready.set()
             # Wait until a message is handled
             await asyncio.Future()
 
     async def handler(self, websocket):
+        try:
+            await self.handle_messages(websocket)
+        finally:
+            # Clock sync of the sessions handshaken on this connection stops with it
+            for session in list(self.sessions.values()):
+                if session.websocket is websocket: session.stop_clock_sync()
+
+    async def handle_messages(self, websocket):
+        # Connection starts on JSON until a codec is negotiated
+        codec = JSONCodec
+
         async for msg in websocket:
-            # Parse JSON message to Python dict:
-            message = EdgeNetMessage.create_from_json(msg)
+            # Parse message to Python dict:
+            if len(msg) >= DECODE_IN_THREAD_THRESHOLD_IN_BYTES:
+                # Large frames, e.g. METRICS of long jobs, would stall other sessions
+                message = await asyncio.get_running_loop().run_in_executor(
+                    None, EdgeNetMessage.create_from_frame, msg, codec
+                )
+            else:
+                message = EdgeNetMessage.create_from_frame(msg, codec)
+            received = wall_clock()
             logging.debug(f"Message received from session ID:[{message.session_id[-12:]}]")
 
             # If message is a handshake:
@@ -62,34 +161,84 @@ class EdgeNetServer:
                 # Store session
                 session = EdgeNetSession.create_from_handshake(msg, websocket)
                 self.sessions[message.session_id] = session
+
+                # Reply with the selected codec if the client offered any
+                if hasattr(message, "codecs"):
+                    codec = negotiate_codec(message.codecs, self.codecs)
+                    reply = EdgeNetMessage.create_server_handshake_message(message.session_id, codec.name)
+                    await websocket.send(reply.encode(JSONCodec))
+                    session.codec = codec
+                    logging.debug(f"Selected the [{codec.name}] wire codec for session ID:[{message.session_id[-12:]}].")
+
+                # Estimate the client's clock offset, see edgenet.clock
+                session.clock_task = asyncio.create_task(self.synchronize_clock(session))
+
                 logging.debug(f"Message was of CONNECTION type, successfully registered session ID:[{message.session_id[-12:]}].")
                 logging.info(f"Edge successfully connected with session ID:[{message.session_id}]")
 
+            # If message is a client's reply to a CLOCK request
+            if message.msg_type == MSG_CLOCK:
+                self.sessions[message.session_id].clock.register_sample(
+                    message.t0, message.t1, message.t2, received
+                )
+
             # If message is a job result
             if message.msg_type == MSG_RESULT:
                 logging.debug(f"Message was of RESULT type for job ID:[{message.job_id[-12:]}].")
-                self.jobs[message.job_id].register_result_from_message(message)
+                self.jobs[message.job_id].register_result_from_message(
+                    message, clock_offset=self.sessions[message.session_id].clock_offset
+                )
+
+            # If message is a batch of job results
+            if message.msg_type == MSG_RESULT_BATCH:
+                logging.debug(f"Message was of RESULT_BATCH type with {len(message.results)} results for job ID:[{message.job_id[-12:]}].")
+                job = self.jobs[message.job_id]
+                clock_offset = self.sessions[message.session_id].clock_offset
+                for result_message in message.results:
+                    job.register_result_from_message(result_message, clock_offset=clock_offset)
 
             # If message indicates that a job is finished
             if message.msg_type == MSG_FINISH:
                 logging.debug(f"Message was of FINISH type for job ID:[{message.job_id[-12:]}].")
-                self.jobs[message.job_id].finish_job()
+                if hasattr(message, "error"):
+                    logging.warning(f"Job ID:[{message.job_id[-12:]}] failed on session {message.session_id[-12:]}:\n{message.error}")
+                    self.jobs[message.job_id].fail_job(message.error)
+                else:
+                    self.jobs[message.job_id].finish_job()
+
+                # Keep the client's latest executor queue-depth metrics
+                if hasattr(message, "executor_stats"):
+                    self.sessions[message.session_id].executor_stats = message.executor_stats
 
             # If message contains metrics data
             if message.msg_type == MSG_METRICS:
                 # Register Timer object to our job
-                timer_obj = Timer.create_from_dict(message.metrics)
-                self.jobs[message.job_id].register_metrics(timer_obj)
+                timer_obj = await asyncio.get_running_loop().run_in_executor(
+                    None, Timer.create_from_dict, message.metrics
+                )
+                self.jobs[message.job_id].register_metrics(
+                    timer_obj, delta=getattr(message, "delta", False)
+                )
 
-    async def send_message(self, session_id, message: EdgeNetMessage):
-        msg_dict = {
-            "session_id": message.session_id,
-            "msg_type": message.msg_type
-        }
-        for e in message.extras:
-            msg_dict[e] = getattr(message, e)
+    async def synchronize_clock(self, session):
+        # A few CLOCK requests right away, then one every clock_sync_interval
+        try:
+            for _ in range(CLOCK_SYNC_HANDSHAKE_SAMPLES):
+                await session.websocket.send(
+                    EdgeNetMessage.create_clock_request_message(session.session_id).encode(session.codec)
+                )
+            while self.clock_sync_interval is not None:
+                await asyncio.sleep(self.clock_sync_interval)
+                if session.status != SESSION_CONNECTED: break
+                await session.websocket.send(
+                    EdgeNetMessage.create_clock_request_message(session.session_id).encode(session.codec)
+                )
+        except websockets.ConnectionClosed:
+            pass
 
-        await self.sessions[session_id].websocket.send(json.dumps(msg_dict))
+    async def send_message(self, session_id, message: EdgeNetMessage):
+        session = self.sessions[session_id]
+        await session.websocket.send(message.encode(session.codec))
 
     async def send_command(
         self, session_id, function_name, *args, 
@@ -117,6 +266,35 @@ class EdgeNetServer:
         # Return the job object
         return job
 
+    async def send_commands(
+        self, session_ids, function_name, *args,
+        is_polling=False, callback=None, job_ids=None,
+        **kwargs
+    ):
+        # Sends the same command to all sessions at once, job_ids optionally
+        # maps each session ID to the ID of its job
+        session_ids = list(session_ids)
+        job_ids     = job_ids or {}
+
+        outcomes = await asyncio.gather(*[
+            self.send_command(
+                session_id, function_name, *args,
+                is_polling=is_polling, callback=callback, job_id=job_ids.get(session_id),
+                **kwargs
+            )
+            for session_id in session_ids
+        ], return_exceptions=True)
+
+        jobs, errors = {}, {}
+        for session_id, outcome in zip(session_ids, outcomes):
+            if isinstance(outcome, Exception):
+                logging.warning(f"Failed to send {function_name} to session ID:[{session_id[-12:]}]: {outcome!r}")
+                errors[session_id] = outcome
+            else:
+                jobs[session_id] = outcome
+
+        return EdgeNetJobGroup(function_name, jobs, errors=errors)
+
     async def send_terminate(self, session_id):
         # Create the termination message and send it
         term_message = EdgeNetMessage.create_terminate_message(session_id)
@@ -129,10 +307,13 @@ class EdgeNetServer:
         return self.sessions[session_id]
 
     def sleep(self, seconds):
-        # Sleep call used for testing
-        async def _sleep():
-            await asyncio.sleep(seconds)
+        # Sleep call used for testing and grace periods. The server's loop keeps
+        # serving in its own thread; the caller's loop is run meanwhile so that
+        # clients living in the caller's thread (as in tests) are not starved.
+        self.check_not_in_loop_thread("asyncio.sleep")
 
         loop = asyncio.get_event_loop()
-        loop.run_until_complete(_sleep())
-        
+        loop.run_until_complete(asyncio.sleep(seconds))
+
+
+class EdgeNetServerException(Exception): pass
@@ -1,5 +1,8 @@
 import json
 from .constants import *
+from .codec import JSONCodec
+from .compression import get_compression_stats
+from .clock import EdgeNetClock
 
 
 class EdgeNetSession:
@@ -12,6 +15,18 @@ class EdgeNetSession:
         
         self.terminated = False
 
+        # Wire codec for messages sent to this session, set during handshake
+        self.codec = JSONCodec
+
+        # Latest queue-depth metrics of the client's executor, sent with FINISH
+        self.executor_stats = None
+
+        # Offset and round trip time to the client's clock, from CLOCK exchanges
+        self.clock = EdgeNetClock()
+
+        # Task sending this session's CLOCK requests, cancelled once it disconnects
+        self.clock_task = None
+
     @classmethod
     def create_from_handshake(cls, raw_json, websocket):
         json_dict = json.loads(raw_json)
@@ -22,6 +37,27 @@ class EdgeNetSession:
         if self.terminated: return SESSION_TERMINATED
         return SESSION_CONNECTED if self.websocket.open else SESSION_DISCONNECTED
 
+    @property
+    def compression_stats(self):
+        # Bytes saved by permessage-deflate on frames sent to this session
+        if self.websocket is None: return None
+        return get_compression_stats(self.websocket)
+
+    @property
+    def clock_offset(self):
+        # Seconds that the client's clock is ahead of the server's, if known
+        return self.clock.offset if self.clock.synchronized else None
+
+    @property
+    def round_trip_time(self):
+        return self.clock.round_trip_time if self.clock.synchronized else None
+
+    def stop_clock_sync(self):
+        if self.clock_task is not None:
+            self.clock_task.cancel()
+            self.clock_task = None
+
     def terminate(self):
+        self.stop_clock_sync()
         self.terminated = True
         self.websocket = None
@@ -32,13 +32,15 @@ for _fname in all_results:
             except KeyError as e:
                 result_time = dttm_parser.parse(result["time_recognized"]).replace(tzinfo=None)
 
+            # Hybrid capture times are corrected for the edge's clock offset
+            # by the cloud (see EdgeNetJobResult.to_server_time). Results
+            # recorded before that have no trailing clock offset column.
+            has_clock_offset = len(row) > 5 and row[5] not in ("", "None")
             ctr_seconds = (result_time - captured_time).total_seconds()
 
             if ctr_seconds < 0:
-                if pipeline == "hybrid":
+                if pipeline == "hybrid" and not has_clock_offset:
                     ctr_seconds = (result_time - captured_time).total_seconds() + 28800
-                # else:
-                #     raise Exception(f"{_fname},{ctr_seconds}, {result_time}, {captured_time}")
                 ctr_seconds = max(0, ctr_seconds)
 
             # Add count and acc. sum per hierarchy:
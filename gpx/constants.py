@@ -0,0 +1,9 @@
+# Interpolation modes for GPXCollection.get_interpolated_*
+INTERPOLATE_LINEAR = "linear" # Constant speed between entries
+INTERPOLATE_SPEED  = "speed"  # Constant acceleration between the speeds of entries
+
+# Live GPS feed constants
+LIVE_GPX_CAPACITY                 = 3600 # Recent fixes kept, an hour at 1 Hz
+LIVE_GPX_POLL_INTERVAL_IN_SECONDS = 0.1  # How often a tailed file is checked for new lines
+KNOTS_TO_METERS_PER_SECOND        = 0.514444
+NMEA_CENTURY_PIVOT                = 80 # Two-digit NMEA years below are 20yy, others 19yy
@@ -0,0 +1,212 @@
+import datetime, logging, os, socket, threading, time
+from functools import reduce
+import numpy as np
+from .wrappers import GPXCollection, GPXEntries, GPXTrack, GPXException
+from .constants import *
+
+
+class LiveGPXBuffer:
+    """
+    A bounded buffer of the most recent GPS fixes, kept sorted by time
+    """
+    def __init__(self, capacity=LIVE_GPX_CAPACITY):
+        self.capacity = capacity
+        self.lock     = threading.Lock()
+        self.allocate(2 * capacity)
+
+        # Fixes are in [start, end) of the buffers
+        self.start = 0
+        self.end   = 0
+
+    def __len__(self): return self.end - self.start
+
+    def allocate(self, size):
+        self.times   = np.empty(size, dtype="datetime64[us]")
+        self.latlngs = np.empty((size, 2), dtype=np.float64)
+        self.eles    = np.empty(size, dtype=np.float64)
+        self.speeds  = np.empty(size, dtype=np.float64)
+
+    def append(self, dttm, lat, lng, ele=None, speed=None):
+        # Returns False for fixes older than the latest one, which are dropped
+        dttm = np.datetime64(dttm, "us")
+
+        with self.lock:
+            if self.end > self.start and dttm < self.times[self.end - 1]:
+                return False
+
+            if self.end == len(self.times):
+                self.compact()
+            if self.end - self.start == self.capacity:
+                self.start += 1 # Drop the oldest fix
+
+            i = self.end
+            self.times[i]   = dttm
+            self.latlngs[i] = (lat, lng)
+            self.eles[i]    = np.nan if ele is None else ele
+            self.speeds[i]  = np.nan if speed is None else speed
+            self.end += 1
+
+        return True
+
+    def compact(self):
+        # Moves the kept fixes to the front of new buffers, once every
+        # `capacity` appends. Snapshots still point to the old buffers.
+        kept = slice(self.start, self.end)
+        times, latlngs, eles, speeds = self.times[kept], self.latlngs[kept], self.eles[kept], self.speeds[kept]
+
+        self.allocate(len(self.times))
+        count = self.end - self.start
+        self.times[:count], self.latlngs[:count] = times, latlngs
+        self.eles[:count], self.speeds[:count]   = eles, speeds
+        self.start, self.end = 0, count
+
+    def snapshot(self):
+        # A read-only GPXTrack of the current fixes, without copying. Later
+        # appends only write past its end, or into new buffers.
+        with self.lock:
+            kept = slice(self.start, self.end)
+            return GPXTrack(self.times[kept], self.latlngs[kept], self.eles[kept], self.speeds[kept])
+
+
+class LiveGPXCollection(GPXCollection):
+    """
+    A GPXCollection fed by a live GPS, keeping only its most recent fixes
+    """
+    def __init__(self, source="live", capacity=LIVE_GPX_CAPACITY, offset=None):
+        self.filepath   = source
+        self.start_time = None # Set on the first fix
+        self.entries    = GPXEntries(self)
+        self.buffer     = LiveGPXBuffer(capacity)
+
+        # GPS times are in UTC, while capture times are local
+        if offset is None:
+            offset = datetime.datetime.now().astimezone().utcoffset()
+        self.offset = np.timedelta64(offset, "us")
+
+        # Altitude of the latest GGA sentence, see feed_line
+        self.altitude = (None, None) # (time of day, altitude)
+
+        self.feed_thread = None
+        self.stopped     = threading.Event()
+
+    @property
+    def track(self): return self.buffer.snapshot()
+
+    def sync(self, base_time):
+        raise GPXException("A live GPXCollection cannot be re-synced.")
+
+    def append(self, dttm, lat, lng, ele=None, speed=None):
+        # Adds a fix with a UTC time
+        appended = self.buffer.append(dttm, lat, lng, ele=ele, speed=speed)
+        if appended and self.start_time is None:
+            self.start_time = dttm + self.offset.item()
+        return appended
+
+    def feed_line(self, line):
+        # Adds a fix from an NMEA 0183 sentence, returns True if one was added.
+        # RMC sentences carry the date, speed and position, while GGA
+        # sentences carry the altitude used for the RMC fix of the same time.
+        fields = parse_nmea_sentence(line)
+        if fields is None: return False
+
+        sentence_type = fields[0][-3:]
+        if sentence_type == "GGA" and len(fields) > 9:
+            if fields[6] in ("", "0") or not fields[9]: return False # No fix
+            self.altitude = (fields[1], float(fields[9]))
+
+        elif sentence_type == "RMC" and len(fields) > 9:
+            if fields[2] != "A": return False # Void fix
+            dttm = parse_nmea_datetime(fields[9], fields[1])
+            lat  = parse_nmea_coordinate(fields[3], fields[4])
+            lng  = parse_nmea_coordinate(fields[5], fields[6])
+            speed = float(fields[7]) * KNOTS_TO_METERS_PER_SECOND if fields[7] else None
+            ele   = self.altitude[1] if self.altitude[0] == fields[1] else None
+            return self.append(dttm, lat, lng, ele=ele, speed=speed)
+
+        return False
+
+    def feed(self, lines):
+        # Consumes lines until they run out or stop is called
+        for line in lines:
+            if self.stopped.is_set(): break
+            try:
+                self.feed_line(line)
+            except (ValueError, IndexError):
+                logging.debug(f"Skipped malformed NMEA sentence: {line!r}")
+
+    def start(self, lines):
+        # Feeds lines in a background thread
+        self.stopped.clear()
+        self.feed_thread = threading.Thread(target=self.feed, args=(lines,), daemon=True)
+        self.feed_thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+
+    @classmethod
+    def create_from_file(cls, file_path, from_start=False, **kwargs):
+        # Follows a file that a GPS daemon appends NMEA sentences to
+        gpx_collection = cls(source=file_path, **kwargs)
+        return gpx_collection.start(tail_lines(file_path, gpx_collection.stopped, from_start=from_start))
+
+    @classmethod
+    def create_from_socket(cls, host, port, **kwargs):
+        # Reads NMEA sentences from a TCP stream, e.g. gpsd's raw NMEA output
+        gpx_collection = cls(source=f"{host}:{port}", **kwargs)
+        return gpx_collection.start(socket_lines(host, port))
+
+
+def parse_nmea_sentence(line):
+    # Fields of a sentence, or None if its checksum does not match
+    if isinstance(line, bytes):
+        line = line.decode("ascii", errors="ignore")
+    line = line.strip()
+    if not line.startswith("$"): return None
+
+    body, _, checksum = line[1:].partition("*")
+    if checksum:
+        expected = reduce(lambda a, c: a ^ ord(c), body, 0)
+        if int(checksum[:2], 16) != expected: return None
+
+    return body.split(",")
+
+
+def parse_nmea_datetime(date, time_of_day):
+    # ddmmyy and hhmmss(.sss). Two-digit years are pivoted, e.g. 94 to 1994.
+    seconds = float(time_of_day[4:] or 0)
+    year = int(date[4:6])
+    year += 2000 if year < NMEA_CENTURY_PIVOT else 1900
+    return datetime.datetime(
+        year, int(date[2:4]), int(date[0:2]),
+        int(time_of_day[0:2]), int(time_of_day[2:4])
+    ) + datetime.timedelta(seconds=seconds)
+
+
+def parse_nmea_coordinate(value, hemisphere):
+    # (d)ddmm.mmmm to signed decimal degrees
+    degrees_length = value.index(".") - 2
+    degrees = float(value[:degrees_length]) + float(value[degrees_length:]) / 60
+    return -degrees if hemisphere in ("S", "W") else degrees
+
+
+def tail_lines(file_path, stopped, from_start=False, poll_interval=LIVE_GPX_POLL_INTERVAL_IN_SECONDS):
+    # Yields lines appended to a file until stopped is set
+    with open(file_path, "r") as file:
+        if not from_start: file.seek(0, os.SEEK_END)
+
+        partial = ""
+        while not stopped.is_set():
+            line = file.readline()
+            if not line:
+                time.sleep(poll_interval)
+                continue
+            partial += line
+            if partial.endswith("\n"):
+                yield partial
+                partial = ""
+
+
+def socket_lines(host, port):
+    with socket.create_connection((host, port)) as connection:
+        yield from connection.makefile("rb")
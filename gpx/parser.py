@@ -1,58 +1,96 @@
-import datetime
-import gpxpy
-from .wrappers import GPXCollection, GPXEntry
+import datetime, os, re, threading
+import xml.etree.ElementTree as ElementTree
+from array import array
+import numpy as np
+from .wrappers import GPXCollection, GPXTrack
+
+# Process-wide cache of parsed tracks, keyed by path and reused until the
+# file is modified. Tracks are read-only, so collections can share them.
+_track_cache      = {}
+_track_cache_lock = threading.Lock()
 
 
 def parse_gpx_and_sync_now(gpx_file_path):
-    gpx_collection = parse_gpx(gpx_file_path)
-    
-    # Get first entry and get its offset to current time
-    first_entry = gpx_collection.entries[0]
-    time_now = datetime.datetime.now()
-    delta = (time_now - first_entry.dttm)
+    return parse_gpx_and_sync(gpx_file_path, datetime.datetime.now())
+
 
-    for entry in gpx_collection.entries:
-        entry.dttm += delta
+def parse_gpx_and_sync(gpx_file_path, base_time):
+    gpx_collection = parse_gpx(gpx_file_path)
 
-    gpx_collection.start_time = time_now
+    # Offset all entries so that the first one is at base_time
+    gpx_collection.sync(base_time)
 
     return gpx_collection
 
 
-def parse_gpx_and_sync(gpx_file_path, base_time):
-    gpx_collection = parse_gpx(gpx_file_path)
-    
-    # Get first entry and get its offset to current time
-    first_entry = gpx_collection.entries[0]
-    delta = (base_time - first_entry.dttm)
+def parse_gpx(gpx_file_path, use_cache=True):
+    track = load_track(gpx_file_path) if use_cache else read_track(gpx_file_path)
 
-    for entry in gpx_collection.entries:
-        entry.dttm += delta
+    # Start at the first time logged
+    start_time = track.times[0].item()
 
-    gpx_collection.start_time = base_time
+    return GPXCollection(gpx_file_path, start_time, track=track)
 
-    return gpx_collection
+
+def load_track(gpx_file_path):
+    # Parses a GPX file once per modification
+    path = os.path.abspath(gpx_file_path)
+    stat = os.stat(path)
+    version = (stat.st_mtime_ns, stat.st_size)
+
+    with _track_cache_lock:
+        cached = _track_cache.get(path)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+    track = read_track(path)
+
+    with _track_cache_lock:
+        _track_cache[path] = (version, track)
+
+    return track
+
+
+def clear_gpx_cache():
+    with _track_cache_lock:
+        _track_cache.clear()
+
+
+def read_track(gpx_file_path):
+    # Streams the points of the first track into columns, without building
+    # the whole document or an object per point
+    times = []
+    lats, lngs, eles, speeds = array("d"), array("d"), array("d"), array("d")
+
+    point, segment = None, None
+    for event, element in ElementTree.iterparse(gpx_file_path, events=("start", "end")):
+        tag = element.tag.rsplit("}", 1)[-1] # Without the GPX 1.0/1.1 namespace
+
+        if event == "start":
+            if tag == "trkpt": point = {}
+            elif tag == "trkseg": segment = element
+            continue
+
+        if point is not None and tag in ("time", "ele", "speed"):
+            point[tag] = element.text
+        elif tag == "trkpt":
+            times.append(TIMEZONE_PATTERN.sub("", point["time"].strip()))
+            lats.append(float(element.get("lat")))
+            lngs.append(float(element.get("lon")))
+            eles.append(float(point.get("ele", "nan")))
+            speeds.append(float(point.get("speed", "nan")))
+            point = None
+            # Drop parsed points to keep memory flat
+            if segment is not None: segment.remove(element)
+        elif tag == "trk":
+            break # Only the first track is used
+
+    latlngs = np.column_stack((np.frombuffer(lats), np.frombuffer(lngs)))
+    return GPXTrack.create_from_columns(
+        np.array(times, dtype="datetime64[us]"), latlngs,
+        np.frombuffer(eles).copy(), np.frombuffer(speeds).copy()
+    )
 
 
-def parse_gpx(gpx_file_path):
-    # Get GPX file
-    gpx_file = open(gpx_file_path, 'r')
-    gpx_file_obj = gpxpy.parse(gpx_file)
-
-    # Get first time logged
-    start_time = gpx_file_obj.tracks[0].segments[0].points[0].time
-    
-    # Initialize returning object
-    gpx_collection = GPXCollection(gpx_file_path, start_time)
-
-    # Loop over each record in each segment in the first track:
-    for segment in gpx_file_obj.tracks[0].segments:
-        for point in segment.points:
-            new_entry = GPXEntry(
-                point.time.replace(tzinfo=None), 
-                point.latitude, point.longitude,
-                ele=point.elevation, speed=point.speed
-            )
-            gpx_collection.entries.append(new_entry)
-
-    return gpx_collection
\ No newline at end of file
+# Times are kept as logged, like gpxpy's times with their tzinfo removed
+TIMEZONE_PATTERN = re.compile(r"(Z|[+-]\d{2}:?\d{2})$")
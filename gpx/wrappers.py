@@ -1,27 +1,216 @@
 
+import numpy as np
+from .constants import *
+
+
+class GPXTrack:
+    """
+    Columns of the points of a GPX track, sorted by time and read-only so
+    that they can be shared between GPXCollections
+    """
+    def __init__(self, times, latlngs, eles, speeds):
+        self.times   = times   # datetime64[us] as logged
+        self.latlngs = latlngs # (n, 2) float64
+        self.eles    = eles    # NaN where missing
+        self.speeds  = speeds  # NaN where missing
+
+        for column in (self.times, self.latlngs, self.eles, self.speeds):
+            column.flags.writeable = False
+
+    def __len__(self): return len(self.times)
+
+    def __repr__(self): return f"<GPXTrack points:{len(self)}>"
+
+    @classmethod
+    def create_from_points(cls, points):
+        # From (dttm, lat, lng, ele, speed) tuples, ele and speed may be None
+        points = list(points)
+        times   = np.array([p[0] for p in points], dtype="datetime64[us]")
+        latlngs = np.array([(p[1], p[2]) for p in points], dtype=np.float64).reshape(-1, 2)
+        eles    = np.array([np.nan if p[3] is None else p[3] for p in points], dtype=np.float64)
+        speeds  = np.array([np.nan if p[4] is None else p[4] for p in points], dtype=np.float64)
+
+        return cls.create_from_columns(times, latlngs, eles, speeds)
+
+    @classmethod
+    def create_from_columns(cls, times, latlngs, eles, speeds):
+        # GPX files are ordered by time, but keep lookups correct if not
+        if np.any(times[1:] < times[:-1]):
+            order = np.argsort(times, kind="stable")
+            times, latlngs, eles, speeds = times[order], latlngs[order], eles[order], speeds[order]
+
+        return cls(times, latlngs, eles, speeds)
+
+    @property
+    def nbytes(self):
+        return sum(c.nbytes for c in (self.times, self.latlngs, self.eles, self.speeds))
+
+
+class GPXEntries:
+    """
+    A read-only sequence of the GPXEntry views of a GPXCollection, created on access
+    """
+    def __init__(self, gpx_collection):
+        self.gpx_collection = gpx_collection
+
+    def __len__(self): return len(self.gpx_collection.track)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0: index += len(self)
+        if not (0 <= index < len(self)):
+            raise IndexError("GPX entry index out of range")
+        return self.gpx_collection.get_entry(index)
+
+    def __iter__(self):
+        for index in range(len(self)): yield self.gpx_collection.get_entry(index)
+
 
 class GPXCollection:
     """
     A wrapper for a collection of GPX entries
     """
-    def __init__(self, filepath, start_time):
+    def __init__(self, filepath, start_time, track=None, offset=None):
         self.filepath   = filepath
         self.start_time = start_time
 
-        # Initialize empty entries list (ordered)
-        self.entries    = []
+        # Points are stored as columns, and entries are created on access
+        self.track   = track if track is not None else GPXTrack.create_from_points([])
+        self.entries = GPXEntries(self)
+
+        # Shift from the times logged in the track to the times of this collection,
+        # so that re-syncing does not touch the (shared) track
+        self.offset = np.timedelta64(offset or 0, "us")
 
     def __repr__(self): 
         return f"<GPXCollection start:{self.start_time}, entries:{len(self.entries)}>"
 
+    @property
+    def times(self): return self.track.times + self.offset
+
+    @property
+    def latlngs(self): return self.track.latlngs
+
+    @property
+    def eles(self): return self.track.eles
+
+    @property
+    def speeds(self): return self.track.speeds
+
+    def sync(self, base_time):
+        # Shifts all entries so that the first one is at base_time
+        self.offset = np.datetime64(base_time, "us") - self.track.times[0]
+        self.start_time = base_time
+
+    # Lookups below take the track once, so that a track replaced meanwhile
+    # (see gpx.live) cannot mix up indices between columns
+
+    def get_entry(self, index, track=None):
+        track = track if track is not None else self.track
+        ele, speed = track.eles[index], track.speeds[index]
+        return GPXEntry(
+            (track.times[index] + self.offset).item(),
+            float(track.latlngs[index, 0]), float(track.latlngs[index, 1]),
+            ele=None if np.isnan(ele) else float(ele),
+            speed=None if np.isnan(speed) else float(speed)
+        )
+
+    def to_track_times(self, dttms):
+        return np.asarray(dttms, dtype="datetime64[us]") - self.offset
+
+    def get_latest_indices(self, dttms, track=None):
+        # Index of the latest entry at or before each datetime, -1 if none
+        track = track if track is not None else self.track
+        return np.searchsorted(track.times, self.to_track_times(dttms), side="right") - 1
+
     def get_latest_entry(self, dttm=None):
-        if dttm is None: return self.entries[-1] # Return latest by default
-        if dttm < self.entries[0].dttm: # Throw an error if dttm is earlier than first
+        track = self.track
+        if len(track) == 0:
+            raise GPXException("There are no entries yet.")
+        if dttm is None: return self.get_entry(len(track) - 1, track) # Return latest by default
+
+        index = self.get_latest_indices(dttm, track)
+        if index < 0: # Throw an error if dttm is earlier than first
             raise GPXException("There is no matching entry since the provided datetime.")
         
-        entries_before_dttm = [e for e in self.entries if e.dttm <= dttm]
-        
-        return entries_before_dttm[-1] # Return the latest of those entries
+        return self.get_entry(index, track) # Return the latest entry before dttm
+
+    def get_latest_latlngs(self, dttms):
+        # Bulk version of get_latest_entry, returns an (n, 2) array of lat/lngs
+        track   = self.track
+        indices = self.get_latest_indices(dttms, track)
+        if np.any(indices < 0):
+            raise GPXException("There is no matching entry since some of the provided datetimes.")
+
+        return track.latlngs[indices]
+
+    def get_interpolation_weights(self, dttms, mode=INTERPOLATE_LINEAR, track=None):
+        # Index of the entry before each datetime, and how far along (0 to 1)
+        # the segment to the next entry the position is
+        if mode not in (INTERPOLATE_LINEAR, INTERPOLATE_SPEED):
+            raise GPXException(f"Unknown interpolation mode [{mode}].")
+
+        track   = track if track is not None else self.track
+        indices = self.get_latest_indices(dttms, track)
+        if np.any(indices < 0):
+            raise GPXException("There is no matching entry since some of the provided datetimes.")
+
+        # Positions after the last entry stay at the last entry
+        times   = track.times
+        indices = np.minimum(indices, len(times) - 2)
+        if len(times) < 2:
+            return np.zeros_like(indices), np.zeros(indices.shape)
+
+        t  = (self.to_track_times(dttms) - times[indices]) / np.timedelta64(1, "s")
+        dt = (times[indices + 1] - times[indices]) / np.timedelta64(1, "s")
+        with np.errstate(divide="ignore", invalid="ignore"):
+            fraction = np.clip(np.where(dt > 0, t / dt, 1.0), 0.0, 1.0)
+
+        if mode == INTERPOLATE_SPEED:
+            # Assume constant acceleration between the speeds logged at both
+            # ends, and use the share of the segment's distance covered by t
+            v0 = track.speeds[indices]
+            v1 = track.speeds[indices + 1]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                covered  = v0 * fraction * dt + (v1 - v0) * (fraction * dt)**2 / (2 * dt)
+                distance = (v0 + v1) * dt / 2
+                by_speed = covered / distance
+            # Fall back to linear where speeds are missing or the vehicle stood still
+            valid    = np.isfinite(by_speed) & (distance > 0)
+            fraction = np.where(valid, np.clip(by_speed, 0.0, 1.0), fraction)
+
+        return indices, fraction
+
+    def get_interpolated_latlngs(self, dttms, mode=INTERPOLATE_LINEAR):
+        # Bulk version of get_interpolated_entry, returns an (n, 2) array of lat/lngs
+        track = self.track
+        indices, fraction = self.get_interpolation_weights(dttms, mode=mode, track=track)
+        if len(track) < 2: return track.latlngs[indices]
+
+        start, end = track.latlngs[indices], track.latlngs[indices + 1]
+        return start + (end - start) * fraction[..., np.newaxis]
+
+    def get_interpolated_entry(self, dttm, mode=INTERPOLATE_LINEAR):
+        # A new GPXEntry at dttm, between the entries before and after it
+        track = self.track
+        index, fraction = self.get_interpolation_weights(dttm, mode=mode, track=track)
+        if len(track) < 2:
+            entry = self.get_entry(index, track)
+            return GPXEntry(dttm, entry.lat, entry.lng, ele=entry.ele, speed=entry.speed)
+
+        def interpolate(values, fraction):
+            value = values[index] + (values[index + 1] - values[index]) * fraction
+            return None if np.isnan(value) else float(value)
+
+        # Speeds change linearly over time, positions depend on the mode
+        _, time_fraction = self.get_interpolation_weights(dttm, mode=INTERPOLATE_LINEAR, track=track)
+
+        lat, lng = track.latlngs[index] + (track.latlngs[index + 1] - track.latlngs[index]) * fraction
+        return GPXEntry(
+            dttm, float(lat), float(lng),
+            ele=interpolate(track.eles, fraction), speed=interpolate(track.speeds, time_fraction)
+        )
 
 
 class GPXEntry:
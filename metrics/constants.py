@@ -3,8 +3,15 @@ CSV_RESULTS_LOCATION = "experiment-results/"
 CSV_FORMAT_EXPERIMENT = ".experiment.csv"
 CSV_FORMAT_JOBS       = ".jobs.csv"
 CSV_FORMAT_SECTIONS   = ".sections.csv"
+CSV_FORMAT_SUMMARIES  = ".summaries.csv" # Of aggregated looped sections
 
 TSHARK_RESULTS_LOCATION = "experiment-results/"
 TSHARK_RESULTS_FORMAT = "pcap"
 
-PICKLE_LOCATION = "experiment-results/pickles/"
\ No newline at end of file
+PICKLE_LOCATION = "experiment-results/pickles/"
+
+# Timer constants
+LOOPED_SECTIONS_INITIAL_CAPACITY = 64 # Iterations before a looped section's arrays grow
+SECTION_NOT_ENDED                = -1 # End of a looped section that is still running
+HISTOGRAM_PRECISION_BITS         = 7  # Buckets per power of two, as bits: 2**7 keeps latencies within 1%
+SUMMARY_PERCENTILES              = (50, 90, 99)
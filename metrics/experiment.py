@@ -1,6 +1,10 @@
 import datetime, uuid, csv
-from .constants import CSV_FORMAT_EXPERIMENT, CSV_FORMAT_JOBS, CSV_FORMAT_SECTIONS, CSV_RESULTS_LOCATION
+from .constants import CSV_FORMAT_EXPERIMENT, CSV_FORMAT_JOBS, CSV_FORMAT_SECTIONS, CSV_FORMAT_SUMMARIES, CSV_RESULTS_LOCATION, SUMMARY_PERCENTILES
 from edgenet.job import EdgeNetJobResult
+from .time import AggregatedTimerSections
+
+# Columns of aggregated looped sections, after the job ID, call ID and section name
+SUMMARY_STATISTICS = ("count", "mean", "min", "max", *(f"p{q}" for q in SUMMARY_PERCENTILES))
 
 
 class Experiment:
@@ -32,6 +36,7 @@ class Experiment:
         # Store jobs data:
         jobs_data = []
         metrics_data = []
+        summaries_data = []
         for job in self.jobs:
             if not len(job.metrics): continue # No metrics
 
@@ -51,15 +56,28 @@ class Experiment:
                     metrics_data.append(data)
 
                 for name, section_list in metric.looped_sections.items():
-                    for i, section in enumerate(section_list):
+                    if isinstance(section_list, AggregatedTimerSections):
+                        # Only summaries were kept, written to their own CSV. Sections
+                        # without iterations only have a count.
+                        summary = section_list.summary()
+                        data = (
+                            job.job_id, call_id, name,
+                            *(summary.get(statistic) for statistic in SUMMARY_STATISTICS)
+                        )
+                        summaries_data.append(data)
+                        continue
+
+                    for i, elapsed in enumerate(section_list.elapsed.tolist()):
                         data = (
                             job.job_id, call_id, name, i,
-                            section.elapsed
+                            elapsed
                         )
                         metrics_data.append(data)
 
         self.csv_write(jobs_data, results_location, CSV_FORMAT_JOBS)
         self.csv_write(metrics_data, results_location, CSV_FORMAT_SECTIONS)
+        if summaries_data:
+            self.csv_write(summaries_data, results_location, CSV_FORMAT_SUMMARIES)
 
     def csv_write(self, data, results_location, file_suffix):
         with open(f"{results_location}{self.experiment_id}{file_suffix}", "a+") as fp:
@@ -1,17 +1,32 @@
-import time, uuid, datetime, pickle, os
+import time, uuid, datetime, pickle, os, threading
+import numpy as np
 from dateutil.parser import parse as dttm_parse
 from config import *
-from metrics.constants import PICKLE_LOCATION
+from metrics.constants import (
+    PICKLE_LOCATION, LOOPED_SECTIONS_INITIAL_CAPACITY, SECTION_NOT_ENDED,
+    HISTOGRAM_PRECISION_BITS, SUMMARY_PERCENTILES
+)
 
 
 class Timer:
     """
     A class that handles the timing of specific code sections in a given function
     """
-    def __init__(self, function_name, call_id=None):
+    def __init__(self, function_name, call_id=None, aggregate=False, flush_interval=None):
         self.call_id       = call_id or str(uuid.uuid4())
         self.function_name = function_name
 
+        # Looped sections only keep online statistics when aggregated, and
+        # partial metrics are due every flush_interval seconds (see flush_due)
+        self.aggregate      = aggregate
+        self.flush_interval = flush_interval
+        self.last_flushed   = time.monotonic()
+
+        # Sections already sent in a delta and the end of the last delta, see
+        # create_delta, and the perf_counter seconds covered by a delta Timer
+        self.delta_cursors = None
+        self.interval      = None
+
         self.function_time = TimerSection()
         self.function_started = datetime.datetime.now()
         self.function_ended = None
@@ -20,27 +35,45 @@ class Timer:
         self.sections = {}
         self.looped_sections = {}
 
+        # Numbers other than times, e.g. queue depths and dropped frames
+        self.counters = {}
+
+        # Guards sections recorded from several threads against deltas and
+        # dicts being made of them at the same time, see record_looped_section
+        self.lock = threading.RLock()
+
+    def __getstate__(self):
+        # Timers are pickled, e.g. to be relayed from worker processes, without their lock
+        state = self.__dict__.copy()
+        del state["lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.RLock()
+
     def __repr__(self):
         return f"<Timer sections:{self.sections.keys()}, looped:{self.looped_sections.keys()}>"
 
     def end_function(self):
-        for section_id, section in self.sections.items():
-            if section.end is None:
-                raise TimerException(f"Started section [{section_id}] never ended!")
-        for section_id, section_list in self.looped_sections.items():
-            for section in section_list:
+        with self.lock:
+            for section_id, section in self.sections.items():
                 if section.end is None:
+                    raise TimerException(f"Started section [{section_id}] never ended!")
+            for section_id, section_list in self.looped_sections.items():
+                if not section_list.all_ended:
                     raise TimerException(f"Started looped section [{section_id}] never ended!")
-        if self.function_time.end is not None:
-            raise TimerException(f"Attempted to mark end of function call twice.")
-        
-        self.function_time.end_section()
-        self.function_ended = datetime.datetime.now()
+            if self.function_time.end is not None:
+                raise TimerException(f"Attempted to mark end of function call twice.")
+
+            self.function_time.end_section()
+            self.function_ended = datetime.datetime.now()
 
     def start_section(self, section_id):
         if section_id in self.sections: 
             raise TimerException(f"Attempted to start a section ({section_id}) twice.")
-        self.sections[section_id] = TimerSection()
+        with self.lock:
+            self.sections[section_id] = TimerSection()
 
     def end_section(self, section_id):
         if section_id not in self.sections:
@@ -50,42 +83,133 @@ class Timer:
         self.sections[section_id].end_section()
 
     def start_looped_section(self, section_id):
-        if section_id in self.looped_sections: 
-            self.looped_sections[section_id].append(TimerSection())
-        else:
-            self.looped_sections[section_id] = [TimerSection()]
+        self.get_looped_sections(section_id).start_section()
+
+    def record_looped_section(self, section_id, start_ns, end_ns, iterations=1):
+        # Adds an iteration timed elsewhere with perf_counter_ns, e.g. in
+        # another thread. Safe to call from several threads at once, but not
+        # on the same section as start_looped_section. Several iterations
+        # timed together, e.g. the items of a batch, split the time evenly.
+        with self.lock:
+            section_list = self.get_looped_sections(section_id)
+            elapsed_ns = end_ns - start_ns
+            for i in range(iterations):
+                section_list.add_section(
+                    start_ns + elapsed_ns * i // iterations, start_ns + elapsed_ns * (i + 1) // iterations
+                )
 
     def end_looped_section(self, section_id):
-        if section_id not in self.looped_sections:
+        section_list = self.looped_sections.get(section_id)
+        if section_list is None:
             raise TimerException(f"Attempted to end a looped section ({section_id}) that does not exist.")
-
-        last_section = self.looped_sections[section_id][-1] # Get last section of list
-
-        if last_section.end is not None:
+        if not section_list.end_section():
             raise TimerException(f"Attempted to end a looped section ({section_id}) twice.")
 
-        last_section.end_section()
+    def create_looped_sections(self):
+        return AggregatedTimerSections() if self.aggregate else LoopedTimerSections()
+
+    def get_looped_sections(self, section_id):
+        # Looped sections of an ID, added under the lock if they are new
+        section_list = self.looped_sections.get(section_id)
+        if section_list is None:
+            with self.lock:
+                section_list = self.looped_sections.get(section_id)
+                if section_list is None:
+                    section_list = self.looped_sections[section_id] = self.create_looped_sections()
+        return section_list
+
+    def flush_due(self):
+        # True at most once every flush_interval seconds, for sending partial metrics
+        if self.flush_interval is None: return False
+        now = time.monotonic()
+        if now - self.last_flushed < self.flush_interval: return False
+        self.last_flushed = now
+        return True
+
+    def create_delta(self):
+        # A Timer of the same call with what was recorded since the previous
+        # delta: sections that have ended since, and new looped iterations
+        with self.lock:
+            now = time.perf_counter()
+            if self.delta_cursors is None:
+                self.delta_cursors = { "sections": set(), "since": self.function_time.start }
+
+            delta = Timer(self.function_name, self.call_id, aggregate=self.aggregate)
+            delta.function_time    = self.function_time
+            delta.function_started = self.function_started
+            delta.function_ended   = self.function_ended
+
+            delta.counters = self.counters.copy()
+            delta.sections = {
+                section_id: section for section_id, section in self.sections.items()
+                if section.end is not None and section_id not in self.delta_cursors["sections"]
+            }
+            self.delta_cursors["sections"].update(delta.sections)
+
+            delta.looped_sections = {
+                section_id: section_list.create_delta()
+                for section_id, section_list in self.looped_sections.items()
+            }
+
+            delta.interval = (self.delta_cursors["since"], now)
+            self.delta_cursors["since"] = now
+            return delta
+
+    def merge(self, delta):
+        # Adds a Timer from create_delta of the same call, in the order they were created
+        with self.lock:
+            self.function_time    = delta.function_time
+            self.function_started = delta.function_started
+            self.function_ended   = delta.function_ended
+            self.sections.update(delta.sections)
+            self.counters.update(delta.counters)
+
+            for section_id, section_list in delta.looped_sections.items():
+                if section_id not in self.looped_sections:
+                    self.looped_sections[section_id] = type(section_list)()
+                self.looped_sections[section_id].merge(section_list)
+
+            self.interval = delta.interval
+            return self
+
+    def get_throughput(self, section_id):
+        # Iterations of a looped section per second, over the interval of a delta
+        if self.interval is None:
+            raise TimerException("Throughput is only known for Timers from create_delta.")
+        duration = self.interval[1] - self.interval[0]
+        section_list = self.looped_sections.get(section_id, ())
+        return len(section_list) / duration if duration > 0 else 0.0
+
+    def section(self, section_id):
+        # Context manager form of start_section/end_section
+        return TimerSectionContext(self.start_section, self.end_section, section_id)
+
+    def looped_section(self, section_id):
+        # Context manager form of start_looped_section/end_looped_section
+        return self.get_looped_sections(section_id)
 
     def to_dict(self):
-        json_dict                 = self.__dict__.copy()
-        json_dict_sections        = {}
-        json_dict_looped_sections = {}
+        with self.lock:
+            json_dict                 = self.__dict__.copy()
+            json_dict_sections        = {}
+            json_dict_looped_sections = {}
+
+            for section, section_obj in self.sections.items():
+                json_dict_sections[section] = section_obj.to_dict()
 
-        for section, section_obj in self.sections.items():
-            json_dict_sections[section] = section_obj.to_dict()
+            for section, section_list in self.looped_sections.items():
+                json_dict_looped_sections[section] = section_list.to_dict()
 
-        for section, section_list in self.looped_sections.items():
-            json_dict_looped_sections[section] = [
-                s.to_dict() for s in section_list
-            ]
+            json_dict["sections"]         = json_dict_sections
+            json_dict["looped_sections"]  = json_dict_looped_sections
+            json_dict["function_time"]    = self.function_time.to_dict()
+            json_dict["function_started"] = self.function_started.isoformat()
+            # Partial metrics are sent before the function ends
+            json_dict["function_ended"]   = self.function_ended.isoformat() if self.function_ended else None
 
-        json_dict["sections"]         = json_dict_sections
-        json_dict["looped_sections"]  = json_dict_looped_sections
-        json_dict["function_time"]    = self.function_time.to_dict()
-        json_dict["function_started"] = self.function_started.isoformat()
-        json_dict["function_ended"]   = self.function_ended.isoformat()
+            del json_dict["last_flushed"], json_dict["delta_cursors"], json_dict["lock"]
 
-        return json_dict
+            return json_dict
 
     def pickle(self, filename):
         with open(Timer.get_pickle_url(filename), "wb") as f:
@@ -114,7 +238,8 @@ class Timer:
     @classmethod
     def create_from_dict(cls, raw_dict):
         timer = cls(
-            raw_dict["function_name"], raw_dict["call_id"]
+            raw_dict["function_name"], raw_dict["call_id"],
+            aggregate=raw_dict.get("aggregate", False), flush_interval=raw_dict.get("flush_interval")
         )
         timer.function_time = TimerSection.create_from_dict(raw_dict["function_time"])
         timer.sections = {
@@ -122,14 +247,13 @@ class Timer:
             for section, section_dict in raw_dict["sections"].items()
         }
         timer.looped_sections = {
-            section: [
-                TimerSection.create_from_dict(section_dict)
-                for section_dict in section_list
-            ] 
+            section: create_looped_sections_from_dict(section_list)
             for section, section_list in raw_dict["looped_sections"].items()
         }
-        timer.function_started = dttm_parse(raw_dict["function_started"])
-        timer.function_ended   = dttm_parse(raw_dict["function_ended"])
+        timer.function_started = parse_isoformat(raw_dict["function_started"])
+        timer.function_ended   = raw_dict["function_ended"] and parse_isoformat(raw_dict["function_ended"])
+        timer.interval         = raw_dict.get("interval")
+        timer.counters         = raw_dict.get("counters", {})
         return timer
 
 
@@ -137,9 +261,9 @@ class TimerSection:
     """
     A wrapper for a timed section of a code block
     """
-    def __init__(self):
-        self.start = time.perf_counter()
-        self.end   = None
+    def __init__(self, start=None, end=None):
+        self.start = time.perf_counter() if start is None else start
+        self.end   = end
 
     def end_section(self): self.end = time.perf_counter()
 
@@ -151,12 +275,314 @@ class TimerSection:
 
     def to_dict(self): return self.__dict__
 
+    @classmethod
+    def create_from_dict(cls, raw_dict): return cls(raw_dict["start"], raw_dict["end"])
+
+
+class LoopedTimerSections:
+    """
+    The timed iterations of a looped section, stored as pairs of perf_counter_ns
+    readings in arrays that double in size when full. Items are TimerSection
+    views, in seconds like the sections of a Timer. Also a context manager
+    that times one iteration.
+    """
+    def __init__(self, capacity=LOOPED_SECTIONS_INITIAL_CAPACITY):
+        self.starts = np.empty(capacity, dtype=np.int64)
+        self.ends   = np.empty(capacity, dtype=np.int64)
+        self.count  = 0
+        self.sent   = 0 # Iterations already in a delta
+
+    def __len__(self): return self.count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self.count))]
+        if index < 0: index += self.count
+        if not (0 <= index < self.count):
+            raise IndexError("Looped section index out of range")
+
+        end = int(self.ends[index])
+        return TimerSection(int(self.starts[index]) / 1e9, None if end == SECTION_NOT_ENDED else end / 1e9)
+
+    def __iter__(self):
+        for index in range(self.count): yield self[index]
+
+    def __repr__(self): return f"<LoopedTimerSections count:{self.count}>"
+
+    def __enter__(self): self.start_section()
+
+    def __exit__(self, *exc_info):
+        if not self.end_section():
+            raise TimerException("Attempted to end a looped section twice.")
+
+    def start_section(self):
+        count = self.count
+        if count == len(self.starts):
+            self.grow()
+        self.ends[count]   = SECTION_NOT_ENDED
+        self.starts[count] = time.perf_counter_ns()
+        self.count = count + 1
+
+    def add_section(self, start_ns, end_ns):
+        count = self.count
+        if count == len(self.starts):
+            self.grow()
+        self.starts[count], self.ends[count] = start_ns, end_ns
+        self.count = count + 1
+
+    def end_section(self):
+        # Returns False if there is no started section left to end
+        end = time.perf_counter_ns()
+        last = self.count - 1
+        if last < 0 or self.ends[last] != SECTION_NOT_ENDED:
+            return False
+        self.ends[last] = end
+        return True
+
+    def create_delta(self):
+        # Iterations that ended since the previous delta
+        end = self.count
+        if end and self.ends[end - 1] == SECTION_NOT_ENDED: end -= 1
+
+        delta = LoopedTimerSections(capacity=max(end - self.sent, 1))
+        delta.count = end - self.sent
+        delta.starts[:delta.count] = self.starts[self.sent:end]
+        delta.ends[:delta.count]   = self.ends[self.sent:end]
+        self.sent = end
+        return delta
+
+    def merge(self, other):
+        # Appends the iterations of another LoopedTimerSections
+        while len(self.starts) < self.count + other.count:
+            self.grow()
+        self.starts[self.count:self.count + other.count] = other.starts[:other.count]
+        self.ends[self.count:self.count + other.count]   = other.ends[:other.count]
+        self.count += other.count
+        return self
+
+    def grow(self):
+        capacity = max(1, 2 * len(self.starts))
+        for name in ("starts", "ends"):
+            grown = np.empty(capacity, dtype=np.int64)
+            grown[:self.count] = getattr(self, name)[:self.count]
+            setattr(self, name, grown)
+
+    @property
+    def all_ended(self): return not np.any(self.ends[:self.count] == SECTION_NOT_ENDED)
+
+    @property
+    def elapsed(self):
+        # Elapsed seconds of every iteration, as an array
+        if not self.all_ended:
+            raise TimerException("Attempted to get elapsed of a non-finished section.")
+        return (self.ends[:self.count] - self.starts[:self.count]) / 1e9
+
+    def to_dict(self):
+        return {
+            "start_ns": self.starts[:self.count].tolist(),
+            "end_ns": self.ends[:self.count].tolist(),
+        }
+
+    @classmethod
+    def create_from_dict(cls, raw_section_list):
+        if isinstance(raw_section_list, list):
+            # Older Timers sent a list of TimerSection dicts, in seconds
+            starts = np.array([s["start"] for s in raw_section_list], dtype=np.float64)
+            ends   = np.array([s["end"] for s in raw_section_list], dtype=np.float64) # None to NaN
+            starts = np.rint(starts * 1e9).astype(np.int64)
+            ends   = np.where(np.isnan(ends), SECTION_NOT_ENDED, np.rint(ends * 1e9)).astype(np.int64)
+        else:
+            starts = np.array(raw_section_list["start_ns"], dtype=np.int64)
+            ends   = np.array(raw_section_list["end_ns"], dtype=np.int64)
+
+        # The arrays are used as-is, and grow on the next started section
+        section_list = cls(capacity=0)
+        section_list.starts, section_list.ends = starts, ends
+        section_list.count = len(starts)
+        return section_list
+
+
+class AggregatedTimerSections:
+    """
+    The timed iterations of a looped section, kept only as online statistics:
+    count, sum, min and max, and a log-linear (HDR-style) histogram of the
+    elapsed perf_counter_ns of each iteration for percentiles. Its size does
+    not grow with the number of iterations.
+    """
+    def __init__(self):
+        self.count     = 0
+        self.total_ns  = 0
+        self.min_ns    = None
+        self.max_ns    = None
+        self.histogram = {} # Bucket index -> count
+        self.started   = None # perf_counter_ns of the running iteration
+
+        # Statistics already sent in a delta
+        self.sent_count     = 0
+        self.sent_total_ns  = 0
+        self.sent_histogram = {}
+
+    def __len__(self): return self.count
+
+    def __repr__(self): return f"<AggregatedTimerSections count:{self.count}>"
+
+    def __enter__(self): self.start_section()
+
+    def __exit__(self, *exc_info):
+        if not self.end_section():
+            raise TimerException("Attempted to end a looped section twice.")
+
+    def start_section(self):
+        self.started = time.perf_counter_ns()
+
+    def end_section(self):
+        # Returns False if there is no started section left to end
+        end = time.perf_counter_ns()
+        if self.started is None: return False
+        self.record(end - self.started)
+        self.started = None
+        return True
+
+    def add_section(self, start_ns, end_ns): self.record(end_ns - start_ns)
+
+    def record(self, elapsed_ns):
+        self.count    += 1
+        self.total_ns += elapsed_ns
+        if self.min_ns is None or elapsed_ns < self.min_ns: self.min_ns = elapsed_ns
+        if self.max_ns is None or elapsed_ns > self.max_ns: self.max_ns = elapsed_ns
+
+        bucket = get_histogram_bucket(elapsed_ns)
+        self.histogram[bucket] = self.histogram.get(bucket, 0) + 1
+
+    def merge(self, other):
+        # Adds the iterations of another AggregatedTimerSections into this one
+        if not other.count: return self
+        self.count    += other.count
+        self.total_ns += other.total_ns
+        self.min_ns = other.min_ns if self.min_ns is None else min(self.min_ns, other.min_ns)
+        self.max_ns = other.max_ns if self.max_ns is None else max(self.max_ns, other.max_ns)
+        for bucket, count in other.histogram.items():
+            self.histogram[bucket] = self.histogram.get(bucket, 0) + count
+        return self
+
+    def create_delta(self):
+        # Iterations recorded since the previous delta. Its min and max are
+        # those of the whole section so far, so that merging deltas is exact.
+        delta = AggregatedTimerSections()
+        delta.count    = self.count - self.sent_count
+        delta.total_ns = self.total_ns - self.sent_total_ns
+        delta.min_ns, delta.max_ns = self.min_ns, self.max_ns
+        delta.histogram = {
+            bucket: count - self.sent_histogram.get(bucket, 0)
+            for bucket, count in self.histogram.items()
+            if count != self.sent_histogram.get(bucket, 0)
+        }
+
+        self.sent_count, self.sent_total_ns = self.count, self.total_ns
+        self.sent_histogram = self.histogram.copy()
+        return delta
+
+    @property
+    def all_ended(self): return self.started is None
+
+    @property
+    def total(self): return self.total_ns / 1e9
+
+    @property
+    def mean(self):
+        if not self.count: raise TimerException("Attempted to get mean of an empty looped section.")
+        return self.total_ns / self.count / 1e9
+
+    @property
+    def min(self): return None if self.min_ns is None else self.min_ns / 1e9
+
+    @property
+    def max(self): return None if self.max_ns is None else self.max_ns / 1e9
+
+    def percentile(self, q):
+        # Elapsed seconds at the q-th percentile, within the histogram's precision
+        if not self.count: raise TimerException("Attempted to get percentile of an empty looped section.")
+        rank = max(1, int(np.ceil(q / 100 * self.count)))
+        seen = 0
+        for bucket in sorted(self.histogram):
+            seen += self.histogram[bucket]
+            if seen >= rank: break
+        value = min(max(get_histogram_value(bucket), self.min_ns), self.max_ns)
+        return value / 1e9
+
+    def summary(self, percentiles=SUMMARY_PERCENTILES):
+        # Statistics in seconds, e.g. for CSVs and logs
+        if not self.count: return { "count": 0 }
+        summary = { "count": self.count, "mean": self.mean, "min": self.min, "max": self.max }
+        for q in percentiles:
+            summary[f"p{q}"] = self.percentile(q)
+        return summary
+
+    def to_dict(self):
+        buckets = sorted(self.histogram)
+        return {
+            "count": self.count,
+            "total_ns": self.total_ns,
+            "min_ns": self.min_ns,
+            "max_ns": self.max_ns,
+            "buckets": buckets,
+            "counts": [self.histogram[b] for b in buckets],
+        }
+
     @classmethod
     def create_from_dict(cls, raw_dict):
-        section = cls()
-        section.start = raw_dict["start"]
-        section.end   = raw_dict["end"]
-        return section
+        section_list = cls()
+        section_list.count    = raw_dict["count"]
+        section_list.total_ns = raw_dict["total_ns"]
+        section_list.min_ns   = raw_dict["min_ns"]
+        section_list.max_ns   = raw_dict["max_ns"]
+        section_list.histogram = dict(zip(raw_dict["buckets"], raw_dict["counts"]))
+        return section_list
+
+
+def get_histogram_bucket(value):
+    # Values below 2**HISTOGRAM_PRECISION_BITS have a bucket each, larger
+    # ones share a bucket with values of the same leading bits
+    shift = value.bit_length() - HISTOGRAM_PRECISION_BITS
+    if shift <= 0: return value
+    return (shift << HISTOGRAM_PRECISION_BITS) + (value >> shift)
+
+
+def get_histogram_value(bucket):
+    # Middle of the values of a bucket
+    shift = bucket >> HISTOGRAM_PRECISION_BITS
+    if shift == 0: return bucket
+    low = (bucket & ((1 << HISTOGRAM_PRECISION_BITS) - 1)) << shift
+    return low + (1 << (shift - 1))
+
+
+def create_looped_sections_from_dict(raw_section_list):
+    if isinstance(raw_section_list, dict) and "buckets" in raw_section_list:
+        return AggregatedTimerSections.create_from_dict(raw_section_list)
+    return LoopedTimerSections.create_from_dict(raw_section_list)
+
+
+class TimerSectionContext:
+    """
+    A context manager that times the code block within it as a section
+    """
+    __slots__ = ("start", "end", "section_id")
+
+    def __init__(self, start, end, section_id):
+        self.start, self.end, self.section_id = start, end, section_id
+
+    def __enter__(self): self.start(self.section_id)
+
+    def __exit__(self, *exc_info): self.end(self.section_id)
+
+
+def parse_isoformat(value):
+    # datetime.isoformat strings, as sent by Timer.to_dict, are parsed
+    # natively, and anything else by dateutil
+    try:
+        return datetime.datetime.fromisoformat(value)
+    except ValueError:
+        return dttm_parse(value)
 
 
 class TimerException(Exception): pass
@@ -0,0 +1,160 @@
+import threading, time, cv2
+from collections import deque
+
+
+class FrameBuffer:
+    """
+    A bounded ring buffer of captured frames, filled by a capture thread and
+    drained by inference workers. Once full, every new frame drops the oldest
+    one, so that workers fall behind by at most `capacity` frames.
+    """
+    def __init__(self, capacity):
+        self.frames    = deque(maxlen=capacity)
+        self.condition = threading.Condition()
+        self.closed    = False
+
+        # Queue metrics
+        self.captured   = 0
+        self.dropped    = 0
+        self.consumed   = 0
+        self.peak_depth = 0
+
+    def __len__(self): return len(self.frames)
+
+    @property
+    def stats(self):
+        with self.condition:
+            return {
+                "captured": self.captured,
+                "dropped": self.dropped,
+                "consumed": self.consumed,
+                "peak_depth": self.peak_depth,
+            }
+
+    def put(self, frame_counter, frame):
+        # Frames are kept with the perf_counter_ns they were queued at
+        with self.condition:
+            if len(self.frames) == self.frames.maxlen:
+                self.dropped += 1
+            self.frames.append((frame_counter, frame, time.perf_counter_ns()))
+            self.captured  += 1
+            self.peak_depth = max(self.peak_depth, len(self.frames))
+            self.condition.notify()
+
+    def get(self):
+        # Oldest kept frame, or None once the buffer is closed and empty
+        with self.condition:
+            while not self.frames and not self.closed:
+                self.condition.wait()
+            if not self.frames: return None
+            self.consumed += 1
+            return self.frames.popleft()
+
+    def close(self):
+        # Workers finish the frames left, then get None
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def record_stats(self, timer, stage):
+        # Queue metrics as counters of a Timer, e.g. "edge-frame-buffer-dropped"
+        for name, value in self.stats.items():
+            timer.counters[f"{stage}-{name}"] = value
+
+
+def wait_until(deadline):
+    # Sleeps until a time.perf_counter() deadline, if it has not passed yet
+    delay = deadline - time.perf_counter()
+    if delay > 0: time.sleep(delay)
+
+
+class DecimatedCapture:
+    """
+    Iterates over the frames of a cv2.VideoCapture sampled at frames_per_second
+    out of video_fps, as (frame_counter, frame) pairs. Skipped frames are only
+    grabbed, without being retrieved (converted to BGR and copied), or skipped
+    over with a seek for file sources if seek=True. When realtime, frames are
+    not read before they would have been captured by a live camera.
+    """
+    def __init__(
+        self, cap, frames_per_second, video_fps,
+        realtime=True, seek=False, started=None, timer=None, section_id=None
+    ):
+        self.cap        = cap
+        self.video_fps  = video_fps
+        self.realtime   = realtime
+        self.seek       = seek
+        self.started    = started # time.perf_counter() of frame 0, defaults to the first frame read
+
+        # Looped section timing each read (grabs, retrieves and seeks) of the source
+        self.timer      = timer
+        self.section_id = section_id
+
+        self.every_n_frames = frames_per_second / float(video_fps)
+
+        # Capture metrics
+        self.grabbed   = 0
+        self.retrieved = 0
+        self.seeked    = 0
+
+    @property
+    def stats(self):
+        return { "grabbed": self.grabbed, "retrieved": self.retrieved, "seeked": self.seeked }
+
+    def record_stats(self, timer, stage):
+        # Capture metrics as counters of a Timer, e.g. "edge-capture-grabbed"
+        for name, value in self.stats.items():
+            timer.counters[f"{stage}-{name}"] = value
+
+    def __iter__(self):
+        if self.started is None:
+            self.started = time.perf_counter()
+
+        frame_counter = 0 # Frame counter
+        capture_acc = 0
+
+        while self.cap.isOpened():
+            frame_counter += 1
+
+            capture_acc += self.every_n_frames
+            sampled = capture_acc >= 1.0
+            if sampled: capture_acc -= 1.0
+
+            if self.seek and not sampled:
+                continue # Skipped over by the seek below
+
+            if self.realtime:
+                # Make sure we don't "look into the future"
+                wait_until(self.started + frame_counter / self.video_fps)
+
+            read_started = time.perf_counter_ns()
+            if self.seek:
+                ret, frame = self.read_at(frame_counter)
+            elif not sampled:
+                ret, frame = self.cap.grab(), None
+                self.grabbed += 1
+            else:
+                ret = self.cap.grab()
+                frame = self.cap.retrieve()[1] if ret else None
+                self.grabbed   += 1
+                self.retrieved += ret
+            if self.timer is not None:
+                self.timer.record_looped_section(self.section_id, read_started, time.perf_counter_ns())
+
+            if not ret or (sampled and frame is None):
+                break # Execution is finished
+
+            if sampled:
+                yield frame_counter, frame
+
+    def read_at(self, frame_counter):
+        # Frames are counted from 1, and positions from 0. Consecutive
+        # frames are read as they come, without seeking.
+        position = frame_counter - 1
+        if self.cap.get(cv2.CAP_PROP_POS_FRAMES) != position:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, position)
+            self.seeked += 1
+        ret, frame = self.cap.read()
+        self.grabbed   += 1
+        self.retrieved += ret
+        return ret, frame
@@ -1,8 +1,12 @@
-import re, datetime, cv2, numpy as np, tensorflow as tf, subprocess
+import re, datetime, cv2, numpy as np, subprocess
 import sys, socket, time
 from edgenet.job import EdgeNetJobResult
 from gpx import uses_gpx
 from metrics.time import uses_timer, Timer
+from ..capture import DecimatedCapture
+from ..detection import PlateDetector
+from ..interpreter import load_interpreter
+from ..recognition import PlateRecognizer, crop_plate
 from .constants import *
 from config import *
 
@@ -54,21 +58,9 @@ def capture_video(gpxc, timer, stream_url, frames_per_second=CAPTURE_FPS, target
             logging.info("Capture failed!")
         time.sleep(0.001)
 
-    interpreter = tf.lite.Interpreter(model_path=MODEL_PATH)
-    interpreter.allocate_tensors()
+    detector = PlateDetector(load_interpreter(MODEL_PATH))
+    recognizer = PlateRecognizer(load_interpreter(RECOG_MODEL_PATH))
 
-    recog_interpreter = tf.lite.Interpreter(model_path=RECOG_MODEL_PATH)
-    recog_interpreter.allocate_tensors()
-
-    input_details = interpreter.get_input_details()
-    output_details = interpreter.get_output_details()
-
-    recog_input_details = recog_interpreter.get_input_details()
-    recog_output_details = recog_interpreter.get_output_details()
-
-    frame_counter = 0 # Frame counter
-    every_n_frames = frames_per_second/float(VIDEO_FPS) # Check every n frames
-    capture_acc = 0
     start_time = gpxc.start_time
 
     print(start_time.isoformat(), gpxc.start_time.isoformat())
@@ -77,88 +69,55 @@ def capture_video(gpxc, timer, stream_url, frames_per_second=CAPTURE_FPS, target
 
     global gpx_is_set
     if not gpx_is_set:
-        gpxc.start_time = datetime.datetime.now() # TODO: Resync all changes to start_time
+        gpxc.sync(datetime.datetime.now()) # Shifts entries along with start_time
         gpx_is_set = True
 
-    while cap.isOpened():
-
-        frame_counter += 1
-
-        required_delta = datetime.timedelta(
-            seconds=frame_counter / VIDEO_FPS
-        ) # Make sure we don't "look into the future"
-        while (datetime.datetime.now() - start_time) < required_delta:
-            time.sleep(0.03) # "Sleep" lock
-
-        timer.start_looped_section("cloud-opencv-read")
-        ret, frame = cap.read() # Capture each frame of video
-        timer.end_looped_section("cloud-opencv-read")
-
-        capture_acc += every_n_frames
-        if capture_acc < 1.0:
-            continue
-        else:
-            capture_acc -= 1.0        
-
-        #if frame_counter % every_n_frames != 0:
-        #    continue # Only start execution every n frames
-
-        if not ret or frame is None:
-            # raise LPRException("cap.read() returned invalid values!")
-            break # Execution is finished
+    # Only frames sampled at frames_per_second are decoded, paced from start_time
+    capture = DecimatedCapture(
+        cap, frames_per_second, VIDEO_FPS,
+        started=time.perf_counter() - (datetime.datetime.now() - start_time).total_seconds(),
+        timer=timer, section_id="cloud-opencv-read"
+    )
 
+    for frame_counter, frame in capture:
 
         logging.info("[{:06d}][{}fps] Processing frames...".format(frame_counter, frames_per_second))
 
         timer.start_looped_section("cloud-plate-detection")
 
-        # Execute detection:
-        # -- Resize frame to 320x320 square
-        resized = cv2.resize(frame, (320,320), interpolation=cv2.INTER_AREA)
-        input_data = resized.astype(np.float32)          # Set as 3D RGB float array
-        input_data /= 255.                               # Normalize
-        input_data = np.expand_dims(input_data, axis=0)  # Batch dimension (wrap in 4D)
-
-        # Initialize input tensor
-        interpreter.set_tensor(input_details[0]['index'], input_data)
-        interpreter.invoke()
-
-        # Confidence values
-        # output_data = [ n = # of classes [ confidence values of boxes ] ]
+        # Execute detection on a 320x320 square, into reused buffers
+        scores, boxes = detector.detect(frame)
 
-        # details = [
-        #     {"index": [ n = # of classes [ confidence values of boxes ] ]},
-        #     {"index": [ n = # of classes [ details of boxes ] ]}
-        # ]
-        output_data = interpreter.get_tensor(output_details[0]['index'])
+        timer.end_looped_section("cloud-plate-detection")
 
-        # Bounding boxes
-        boxes = interpreter.get_tensor(output_details[1]['index'])
+        # Confidence values of the first class [0], whose crops are recognized as one batch
+        candidates = [(i, confidence) for i, confidence in enumerate(scores) if confidence > BASE_CONFIDENCE]
+        if not candidates: continue
 
-        timer.end_looped_section("cloud-plate-detection")
+        recognition_started = time.perf_counter_ns()
 
-        # For index and confidence value of the first class [0]
-        for i, confidence in enumerate(output_data[0]):
-            if confidence > BASE_CONFIDENCE:
-                timer.start_looped_section("cloud-plate-recognition")
+        # Get exact time captured based on frame # and FPS
+        seconds_elapsed = frame_counter / float(VIDEO_FPS)
+        delta = datetime.timedelta(seconds=seconds_elapsed)
+        time_captured = start_time + delta
 
-                # Get exact time captured based on frame # and FPS
-                seconds_elapsed = frame_counter / float(VIDEO_FPS)
-                delta = datetime.timedelta(seconds=seconds_elapsed)
-                time_captured = start_time + delta
+        plates = recognizer.recognize([crop_plate(frame, boxes[i]) for i, _ in candidates])
+        for plate, (_, confidence) in zip(plates, candidates):
+            record_plate(gpxc, plate, confidence, time_captured, results_list=results_list)
 
-                execute_text_recognition(
-                    recog_interpreter, recog_input_details, recog_output_details,
-                    gpxc, boxes[0][i], frame, confidence, time_captured,
-                    results_list=results_list
-                )
-                timer.end_looped_section("cloud-plate-recognition")
+        # Timed per plate, as before plates were batched
+        timer.record_looped_section(
+            "cloud-plate-recognition", recognition_started, time.perf_counter_ns(), iterations=len(plates)
+        )
 
     logging.info("End of video detected. Ending execution...")
     # Release capturing
     cap.release()
     logging.info("OpenCV capture released.")
 
+    capture.record_stats(timer, "cloud-capture")
+    detector.record_stats(timer, "cloud-detector")
+    recognizer.record_stats(timer, "cloud-recognizer")
     timer.end_function() # Record end of whole function
 
     # # Pickle results
@@ -166,27 +125,7 @@ def capture_video(gpxc, timer, stream_url, frames_per_second=CAPTURE_FPS, target
     return timer, results_list
 
 
-def execute_text_recognition(interpreter, input_details, output_details, gpxc, boxes, frame, confidence, time_captured, results_list=[]):
-    x1, x2, y1, y2 = boxes[1], boxes[3], boxes[0], boxes[2]
-    save_frame = frame[
-        max( 0, int(y1*1079) ) : min( 1079, int(y2*1079) ),
-        max( 0, int(x1*1920) ) : min( 1920, int(x2*1920) )
-    ]
-    confidence_in_100 = int( confidence * 100 )
-
-    # Execute text recognition
-
-    test_image = cv2.resize(save_frame,(94,24))/256
-    test_image = np.expand_dims(test_image,axis=0)
-    test_image = test_image.astype(np.float32)
-    interpreter.set_tensor(input_details[0]['index'], test_image)
-    interpreter.invoke()
-    output_data = interpreter.get_tensor(output_details[0]['index'])
-    decoded = tf.keras.backend.ctc_decode(output_data,(24,),greedy=False)
-    text = ""
-    for i in np.array(decoded[0][0][0]):
-        if i >-1:
-            text += DECODE_DICT[i]
+def record_plate(gpxc, text, confidence, time_captured, results_list=[]):
     # Do nothing if text is empty
     if not len(text): return 
     license_plate = text
@@ -0,0 +1,154 @@
+import heapq
+import numpy as np
+
+# Like tf.keras.backend.ctc_decode, probabilities are decoded as
+# log(probabilities + EPSILON), with a beam of CTC_BEAM_WIDTH
+EPSILON = 1e-7
+CTC_BEAM_WIDTH = 100
+
+
+def ctc_decode(output_data, sequence_length, greedy=False, beam_width=CTC_BEAM_WIDTH):
+    # Label sequences of a (batch, time steps, classes) array of probabilities
+    # whose last class is the blank, decoded from their first sequence_length
+    # steps (one, or one per sample). The top paths of tf.keras.backend.ctc_decode,
+    # without its -1 padding.
+    log_probs = np.log(np.asarray(output_data, dtype=np.float32) + np.float32(EPSILON))
+    sequence_lengths = np.broadcast_to(sequence_length, len(log_probs))
+
+    if greedy:
+        return [ctc_greedy_decode(sample[:length]) for sample, length in zip(log_probs, sequence_lengths)]
+    return [
+        ctc_beam_search_decode(sample[:length], beam_width=beam_width)
+        for sample, length in zip(log_probs, sequence_lengths)
+    ]
+
+
+def ctc_greedy_decode(log_probs):
+    # Most likely class of each (time step, class) row, with repeats merged and blanks removed
+    blank = log_probs.shape[1] - 1
+    best  = log_probs.argmax(axis=1)
+
+    kept = np.ones(len(best), dtype=bool)
+    kept[1:] = best[1:] != best[:-1]
+    return best[kept & (best != blank)].tolist()
+
+
+def ctc_beam_search_decode(log_probs, beam_width=CTC_BEAM_WIDTH, merge_repeated=True):
+    # Most likely label sequence of (time step, class) log probabilities, by
+    # the prefix beam search of TensorFlow's CTCBeamSearchDecoder. Like
+    # tf.compat.v1.nn.ctc_beam_search_decoder, merge_repeated also merges
+    # repeated labels of the decoded beam, even those separated by a blank.
+    blank  = log_probs.shape[1] - 1
+    labels = np.arange(blank)
+
+    # Beams are prefixes of labels (sorted by probability), with the log
+    # probabilities of the paths ending in a blank, or in their last label
+    prefixes = [()]
+    blanks   = np.zeros(1, dtype=np.float32)
+    endings  = np.full(1, -np.inf, dtype=np.float32)
+
+    for step in log_probs:
+        # Log-softmax of the step, as TensorFlow normalizes it
+        step   = step - (step.max() + np.log(np.exp(step - step.max()).sum()))
+        totals = np.logaddexp(blanks, endings)
+
+        beams   = {prefix: i for i, prefix in enumerate(prefixes)}
+        last    = np.array([prefix[-1] if prefix else -1 for prefix in prefixes])
+        parents = np.array([beams.get(prefix[:-1], -1) if prefix else -1 for prefix in prefixes])
+        extended = np.flatnonzero(parents >= 0)
+
+        # Beams go on with a blank, or their last label, which follows a blank
+        # when it is added again after their parent
+        from_parent = np.full(len(prefixes), -np.inf, dtype=np.float32)
+        from_parent[extended] = np.where(
+            last[extended] == last[parents[extended]], blanks[parents[extended]], totals[parents[extended]]
+        )
+        new_endings = np.where(last >= 0, np.logaddexp(endings, from_parent) + step[last], -np.inf)
+        new_blanks  = totals + step[blank]
+
+        # Children of every beam for each label
+        children = step[:blank] + np.where(labels == last[:, None], blanks[:, None], totals[:, None])
+
+        prefixes, blanks, endings = grow_beams(
+            prefixes, parents, last, totals, new_blanks, new_endings, children, beam_width
+        )
+
+    best = prefixes[0] if prefixes else ()
+    if merge_repeated:
+        best = [label for i, label in enumerate(best) if i == 0 or label != best[i - 1]]
+    return list(best)
+
+
+def grow_beams(prefixes, parents, last, totals, new_blanks, new_endings, children, beam_width):
+    # Beams and their children competing for beam_width places, in the order
+    # that CTCBeamSearchDecoder::Step tries them: beams first, then the
+    # children of each beam by label, from the most likely beam down. Whenever
+    # the beam is full, a child takes the place of the least likely leaf.
+    # Like TensorFlow, a beam that lost its place before its parent got to it
+    # has no children of its own.
+    count  = len(prefixes)
+    leaves = list(zip(np.logaddexp(new_blanks, new_endings).tolist(), range(count)))
+    heapq.heapify(leaves)
+
+    # Children of beams, by label
+    beam_children = {}
+    for i in np.flatnonzero(parents >= 0).tolist():
+        beam_children.setdefault(int(parents[i]), {})[int(last[i])] = i
+
+    # The least likely leaf only gets more likely, so children that are not
+    # more likely than it already never get a place
+    bottom = leaves[0][0] if count == beam_width else -np.inf
+    candidates = children > bottom
+    candidates[parents[parents >= 0], last[parents >= 0]] = True
+    rows, labels = np.nonzero(candidates)
+    bounds = np.searchsorted(rows, np.arange(count + 1)).tolist()
+    labels, scores = labels.tolist(), children[rows, labels].tolist()
+
+    # Children that took a place, as their beam and label
+    child_beams, child_labels = [], []
+    evicted, childless = set(), set()
+    full = count == beam_width
+
+    for i, total in enumerate(totals.tolist()):
+        # Beams are sorted, and children are at most as likely as their beam
+        if not total > bottom: break
+        if i in childless: continue
+
+        own = beam_children.get(i)
+        for k in range(bounds[i], bounds[i + 1]):
+            label = labels[k]
+            if own is not None and label in own:
+                # A beam already, unless it lost its place
+                if own[label] in evicted: childless.add(own[label])
+                continue
+
+            score = scores[k]
+            if not score > bottom: continue
+            entry = count + len(child_beams)
+            if full:
+                dropped = heapq.heapreplace(leaves, (score, entry))[1]
+                if dropped < count: evicted.add(dropped)
+            else:
+                heapq.heappush(leaves, (score, entry))
+                full = len(leaves) == beam_width
+            if full: bottom = leaves[0][0]
+
+            child_beams.append(i)
+            child_labels.append(label)
+
+    leaves.sort(key=lambda leaf: (-leaf[0], leaf[1]))
+    kept = np.array([entry for _, entry in leaves])
+    is_beam = kept < count
+    beams, child = kept[is_beam], kept[~is_beam] - count
+    child_beams, child_labels = np.array(child_beams, dtype=int)[child], np.array(child_labels, dtype=int)[child]
+
+    blanks  = np.full(len(kept), -np.inf, dtype=np.float32)
+    endings = np.empty(len(kept), dtype=np.float32)
+    blanks[is_beam], endings[is_beam] = new_blanks[beams], new_endings[beams]
+    endings[~is_beam] = children[child_beams, child_labels]
+
+    # Children come up in the order of the leaves
+    child_prefixes = iter([
+        prefixes[beam] + (label,) for beam, label in zip(child_beams.tolist(), child_labels.tolist())
+    ])
+    return [prefixes[entry] if entry < count else next(child_prefixes) for entry in kept.tolist()], blanks, endings
@@ -0,0 +1,71 @@
+import cv2, numpy as np
+
+
+class FrameNormalizer:
+    """
+    Resizes frames into a preallocated uint8 buffer, and normalizes them into
+    a given float32 array, e.g. a view of an interpreter's input tensor
+    """
+    def __init__(self, width, height, channels=3):
+        self.size    = (int(width), int(height))
+        self.resized = np.empty((height, width, channels), dtype=np.uint8)
+
+        self.allocations = 0 # Frames whose uint8 buffer could not be reused
+
+    def __call__(self, frame, out):
+        resized = cv2.resize(frame, self.size, dst=self.resized, interpolation=cv2.INTER_AREA)
+        if resized is not self.resized:
+            self.allocations += 1 # e.g. a frame with another number of channels
+        # Cast, then divide in place, as a mixed-type ufunc would allocate cast buffers
+        np.copyto(out, resized)
+        np.divide(out, np.float32(255.), out=out)
+
+
+class PlateDetector:
+    """
+    Runs a TFLite plate detection interpreter on frames without allocating per
+    frame. Frames are resized into a preallocated uint8 buffer, normalized
+    straight into the interpreter's float32 input tensor, and outputs are
+    copied into preallocated arrays that the next detect() overwrites.
+    """
+    def __init__(self, interpreter):
+        self.interpreter = interpreter
+        input_details  = interpreter.get_input_details()[0]
+        output_details = interpreter.get_output_details()
+
+        _, height, width, channels = input_details["shape"]
+        self.normalize = FrameNormalizer(width, height, channels)
+
+        # Callables returning views of the interpreter's tensors. Views must
+        # not be held across invoke(), which fails while they are referenced.
+        self.input_tensor   = interpreter.tensor(input_details["index"])
+        self.output_tensors = [interpreter.tensor(details["index"]) for details in output_details[:2]]
+
+        # Confidence values and bounding boxes of the first class, without the batch dimension
+        self.scores, self.boxes = [
+            np.empty(details["shape"][1:], dtype=details["dtype"]) for details in output_details[:2]
+        ]
+
+        self.frames = 0 # Detection metrics
+
+    @property
+    def stats(self):
+        return { "frames": self.frames, "allocations": self.normalize.allocations }
+
+    def record_stats(self, timer, stage):
+        # Detection metrics as counters of a Timer, e.g. "edge-detector-allocations".
+        # Added to the counters, so that the detectors of several workers sum up.
+        for name, value in self.stats.items():
+            key = f"{stage}-{name}"
+            timer.counters[key] = timer.counters.get(key, 0) + value
+
+    def detect(self, frame):
+        # (scores, boxes) of a frame, valid until the next call
+        self.normalize(frame, self.input_tensor()[0])
+        self.interpreter.invoke()
+
+        np.copyto(self.scores, self.output_tensors[0]()[0])
+        np.copyto(self.boxes, self.output_tensors[1]()[0])
+        self.frames += 1
+
+        return self.scores, self.boxes
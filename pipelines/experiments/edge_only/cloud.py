@@ -13,6 +13,9 @@ _parser = ArgParser(description="Execute the hybrid pipeline.")
 _parser.add_argument("--repeats", type=int, dest="REPEATS", default=REPEATS)
 _parser.add_argument("--bwconstraint", type=str, dest="BW_CONSTRAINT", default=BW_CONSTRAINT)
 _parser.add_argument("--port", type=str, dest="SERVER_PORT", default=SERVER_PORT)
+_parser.add_argument("--aggregatemetrics", dest="AGGREGATE_METRICS", action="store_true")
+_parser.add_argument("--workers", type=int, dest="INFERENCE_WORKERS", default=INFERENCE_WORKERS)
+_parser.add_argument("--metricsinterval", type=float, dest="METRICS_INTERVAL_IN_SECONDS", default=METRICS_INTERVAL_IN_SECONDS)
 
 _args = _parser.parse_args()
 
@@ -20,6 +23,9 @@ _args = _parser.parse_args()
 REPEATS       = _args.REPEATS
 BW_CONSTRAINT = _args.BW_CONSTRAINT
 SERVER_PORT   = _args.SERVER_PORT
+AGGREGATE_METRICS = _args.AGGREGATE_METRICS
+METRICS_INTERVAL_IN_SECONDS = _args.METRICS_INTERVAL_IN_SECONDS
+INFERENCE_WORKERS = _args.INFERENCE_WORKERS
 
 # Initialize server
 server = EdgeNetServer("0.0.0.0", SERVER_PORT)
@@ -59,26 +65,27 @@ for iteration in range(REPEATS):
     if BW_CONSTRAINT:
         nmonitor.implement_rate(BW_CONSTRAINT)
 
-    pending_jobs = []
-
-    for session_id in session_ids:
-        iteration_id = f"{session_id}_I{iteration}"
-        job = server.send_command_external(
-            session_id, EDGE_ONLY_FUNCTION_NAME,
-            EXPERIMENT_VIDEO_PATH,
-            is_polling=True, callback=callback, job_id=f"{experiment.experiment_id}_{iteration_id}",
-            frames_per_second=CAPTURE_FPS
-        )
-        # Append jobs containers
-        pending_jobs.append(job)
-        experiment.jobs.append(job)
-
-    for job in pending_jobs:
-        # Wait for job to finish:
-        job.wait_until_finished()
-        # Wait for metrics transmission
-        job.wait_for_metrics()
-        job.results_to_csv()
+    # Send the command to all edges at once
+    job_ids = {
+        session_id: f"{experiment.experiment_id}_{session_id}_I{iteration}"
+        for session_id in session_ids
+    }
+    pending_jobs = server.broadcast_command(
+        session_ids, EDGE_ONLY_FUNCTION_NAME,
+        EXPERIMENT_VIDEO_PATH,
+        is_polling=True, callback=callback, job_ids=job_ids,
+        frames_per_second=CAPTURE_FPS,
+        aggregate_metrics=AGGREGATE_METRICS, metrics_interval=METRICS_INTERVAL_IN_SECONDS,
+        inference_workers=INFERENCE_WORKERS
+    )
+    # Append jobs containers
+    experiment.jobs.extend(pending_jobs)
+
+    # Wait for jobs to finish:
+    pending_jobs.wait_until_finished()
+    # Wait for metrics transmission
+    pending_jobs.wait_for_metrics()
+    pending_jobs.results_to_csv()
 
     # Release constraint if it exists
     if BW_CONSTRAINT:
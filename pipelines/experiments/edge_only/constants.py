@@ -4,3 +4,17 @@ MODEL_PATH = "tensorflow/detect4ph.tflite"
 RECOG_MODEL_PATH = "tensorflow/depthwise_model_randomchars_perspective_tflite.tflite"
 
 ALLOWED_CHARS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0987654321 "
+
+# Edge metrics: aggregated looped sections only ship summaries, and partial
+# metrics are sent every METRICS_INTERVAL_IN_SECONDS while a video is captured
+AGGREGATE_METRICS = False
+METRICS_INTERVAL_IN_SECONDS = None
+
+# Frames are captured in their own thread, and kept in a ring buffer of
+# FRAME_BUFFER_CAPACITY frames for INFERENCE_WORKERS (oldest dropped first)
+INFERENCE_WORKERS = 1
+FRAME_BUFFER_CAPACITY = 2
+
+# Skipped frames of video files are seeked over instead of grabbed, which is
+# faster when sampled frames are further apart than the video's keyframes
+CAPTURE_SEEK = False
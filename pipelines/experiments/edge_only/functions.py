@@ -1,6 +1,10 @@
-import re, datetime, time, cv2, numpy as np, tensorflow as tf
+import re, datetime, time, threading, cv2, numpy as np
 from gpx import uses_gpx
 from metrics.time import uses_timer
+from ..capture import FrameBuffer, DecimatedCapture
+from ..detection import PlateDetector
+from ..interpreter import load_interpreter
+from ..recognition import PlateRecognizer, crop_plate
 from .constants import *
 from config import *
 
@@ -16,129 +20,120 @@ lph_pattern = re.compile("^[A-Z][A-Z][A-Z][0-9][0-9][0-9][0-9]?$")
 # We will relegate adding the uses_sender decorator in client.py
 @uses_timer
 @uses_gpx(GPX_PATH)
-def capture_video(gpxc, timer, sender, video_path, frames_per_second=CAPTURE_FPS, target="all"):
+def capture_video(gpxc, timer, sender, video_path, frames_per_second=CAPTURE_FPS, target="all",
+    aggregate_metrics=AGGREGATE_METRICS, metrics_interval=METRICS_INTERVAL_IN_SECONDS,
+    inference_workers=INFERENCE_WORKERS, buffer_capacity=FRAME_BUFFER_CAPACITY):
+    # Set before any looped section starts
+    timer.aggregate, timer.flush_interval = aggregate_metrics, metrics_interval
+
     # OpenCV initialization
     timer.start_section("edge-initialization")
 
     cap = cv2.VideoCapture(video_path)
-    interpreter = tf.lite.Interpreter(model_path=MODEL_PATH)
-    interpreter.allocate_tensors()
 
-    recog_interpreter = tf.lite.Interpreter(model_path=RECOG_MODEL_PATH)
-    recog_interpreter.allocate_tensors()
+    # Frames are captured in this thread, and inferred on by workers with
+    # their own interpreters, which cannot be shared between threads
+    frames = FrameBuffer(buffer_capacity)
+    errors = []
+    interpreters = [load_interpreters() for _ in range(inference_workers)]
+    workers = [
+        threading.Thread(
+            target=run_inference, args=(gpxc, timer, sender, frames, worker_interpreters, errors),
+            daemon=True
+        )
+        for worker_interpreters in interpreters
+    ]
 
-    input_details = interpreter.get_input_details()
-    output_details = interpreter.get_output_details()
+    print(datetime.datetime.now().isoformat(), gpxc.start_time.isoformat())
 
-    recog_input_details = recog_interpreter.get_input_details()
-    recog_output_details = recog_interpreter.get_output_details()
+    timer.end_section("edge-initialization")
 
-    frame_counter = 0 # Frame counter
-    every_n_frames = frames_per_second/float(VIDEO_FPS) # Check every n frames
-    capture_acc = 0
-    start_time = datetime.datetime.now()
+    for worker in workers: worker.start()
+    capture_frames(timer, sender, cap, frames, frames_per_second)
 
-    print(start_time.isoformat(), gpxc.start_time.isoformat())
+    logging.info("End of video detected. Ending execution...")
+    # Release capturing
+    cap.release()
+    logging.info("OpenCV capture released.")
 
-    timer.end_section("edge-initialization")
+    # Let workers finish the frames left in the buffer
+    frames.close()
+    for worker in workers: worker.join()
+    if errors:
+        raise LPRException(f"Inference worker failed: {errors[0]!r}") from errors[0]
+
+    frames.record_stats(timer, "edge-frame-buffer")
+    for detector, recognizer in interpreters:
+        detector.record_stats(timer, "edge-detector")
+        recognizer.record_stats(timer, "edge-recognizer")
+    timer.end_function() # Record end of whole function
+    sender.send_metrics(timer) # Send metrics to cloud
 
-    while cap.isOpened():
 
-        frame_counter += 1
+def load_interpreters():
+    return PlateDetector(load_interpreter(MODEL_PATH)), PlateRecognizer(load_interpreter(RECOG_MODEL_PATH))
 
-        required_delta = datetime.timedelta(
-            seconds=frame_counter / VIDEO_FPS
-        ) # Make sure we don't "look into the future"
 
-        while (datetime.datetime.now() - start_time) < required_delta:
-            time.sleep(0.03) # Loop while sufficient time has not yet passed
+def capture_frames(timer, sender, cap, frames, frames_per_second):
+    # Producer: reads frames at the video's rate, and queues those sampled at frames_per_second
+    capture = DecimatedCapture(
+        cap, frames_per_second, VIDEO_FPS, seek=CAPTURE_SEEK,
+        timer=timer, section_id="edge-frame-capture"
+    )
 
-        timer.start_looped_section("edge-frame-capture")
-        ret, frame = cap.read() # Capture each frame of video
-        timer.end_looped_section("edge-frame-capture")
+    for frame_counter, frame in capture:
+        if frames.closed: break # An inference worker failed
 
-        capture_acc += every_n_frames
-        if capture_acc < 1.0:
-            continue
-        else:
-            capture_acc -= 1.0    
+        if timer.flush_due():
+            sender.send_metrics(timer, partial=True) # Of a long capture
 
-        if not ret or frame is None:
-            # raise LPRException("cap.read() returned invalid values!")
-            break # Execution is finished
+        frames.put(frame_counter, frame)
 
-        logging.info("[{:06d}][{}fps] Processing frames...".format(frame_counter, frames_per_second))
+    capture.record_stats(timer, "edge-capture")
 
-        timer.start_looped_section("edge-plate-detection")
 
-        # Execute detection:
-        # -- Resize frame to 320x320 square
-        resized = cv2.resize(frame, (320,320), interpolation=cv2.INTER_AREA)
-        input_data = resized.astype(np.float32)          # Set as 3D RGB float array
-        input_data /= 255.                               # Normalize
-        input_data = np.expand_dims(input_data, axis=0)  # Batch dimension (wrap in 4D)
+def run_inference(gpxc, timer, sender, frames, interpreters, errors):
+    # Consumer: detects and recognizes plates in frames from the buffer until it is closed
+    detector, recognizer = interpreters
 
-        # Initialize input tensor
-        interpreter.set_tensor(input_details[0]['index'], input_data)
-        interpreter.invoke()
+    try:
+        while True:
+            item = frames.get()
+            if item is None: break
+            frame_counter, frame, queued_ns = item
 
-        # Confidence values
-        # output_data = [ n = # of classes [ confidence values of boxes ] ]
+            detection_started = time.perf_counter_ns()
+            timer.record_looped_section("edge-frame-queue", queued_ns, detection_started)
 
-        # details = [
-        #     {"index": [ n = # of classes [ confidence values of boxes ] ]},
-        #     {"index": [ n = # of classes [ details of boxes ] ]}
-        # ]
-        output_data = interpreter.get_tensor(output_details[0]['index'])
+            logging.info("[{:06d}] Processing frames...".format(frame_counter))
 
-        # Bounding boxes
-        boxes = interpreter.get_tensor(output_details[1]['index'])
+            # Execute detection on a 320x320 square, into reused buffers
+            scores, boxes = detector.detect(frame)
 
-        timer.end_looped_section("edge-plate-detection")
+            timer.record_looped_section("edge-plate-detection", detection_started, time.perf_counter_ns())
 
-        # For index and confidence value of the first class [0]
-        for i, confidence in enumerate(output_data[0]):
-            if confidence > BASE_CONFIDENCE:
-                timer.start_looped_section("edge-plate-recognition")
+            # Confidence values of the first class [0], whose crops are recognized as one batch
+            candidates = [(i, confidence) for i, confidence in enumerate(scores) if confidence > BASE_CONFIDENCE]
+            if not candidates: continue
 
-                execute_text_recognition_tflite(
-                    sender, gpxc, 
-                    boxes[0][i], frame, confidence,
-                    recog_interpreter, recog_input_details, recog_output_details,
-                    frame_counter
-                )
-                timer.end_looped_section("edge-plate-recognition")
+            recognition_started = time.perf_counter_ns()
 
-    logging.info("End of video detected. Ending execution...")
-    # Release capturing
-    cap.release()
-    logging.info("OpenCV capture released.")
+            plates = recognizer.recognize([crop_plate(frame, boxes[i]) for i, _ in candidates])
+            for plate, (_, confidence) in zip(plates, candidates):
+                send_plate(sender, gpxc, plate, confidence, frame_counter)
 
-    timer.end_function() # Record end of whole function
-    sender.send_metrics(timer) # Send metrics to cloud
+            # Timed per plate, as before plates were batched
+            timer.record_looped_section(
+                "edge-plate-recognition", recognition_started, time.perf_counter_ns(), iterations=len(plates)
+            )
+    except Exception as e:
+        errors.append(e)
+        frames.close() # Stops the other workers too
 
 
-def execute_text_recognition_tflite(sender, gpxc, boxes, frame, confidence, interpreter, input_details, output_details, frame_counter):
-    x1, x2, y1, y2 = boxes[1], boxes[3], boxes[0], boxes[2]
-    save_frame = frame[
-        max( 0, int(y1*1079) ) : min( 1079, int(y2*1079) ),
-        max( 0, int(x1*1920) ) : min( 1920, int(x2*1920) )
-    ]
+def send_plate(sender, gpxc, text, confidence, frame_counter):
     confidence_in_100 = int( confidence * 100 )
 
-    # Execute text recognition
-
-    test_image = cv2.resize(save_frame,(94,24))/256
-    test_image = np.expand_dims(test_image,axis=0)
-    test_image = test_image.astype(np.float32)
-    interpreter.set_tensor(input_details[0]['index'], test_image)
-    interpreter.invoke()
-    output_data = interpreter.get_tensor(output_details[0]['index'])
-    decoded = tf.keras.backend.ctc_decode(output_data,(24,),greedy=False)
-    text = ""
-    for i in np.array(decoded[0][0][0]):
-        if i >-1:
-            text += DECODE_DICT[i]
     # Do nothing if text is empty
     if not len(text): return 
     license_plate = text
@@ -1,5 +1,6 @@
 import threading, subprocess
 from edgenet.server import EdgeNetServer
+from edgenet.constants import ATTACHMENT_RAW, ATTACHMENT_JPEG, ATTACHMENT_PNG
 from config import *
 from .functions import *
 from metrics.experiment import Experiment
@@ -17,13 +18,20 @@ _parser = ArgParser(description="Execute the hybrid pipeline.")
 _parser.add_argument("--repeats", type=int, dest="REPEATS", default=REPEATS)
 _parser.add_argument("--bwconstraint", type=str, dest="BW_CONSTRAINT", default=BW_CONSTRAINT)
 _parser.add_argument("--port", type=str, dest="SERVER_PORT", default=SERVER_PORT)
+_parser.add_argument("--croptransport", type=str, dest="CROP_TRANSPORT", default=CROP_TRANSPORT,
+    choices=[CROP_TRANSPORT_PICKLE, ATTACHMENT_RAW, ATTACHMENT_JPEG, ATTACHMENT_PNG])
+_parser.add_argument("--aggregatemetrics", dest="AGGREGATE_METRICS", action="store_true")
+_parser.add_argument("--metricsinterval", type=float, dest="METRICS_INTERVAL_IN_SECONDS", default=METRICS_INTERVAL_IN_SECONDS)
 
 _args = _parser.parse_args()
 
 # Override config
-REPEATS       = _args.REPEATS
-BW_CONSTRAINT = _args.BW_CONSTRAINT
-SERVER_PORT   = _args.SERVER_PORT
+REPEATS        = _args.REPEATS
+BW_CONSTRAINT  = _args.BW_CONSTRAINT
+SERVER_PORT    = _args.SERVER_PORT
+CROP_TRANSPORT = _args.CROP_TRANSPORT
+AGGREGATE_METRICS = _args.AGGREGATE_METRICS
+METRICS_INTERVAL_IN_SECONDS = _args.METRICS_INTERVAL_IN_SECONDS
 
 # Initialize server
 server = EdgeNetServer("0.0.0.0", SERVER_PORT)
@@ -73,23 +81,28 @@ for iteration in range(REPEATS):
 
             result = job_result.result
 
-            # Sync GPX
+            # Sync GPX, on the cloud's clock so that capture times compare with its own
             if gpxc is None:
                 start_time = dttm_parser.parse(result["start_time"]).replace(tzinfo=None)
-                gpxc = parser.parse_gpx_and_sync(GPX_PATH, start_time)
+                gpxc = parser.parse_gpx_and_sync(GPX_PATH, job_result.to_server_time(start_time))
             
             # Remove "start_time"
             del job_result.result["start_time"]
 
+            # Cropped frame is either pickled in the result, or a binary attachment
+            cropped_frame = result.pop("cropped_frame", None) or job_result.attachments["cropped_frame"]
+
             cloud_metrics.start_looped_section("cloud-recognition")
-            plate_detected, plate_text, lat, lng, conf, r, n = execute_text_recognition_tflite(**result, gpxc=gpxc)
+            plate_detected, plate_text, lat, lng, conf, r, n = execute_text_recognition_tflite(
+                **result, cropped_frame=cropped_frame, gpxc=gpxc
+            )
             cloud_metrics.end_looped_section("cloud-recognition")
             
             if plate_detected:
                 logging.info(f"Recognized plate {plate_text} at {lat}, {lng}! Detected at {job_result.sent_dttm} and recognized at {datetime.now().isoformat()}")
 
             # Modify results for .csv:
-            del job_result.result["cropped_frame"]
+            job_result.attachments.clear()
             job_result.result["time_captured"] = r
             job_result.result["time_now"]      = n
             job_result.result["plate"]         = plate_text
@@ -102,7 +115,8 @@ for iteration in range(REPEATS):
             EXPERIMENT_VIDEO_PATH, 
             is_polling=True, job_id=f"{experiment.experiment_id}_{iteration_id}",
             callback=callback,
-            frames_per_second=CAPTURE_FPS
+            frames_per_second=CAPTURE_FPS, crop_transport=CROP_TRANSPORT,
+            aggregate_metrics=AGGREGATE_METRICS, metrics_interval=METRICS_INTERVAL_IN_SECONDS
         )
 
         # Append job to experiment container
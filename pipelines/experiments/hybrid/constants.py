@@ -3,4 +3,20 @@ EDGE_FUNCTION_NAME = "edge_stream_video"
 MODEL_PATH = "tensorflow/detect4ph.tflite"
 RECOG_MODEL_PATH = "tensorflow/depthwise_model_randomchars_perspective_tflite.tflite"
 
-ALLOWED_CHARS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0987654321 "
\ No newline at end of file
+ALLOWED_CHARS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0987654321 "
+
+# How cropped plates are shipped from the edge to the cloud:
+# -- "pickle": legacy pickled float32 tensor, base64-encoded inside the JSON result
+# -- "raw": uint8 crop as a binary attachment, normalized on the cloud
+# -- "jpg"/"png": uint8 crop compressed into a binary attachment ("jpg" is lossy)
+CROP_TRANSPORT_PICKLE = "pickle"
+CROP_TRANSPORT = "raw"
+
+# Edge metrics: aggregated looped sections only ship summaries, and partial
+# metrics are sent every METRICS_INTERVAL_IN_SECONDS while a video is captured
+AGGREGATE_METRICS = False
+METRICS_INTERVAL_IN_SECONDS = None
+
+# Skipped frames of video files are seeked over instead of grabbed, which is
+# faster when sampled frames are further apart than the video's keyframes
+CAPTURE_SEEK = False
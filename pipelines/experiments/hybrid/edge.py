@@ -1,4 +1,5 @@
 from edgenet.client import EdgeNetClient, EdgeNetMessage
+from edgenet.constants import EXECUTION_THREAD, EXECUTION_PROCESS
 from gpx import uses_gpx
 from config import *
 from .functions import *
@@ -7,20 +8,27 @@ from argparse import ArgumentParser as ArgParser
 # Parse arguments
 _parser = ArgParser(description="Execute the hybrid pipeline.")
 _parser.add_argument("--port", type=str, dest="SERVER_PORT", default=SERVER_PORT)
+_parser.add_argument("--mode", type=str, dest="EXECUTION_MODE", default=EXECUTION_THREAD,
+    choices=[EXECUTION_THREAD, EXECUTION_PROCESS])
+_parser.add_argument("--batchresults", dest="BATCH_RESULTS", action="store_true")
 
 _args = _parser.parse_args()
 
 # Override config
-SERVER_PORT   = _args.SERVER_PORT
+SERVER_PORT    = _args.SERVER_PORT
+EXECUTION_MODE = _args.EXECUTION_MODE
+BATCH_RESULTS  = _args.BATCH_RESULTS
 
 # Initialize client
-client = EdgeNetClient(f"ws://{SERVER_HOSTNAME}:{SERVER_PORT}", session_id=EDGE_IDENTIFICATION)
+client = EdgeNetClient(f"ws://{SERVER_HOSTNAME}:{SERVER_PORT}", session_id=EDGE_IDENTIFICATION,
+    batch_results=BATCH_RESULTS)
 
 # Use decorator
 edge_detection = client.uses_sender(capture_video)
 
 # Register functions
-client.register_function(EDGE_FUNCTION_NAME, edge_detection)
+# -- "process" mode runs each stream in its own worker process
+client.register_function(EDGE_FUNCTION_NAME, edge_detection, mode=EXECUTION_MODE)
 
 # Run client
 client.run()
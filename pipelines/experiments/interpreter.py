@@ -0,0 +1,12 @@
+# Edges only need tflite_runtime, full TensorFlow is used where it is installed instead
+try:
+    from tflite_runtime.interpreter import Interpreter
+except ImportError:
+    import tensorflow as tf
+    Interpreter = tf.lite.Interpreter
+
+
+def load_interpreter(model_path):
+    interpreter = Interpreter(model_path=model_path)
+    interpreter.allocate_tensors()
+    return interpreter
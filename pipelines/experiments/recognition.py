@@ -0,0 +1,103 @@
+import cv2, numpy as np
+from .ctc import ctc_decode
+
+CHARS = "ABCDEFGHIJKLMNPQRSTUVWXYZ0123456789" # exclude I, O
+DECODE_DICT = {i:char for i, char in enumerate(CHARS)}
+
+# Time steps of the recognition model's output that are decoded
+SEQUENCE_LENGTH = 24
+
+
+def crop_plate(frame, box):
+    # Region of a 1080p frame within a detection box of normalized (y1, x1, y2, x2)
+    x1, x2, y1, y2 = box[1], box[3], box[0], box[2]
+    return frame[
+        max( 0, int(y1*1079) ) : min( 1079, int(y2*1079) ),
+        max( 0, int(x1*1920) ) : min( 1920, int(x2*1920) )
+    ]
+
+
+def decode_plates(output_data):
+    # Texts of a batch of recognition outputs, CTC-decoded in one call
+    return ["".join(DECODE_DICT[i] for i in labels) for labels in ctc_decode(output_data, SEQUENCE_LENGTH)]
+
+
+class PlateRecognizer:
+    """
+    Runs a TFLite plate recognition interpreter on all the crops of a frame (or
+    of several frames) at once. The interpreter's input is resized to a batch
+    of crops, grown in powers of two so that tensors are only reallocated when
+    more crops come at once than ever before.
+    """
+    def __init__(self, interpreter):
+        self.interpreter = interpreter
+        input_details = interpreter.get_input_details()[0]
+        self.input_index  = input_details["index"]
+        self.output_index = interpreter.get_output_details()[0]["index"]
+
+        _, height, width, channels = input_details["shape"]
+        self.size  = (int(width), int(height))
+        self.shape = (int(height), int(width), int(channels))
+
+        # Recognition metrics
+        self.batches       = 0
+        self.crops         = 0
+        self.reallocations = 0
+        self.allocations   = 0 # Crops whose uint8 buffer row could not be reused
+
+        self.allocate(1)
+
+    @property
+    def stats(self):
+        return {
+            "batches": self.batches, "crops": self.crops,
+            "reallocations": self.reallocations, "allocations": self.allocations,
+        }
+
+    def record_stats(self, timer, stage):
+        # Recognition metrics as counters of a Timer, e.g. "edge-recognizer-crops".
+        # Added to the counters, so that the recognizers of several workers sum up.
+        for name, value in self.stats.items():
+            key = f"{stage}-{name}"
+            timer.counters[key] = timer.counters.get(key, 0) + value
+
+    def allocate(self, capacity):
+        # Resizes the input to a batch of capacity crops, along with the uint8 buffer they are resized into
+        self.interpreter.resize_tensor_input(self.input_index, [capacity, *self.shape])
+        self.interpreter.allocate_tensors()
+        self.input_tensor = self.interpreter.tensor(self.input_index)
+        self.resized  = np.empty((capacity, *self.shape), dtype=np.uint8)
+        self.capacity = capacity
+
+    def fill(self, crops):
+        # Resizes crops into the uint8 buffer, and normalizes them into the
+        # interpreter's input. Crops past len(crops) are left from earlier batches.
+        for j, crop in enumerate(crops):
+            row = self.resized[j]
+            resized = cv2.resize(crop, self.size, dst=row)
+            if resized is not row:
+                # e.g. a float crop or one with an alpha channel, resized into a new array
+                self.allocations += 1
+                if resized.ndim == 2: resized = resized[..., None]
+                np.copyto(row, resized[..., :self.shape[2]], casting="unsafe")
+
+        batch = self.input_tensor()[:len(crops)]
+        np.copyto(batch, self.resized[:len(crops)])
+        np.divide(batch, np.float32(256.), out=batch)
+
+    def recognize(self, crops):
+        # Texts of uint8 crops, in order
+        if not crops: return []
+
+        if len(crops) > self.capacity:
+            self.allocate(1 << (len(crops) - 1).bit_length())
+            self.reallocations += 1
+
+        self.fill(crops) # Input views are released before invoke()
+        self.interpreter.invoke()
+        output_data = self.interpreter.get_tensor(self.output_index)[:len(crops)]
+
+        self.batches += 1
+        self.crops   += len(crops)
+
+        return decode_plates(output_data)
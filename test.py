@@ -3,12 +3,16 @@ import tests
 
 
 def suite():
+    _capture = unittest.TestLoader().loadTestsFromModule(tests.capture)
+    _ctc = unittest.TestLoader().loadTestsFromModule(tests.ctc)
+    _detection = unittest.TestLoader().loadTestsFromModule(tests.detection)
     _edgenet = unittest.TestLoader().loadTestsFromModule(tests.edgenet)
     _gpx = unittest.TestLoader().loadTestsFromModule(tests.gpx)
     _metrics = unittest.TestLoader().loadTestsFromModule(tests.metrics)
+    _recognition = unittest.TestLoader().loadTestsFromModule(tests.recognition)
     
     return unittest.TestSuite([
-        _edgenet, _gpx, _metrics
+        _capture, _ctc, _detection, _edgenet, _gpx, _metrics, _recognition
     ])
 
 
@@ -1 +1 @@
-from . import edgenet, gpx, metrics
\ No newline at end of file
+from . import capture, ctc, detection, edgenet, gpx, metrics, recognition
\ No newline at end of file
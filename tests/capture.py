@@ -0,0 +1,172 @@
+import unittest
+from unittest.mock import Mock
+import cv2, numpy as np
+from metrics.time import Timer
+from pipelines.experiments.capture import FrameBuffer, DecimatedCapture
+
+# The edge-only pipeline imports pipelines.experiments.interpreter, which picks
+# the Interpreter class of tflite_runtime or TensorFlow on import. Without
+# either, the repository's tensorflow/ model directory imports as a namespace
+# package that has no tf.lite.
+try:
+    from pipelines.experiments.edge_only import functions as edge_only
+except (ImportError, AttributeError):
+    edge_only = None
+
+
+class FakeVideoCapture:
+    """
+    Stands in for a cv2.VideoCapture of a file with `length` frames, whose
+    frames are their index. Keeps the indices of the frames it decoded.
+    """
+    def __init__(self, length):
+        self.length   = length
+        self.position = 0 # Of the next frame
+        self.grabbed  = None # Index of the last grabbed frame
+        self.opened   = True
+        self.decoded  = []
+        self.seeks    = []
+
+    def isOpened(self): return self.opened
+
+    def release(self): self.opened = False
+
+    def grab(self):
+        if self.position >= self.length: return False
+        self.grabbed = self.position
+        self.position += 1
+        return True
+
+    def retrieve(self):
+        if self.grabbed is None: return False, None
+        self.decoded.append(self.grabbed)
+        return True, np.full((2, 2, 3), self.grabbed, dtype=np.uint8)
+
+    def read(self):
+        if not self.grab(): return False, None
+        return self.retrieve()
+
+    def get(self, prop_id):
+        assert prop_id == cv2.CAP_PROP_POS_FRAMES
+        return float(self.position)
+
+    def set(self, prop_id, value):
+        assert prop_id == cv2.CAP_PROP_POS_FRAMES
+        self.seeks.append(int(value))
+        self.position = int(value)
+        return True
+
+
+class TestCapture(unittest.TestCase):
+    def test_decimation_stride(self):
+        """
+        Tests if frames are sampled at frames_per_second out of the video's rate.
+        """
+        cap = FakeVideoCapture(30)
+        capture = DecimatedCapture(cap, 5, 25, realtime=False)
+        self.assertEqual([frame_counter for frame_counter, _ in capture], [5, 10, 15, 20, 25, 30])
+
+        # Sampling rates that do not divide the video's rate alternate strides
+        cap = FakeVideoCapture(20)
+        capture = DecimatedCapture(cap, 2, 5, realtime=False)
+        self.assertEqual([frame_counter for frame_counter, _ in capture], [3, 5, 8, 10, 13, 15, 18, 20])
+
+    def test_only_sampled_frames_retrieved(self):
+        """
+        Tests if skipped frames are only grabbed, and sampled ones are retrieved as they were captured.
+        """
+        cap = FakeVideoCapture(30)
+        capture = DecimatedCapture(cap, 5, 25, realtime=False)
+        frames = list(capture)
+
+        # Frame counters start at 1, frame indices at 0
+        self.assertEqual(cap.decoded, [4, 9, 14, 19, 24, 29])
+        for frame_counter, frame in frames:
+            self.assertTrue(np.all(frame == frame_counter - 1))
+
+        # The end of the stream is grabbed too
+        self.assertEqual(capture.stats, { "grabbed": 31, "retrieved": 6, "seeked": 0 })
+
+    def test_seek(self):
+        """
+        Tests if skipped frames are seeked over when seek=True, but consecutive ones are not.
+        """
+        cap = FakeVideoCapture(12)
+        capture = DecimatedCapture(cap, 1, 3, realtime=False, seek=True)
+        self.assertEqual([frame_counter for frame_counter, _ in capture], [3, 6, 9, 12])
+        self.assertEqual(cap.decoded, [2, 5, 8, 11])
+        self.assertEqual(cap.seeks, [2, 5, 8, 11, 14])
+
+        cap = FakeVideoCapture(3)
+        capture = DecimatedCapture(cap, 1, 1, realtime=False, seek=True)
+        self.assertEqual(len(list(capture)), 3)
+        self.assertEqual(cap.seeks, [])
+
+    def test_end_of_stream(self):
+        """
+        Tests if capture ends with the stream, between or on sampled frames, or once released.
+        """
+        # Between sampled frames
+        cap = FakeVideoCapture(27)
+        capture = DecimatedCapture(cap, 5, 25, realtime=False)
+        self.assertEqual([frame_counter for frame_counter, _ in capture], [5, 10, 15, 20, 25])
+        self.assertEqual(capture.grabbed, 28)
+
+        # On a sampled frame that cannot be retrieved
+        cap = FakeVideoCapture(30)
+        cap.retrieve = Mock(return_value=(False, None))
+        capture = DecimatedCapture(cap, 5, 25, realtime=False)
+        self.assertEqual(list(capture), [])
+        self.assertEqual(capture.grabbed, 5)
+
+        # Once released
+        cap = FakeVideoCapture(30)
+        capture = DecimatedCapture(cap, 5, 25, realtime=False)
+        for frame_counter, _ in capture:
+            if frame_counter == 10: cap.release()
+        self.assertEqual(capture.grabbed, 10)
+
+    def test_read_timing(self):
+        """
+        Tests if every read of the source is timed as a looped section.
+        """
+        timer = Timer("capture")
+        cap = FakeVideoCapture(10)
+        capture = DecimatedCapture(cap, 1, 5, realtime=False, timer=timer, section_id="frame-capture")
+        list(capture)
+
+        self.assertEqual(len(timer.looped_sections["frame-capture"]), 11)
+
+    def test_frame_buffer_closed(self):
+        """
+        Tests if workers get the frames left in a closed buffer, then None, and the capture sees it closed.
+        """
+        frames = FrameBuffer(capacity=2)
+        for frame_counter in range(1, 4): frames.put(frame_counter, None)
+        frames.close()
+
+        self.assertTrue(frames.closed)
+        self.assertEqual([frames.get()[0], frames.get()[0]], [2, 3])
+        self.assertIsNone(frames.get())
+        self.assertEqual(frames.stats, { "captured": 3, "dropped": 1, "consumed": 2, "peak_depth": 2 })
+
+    @unittest.skipIf(edge_only is None, "The edge-only pipeline needs tflite_runtime or TensorFlow")
+    def test_capture_frames_closed(self):
+        """
+        Tests if the edge-only capture stops reading once its frame buffer is closed by a failed worker.
+        """
+        timer = Timer("capture")
+        cap = FakeVideoCapture(100)
+        frames = FrameBuffer(capacity=100)
+
+        put = frames.put
+        def put_then_fail(frame_counter, frame):
+            put(frame_counter, frame)
+            if frames.captured == 3: frames.close()
+        frames.put = put_then_fail
+
+        edge_only.capture_frames(timer, Mock(), cap, frames, edge_only.VIDEO_FPS)
+
+        self.assertEqual(frames.captured, 3)
+        self.assertEqual(len(cap.decoded), 4) # Read before the buffer is checked
+        self.assertEqual(timer.counters["edge-capture-retrieved"], 4)
@@ -0,0 +1,81 @@
+import os
+import itertools
+import unittest
+import numpy as np
+from pipelines.experiments.ctc import ctc_decode, ctc_greedy_decode, ctc_beam_search_decode
+from pipelines.experiments.recognition import decode_plates, DECODE_DICT, SEQUENCE_LENGTH
+
+# Recognition-shaped outputs and the plates tf.keras.backend.ctc_decode decoded
+# them to, recorded with python -m benchmarks.ctc --plates 16 --record <path>
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), "fixtures", "ctc_decode.npz")
+
+
+def one_hot_outputs(path, classes):
+    # Probabilities that follow a path of classes, with some mass on the others
+    outputs = np.full((len(path), classes), 0.01, dtype=np.float32)
+    outputs[np.arange(len(path)), path] = 1 - 0.01 * (classes - 1)
+    return outputs
+
+
+class TestCTC(unittest.TestCase):
+    def test_greedy_decode(self):
+        """
+        Tests if greedy decoding merges repeats and removes blanks.
+        """
+        outputs = one_hot_outputs([0, 0, 3, 1, 1, 3, 1, 2], 4) # 3 is the blank
+        self.assertEqual(ctc_greedy_decode(np.log(outputs)), [0, 1, 1, 2])
+        self.assertEqual(ctc_decode(outputs[None], 8, greedy=True), [[0, 1, 1, 2]])
+
+    def test_beam_search_decode(self):
+        """
+        Tests if beam search finds the most likely labelling where greedy decoding does not.
+        """
+        # "" is the most likely path, but "a" is the most likely labelling (0.64)
+        outputs = np.array([[[0.4, 0.6], [0.4, 0.6]]], dtype=np.float32)
+        self.assertEqual(ctc_decode(outputs, 2, greedy=True), [[]])
+        self.assertEqual(ctc_decode(outputs, 2), [[0]])
+
+    def test_beam_search_merge_repeated(self):
+        """
+        Tests if repeated labels of the decoded beam are merged like tf.keras.backend.ctc_decode does.
+        """
+        outputs = one_hot_outputs([0, 3, 0, 1], 4)
+        self.assertEqual(ctc_beam_search_decode(np.log(outputs), merge_repeated=False), [0, 0, 1])
+        self.assertEqual(ctc_decode(outputs[None], 4), [[0, 1]])
+
+    def test_sequence_length(self):
+        """
+        Tests if only the first sequence_length steps of each sample are decoded.
+        """
+        outputs = np.stack([one_hot_outputs([0, 1, 2], 4), one_hot_outputs([2, 1, 0], 4)])
+        self.assertEqual(ctc_decode(outputs, 2), [[0, 1], [2, 1]])
+        self.assertEqual(ctc_decode(outputs, [3, 1], greedy=True), [[0, 1, 2], [2]])
+
+    def test_beam_search_exhaustive(self):
+        """
+        Tests if a beam wide enough for every prefix finds the most likely labelling.
+        """
+        rng = np.random.default_rng(0)
+        steps, classes = 5, 4
+        for _ in range(20):
+            outputs = rng.dirichlet(np.full(classes, 0.5), size=steps)
+
+            # Sum the probabilities of every path by its labelling
+            labellings = {}
+            for path in itertools.product(range(classes), repeat=steps):
+                labelling = tuple(c for i, c in enumerate(path) if c != classes - 1 and (i == 0 or c != path[i - 1]))
+                labellings[labelling] = labellings.get(labelling, 0) + np.prod(outputs[np.arange(steps), path])
+
+            expected = max(labellings, key=labellings.get)
+            decoded  = ctc_beam_search_decode(np.log(outputs), beam_width=1000, merge_repeated=False)
+            self.assertAlmostEqual(labellings[tuple(decoded)], labellings[expected], places=6)
+
+    def test_tensorflow_fixture(self):
+        """
+        Tests if plates are decoded to the same texts as TensorFlow decoded them to.
+        """
+        with np.load(FIXTURE_PATH) as fixture:
+            outputs = fixture["outputs"]
+            greedy = ["".join(DECODE_DICT[i] for i in labels) for labels in ctc_decode(outputs, SEQUENCE_LENGTH, greedy=True)]
+            self.assertEqual(greedy, fixture["greedy"].tolist())
+            self.assertEqual(decode_plates(outputs), fixture["beam_search"].tolist())
@@ -0,0 +1,102 @@
+import weakref
+import unittest
+import cv2, numpy as np
+from pipelines.experiments.detection import PlateDetector
+
+
+class StubDetectionInterpreter:
+    """
+    Stands in for a TFLite detection interpreter, whose scores are the mean of
+    its input and boxes the first pixel of it. Like TFLite, invoke() fails
+    while views from tensor() are still referenced.
+    """
+    def __init__(self, size=320, detections=10):
+        self.tensors = {
+            0: np.zeros((1, size, size, 3), dtype=np.float32),
+            1: np.zeros((1, detections), dtype=np.float32),
+            2: np.zeros((1, detections, 4), dtype=np.float32),
+        }
+        self.invocations = 0
+        self.views = [] # Weak references to the views handed out
+
+    def get_input_details(self):
+        return [{ "index": 0, "shape": np.array(self.tensors[0].shape), "dtype": np.float32 }]
+
+    def get_output_details(self):
+        return [
+            { "index": index, "shape": np.array(self.tensors[index].shape), "dtype": np.float32 }
+            for index in (1, 2)
+        ]
+
+    def tensor(self, index):
+        def view():
+            array = self.tensors[index][:]
+            self.views.append(weakref.ref(array))
+            return array
+        return view
+
+    def invoke(self):
+        if any(view() is not None for view in self.views):
+            raise RuntimeError("Tensors are still referenced by views")
+        self.views = []
+
+        self.invocations += 1
+        self.tensors[1][:] = self.tensors[0].mean()
+        self.tensors[2][:] = self.tensors[0][0, 0, 0, 0]
+
+
+def prepare_legacy(frame, size=320):
+    # The input detection was prepared with before buffers were reused
+    resized = cv2.resize(frame, (size, size), interpolation=cv2.INTER_AREA)
+    return (resized.astype(np.float32) / 255.)[None]
+
+
+class TestDetection(unittest.TestCase):
+    def test_detect_reuses_buffers(self):
+        """
+        Tests if the input and output buffers are reused across frames, and views released before invoke().
+        """
+        interpreter = StubDetectionInterpreter()
+        detector = PlateDetector(interpreter)
+        rng = np.random.default_rng(0)
+
+        resized = detector.normalize.resized
+        input_tensor = interpreter.tensors[0]
+        for _ in range(3):
+            frame = rng.integers(0, 256, size=(1080, 1920, 3), dtype=np.uint8)
+            scores, boxes = detector.detect(frame)
+
+            # Normalized into the interpreter's own input, as before
+            self.assertTrue(np.array_equal(interpreter.tensors[0], prepare_legacy(frame)))
+            self.assertTrue(np.allclose(scores, interpreter.tensors[0].mean()))
+            self.assertTrue(np.all(boxes == interpreter.tensors[0][0, 0, 0, 0]))
+
+            self.assertIs(scores, detector.scores)
+            self.assertIs(boxes, detector.boxes)
+
+        self.assertIs(detector.normalize.resized, resized)
+        self.assertIs(interpreter.tensors[0], input_tensor)
+        self.assertEqual(scores.shape, (10,))
+        self.assertEqual(boxes.shape, (10, 4))
+        self.assertEqual(detector.stats, { "frames": 3, "allocations": 0 })
+        self.assertEqual(interpreter.invocations, 3)
+
+        # Frames of other sizes are resized into the same buffer
+        detector.detect(np.zeros((720, 1280, 3), dtype=np.uint8))
+        self.assertEqual(detector.stats["allocations"], 0)
+
+    def test_detect_fallback_allocations(self):
+        """
+        Tests if frames of another dtype are still detected, through a new buffer counted as an allocation.
+        """
+        interpreter = StubDetectionInterpreter()
+        detector = PlateDetector(interpreter)
+        rng = np.random.default_rng(0)
+
+        frame = rng.integers(0, 256, size=(1080, 1920, 3)).astype(np.float32)
+        detector.detect(frame)
+        self.assertTrue(np.allclose(interpreter.tensors[0], prepare_legacy(frame)))
+
+        detector.detect(frame.astype(np.uint16))
+        detector.detect(frame.astype(np.uint8))
+        self.assertEqual(detector.stats, { "frames": 3, "allocations": 2 })
@@ -1,10 +1,17 @@
-import unittest, threading, time, datetime
+import unittest, threading, time, datetime, asyncio, os
 from unittest.mock import patch, Mock, call
 import websockets
-from edgenet.client import EdgeNetClient
-from edgenet.server import EdgeNetServer
+import numpy as np
+from edgenet.client import EdgeNetClient, EdgeNetClientException
+from edgenet.server import EdgeNetServer, EdgeNetServerException
 from edgenet.session import EdgeNetSession
 from edgenet.message import EdgeNetMessage
+from edgenet.job import EdgeNetJob, EdgeNetJobGroup, EdgeNetJobResult, EdgeNetJobException
+from edgenet.attachment import EdgeNetAttachment, EdgeNetAttachmentException
+from edgenet.executor import EdgeNetExecutor, EdgeNetExecutorException, call_in_process
+from edgenet.compression import EdgeNetCompression, ThresholdPerMessageDeflate, EdgeNetCompressionException
+from edgenet.clock import EdgeNetClock, EdgeNetClockException
+from edgenet.codec import AVAILABLE_CODECS, JSONCodec, negotiate_codec, EdgeNetCodecException, get_codec
 from edgenet.constants import *
 from metrics.time import uses_timer, Timer, TimerSection
 
@@ -80,6 +87,225 @@ class TestNetwork(unittest.TestCase):
 
         self.assertTrue(client.connection.closed)
 
+    def test_server_client_codec_negotiation(self):
+        """
+        Tests if the server and client agree on a wire codec during handshake.
+        """
+        client = EdgeNetClient(self.server_url)
+        legacy_client = EdgeNetClient(self.server_url, codecs=[CODEC_JSON])
+
+        client.run(run_forever=False)
+        legacy_client.run(run_forever=False)
+        self.server.sleep(0.1)
+
+        expected_codec = negotiate_codec(WIRE_CODECS, WIRE_CODECS)
+        self.assertIs(client.codec, expected_codec)
+        self.assertIs(self.server.sessions[client.session_id].codec, expected_codec)
+
+        self.assertIs(legacy_client.codec, JSONCodec)
+        self.assertIs(self.server.sessions[legacy_client.session_id].codec, JSONCodec)
+
+        client.close()
+        legacy_client.close()
+
+    def test_server_client_clock_sync(self):
+        """
+        Tests if the server estimates a client's clock offset after handshake, and attaches it to results.
+        """
+        client = EdgeNetClient(self.server_url)
+        client.run(run_forever=False)
+
+        function_name = "poll_once"
+
+        @client.uses_sender
+        def poll_once(sender):
+            sender.send_result(1)
+
+        client.register_function(function_name, poll_once)
+        self.server.sleep(0.1)
+
+        session = self.server.sessions[client.session_id]
+        self.assertTrue(session.clock.synchronized)
+        self.assertEqual(len(session.clock.samples), CLOCK_SYNC_HANDSHAKE_SAMPLES)
+        # Both ends share a clock here
+        self.assertLess(abs(session.clock_offset), session.round_trip_time + 0.01)
+        self.assertGreaterEqual(session.round_trip_time, 0.0)
+
+        job = self.server.send_command_external(client.session_id, function_name, is_polling=True)
+        self.server.sleep(0.3)
+        job.wait_until_finished(timeout=1)
+
+        self.assertEqual(job.results[0].clock_offset, session.clock_offset)
+        self.assertGreaterEqual(job.results[0].latency, -0.01)
+
+        # Periodic CLOCK requests stop once the client disconnects
+        clock_task = session.clock_task
+        self.assertFalse(clock_task.done())
+
+        client.close()
+        self.server.sleep(0.1)
+
+        self.assertIsNone(session.clock_task)
+        self.assertTrue(clock_task.cancelled())
+
+    def test_server_client_compression(self):
+        """
+        Tests if frames above the compression threshold are compressed on the wire.
+        """
+        client = EdgeNetClient(self.server_url, compression=EdgeNetCompression(threshold=256))
+        uncompressed_client = EdgeNetClient(self.server_url, compression=EdgeNetCompression(enabled=False))
+
+        client.run(run_forever=False)
+        uncompressed_client.run(run_forever=False)
+        self.server.sleep(0.1)
+
+        function_name = "poll_compressible"
+        results = ["a" * 1024, "b"]
+
+        @client.uses_sender
+        def poll_compressible(sender):
+            for result in results:
+                sender.send_result(result)
+
+        client.register_function(function_name, poll_compressible)
+
+        job = self.server.send_command_external(client.session_id, function_name, is_polling=True)
+        self.server.sleep(0.3)
+        job.wait_until_finished(timeout=1)
+
+        # Results arrive intact either way
+        self.assertEqual(job.raw_results, results)
+
+        # Large RESULT compressed, handshake/short RESULT/FINISH sent as-is
+        stats = client.compression_stats
+        self.assertEqual(stats["frames_compressed"], 1)
+        self.assertGreater(stats["frames_skipped"], 0)
+        self.assertGreater(stats["bytes_saved"], 900)
+
+        self.assertIsNone(uncompressed_client.compression_stats)
+        self.assertIsNone(self.server.sessions[uncompressed_client.session_id].compression_stats)
+        self.assertIsNotNone(self.server.sessions[client.session_id].compression_stats)
+
+        client.close()
+        uncompressed_client.close()
+
+    def test_server_broadcast_command(self):
+        """
+        Tests sending the same command to many sessions at once.
+        """
+        clients = [EdgeNetClient(self.server_url) for _ in range(3)]
+        for client in clients:
+            client.run(run_forever=False)
+            client.register_function("add", lambda x, y: x + y)
+        self.server.sleep(0.1)
+
+        session_ids = [client.session_id for client in clients]
+        group = self.server.broadcast_command(
+            session_ids + ["unknown-session"], "add", 2, 3,
+            job_ids={ session_ids[0]: "named-job" }
+        )
+
+        # Unknown sessions are reported instead of failing the whole group
+        self.assertEqual(len(group), 3)
+        self.assertIn("unknown-session", group.errors)
+        self.assertEqual(group[session_ids[0]].job_id, "named-job")
+
+        self.server.sleep(0.3)
+        group.wait_until_finished(timeout=1)
+
+        self.assertEqual(group.progress, (3, 3))
+        self.assertEqual([r.result for r in group.results], [5, 5, 5])
+        self.assertEqual({r.session_id for r in group.results}, set(session_ids))
+
+        for client in clients:
+            client.close()
+
+    def test_server_broadcast_command_from_threads(self):
+        """
+        Tests broadcasting commands from many threads at once.
+        """
+        client = EdgeNetClient(self.server_url)
+        client.run(run_forever=False)
+        client.register_function("identity", lambda x: x)
+        self.server.sleep(0.1)
+
+        groups = {}
+        def broadcast(i):
+            groups[i] = self.server.broadcast_command([client.session_id], "identity", i)
+
+        threads = [threading.Thread(target=broadcast, args=(i,)) for i in range(8)]
+        for thread in threads: thread.start()
+        for thread in threads: thread.join(timeout=1)
+
+        self.server.sleep(0.3)
+
+        for i, group in groups.items():
+            group.wait_until_finished(timeout=1)
+            self.assertEqual(group[client.session_id].raw_results, [i])
+        self.assertEqual(len(groups), 8)
+
+        client.close()
+
+    def test_server_submit_command_from_threads(self):
+        """
+        Tests if commands submitted from many threads are sent on the server's loop.
+        """
+        client = EdgeNetClient(self.server_url)
+        client.run(run_forever=False)
+        client.register_function("identity", lambda x: x)
+        self.server.sleep(0.1)
+
+        send_threads = []
+        send_message = self.server.send_message
+        async def record_send_thread(*args, **kwargs):
+            send_threads.append(threading.current_thread())
+            return await send_message(*args, **kwargs)
+
+        with patch.object(self.server, "send_message", side_effect=record_send_thread):
+            futures = {}
+            def submit(i):
+                futures[i] = self.server.submit_command(client.session_id, "identity", i)
+
+            threads = [threading.Thread(target=submit, args=(i,)) for i in range(8)]
+            for thread in threads: thread.start()
+            for thread in threads: thread.join(timeout=1)
+
+            jobs = { i: future.result(timeout=1) for i, future in futures.items() }
+
+        # Every websocket send happened in the server's thread
+        self.assertEqual(set(send_threads), {self.server_thread})
+
+        self.server.sleep(0.3)
+        for i, job in jobs.items():
+            job.wait_until_finished(timeout=1)
+            self.assertEqual(job.raw_results, [i])
+
+        client.close()
+
+    def test_server_blocking_call_in_loop(self):
+        """
+        Tests if blocking calls from the server's own loop are refused instead of deadlocking.
+        """
+        async def call_blocking():
+            self.server.send_command_external("abcdef", "my_function")
+
+        future = self.server.run_in_loop(call_blocking())
+        self.assertRaises(EdgeNetServerException, future.result, timeout=1)
+
+    def test_client_send_threadsafe_in_loop(self):
+        """
+        Tests if threadsafe sends from the client's own loop are refused instead of deadlocking.
+        """
+        client = EdgeNetClient(self.server_url)
+        client.run(run_forever=False)
+
+        async def send_blocking():
+            client.send_threadsafe(EdgeNetMessage.create_result_message(client.session_id, "abcdef", 0))
+
+        self.assertRaises(EdgeNetClientException, client.loop.run_until_complete, send_blocking())
+
+        client.close()
+
     def test_server_client_terminate(self):
         """
         Tests the server's termination procedure.
@@ -202,9 +428,9 @@ class TestNetwork(unittest.TestCase):
         for i in range(3):
             self.assertIn(i, job.raw_results)
 
-        # Check if threads have closed
-        for thread in client.job_threads[job.job_id]:
-            self.assertFalse(thread.is_alive())
+        # Queued sends are released once the job has waited on them
+        job.wait_until_finished()
+        self.assertNotIn(job.job_id, client.job_sends)
 
     def test_server_client_command_polling_finishes(self):
         """
@@ -235,11 +461,9 @@ class TestNetwork(unittest.TestCase):
         for i in range(3):
             self.assertIn(i, job.raw_results)
 
-        # Check if threads have closed
-        for thread in client.job_threads[job.job_id]:
-            self.assertFalse(thread.is_alive())
-            
+        # Queued sends are released once the job has waited on them
         job.wait_until_finished()
+        self.assertNotIn(job.job_id, client.job_sends)
 
     def test_server_client_command_polling_with_args_kwargs(self):
         """
@@ -278,9 +502,9 @@ class TestNetwork(unittest.TestCase):
         for result in expected_results:
             self.assertIn(result, job.raw_results)
 
-        # Check if threads have closed
-        for thread in client.job_threads[job.job_id]:
-            self.assertFalse(thread.is_alive())
+        # Queued sends are released once the job has waited on them
+        job.wait_until_finished()
+        self.assertNotIn(job.job_id, client.job_sends)
 
     def test_server_client_command_polling_with_multiple_clients(self):
         """
@@ -333,11 +557,41 @@ class TestNetwork(unittest.TestCase):
         for result in expected_results_2:
             self.assertIn(result, job_2.raw_results)
 
-        # Check if threads have closed
-        for thread in client_1.job_threads[job_1.job_id]:
-            self.assertFalse(thread.is_alive())
-        for thread in client_2.job_threads[job_2.job_id]:
-            self.assertFalse(thread.is_alive())
+        # Queued sends are released once the job has waited on them
+        job_1.wait_until_finished()
+        job_2.wait_until_finished()
+        self.assertNotIn(job_1.job_id, client_1.job_sends)
+        self.assertNotIn(job_2.job_id, client_2.job_sends)
+
+    def test_server_client_command_polling_attachments(self):
+        """
+        Tests if result attachments sent by polling commands reach the job results
+        """
+        client = EdgeNetClient(self.server_url)
+        client.run(run_forever=False)
+
+        function_name = "poll_arrays"
+        arrays = [np.full((24, 94, 3), i, dtype=np.uint8) for i in range(3)]
+
+        @client.uses_sender
+        def poll_arrays(sender):
+            for i, array in enumerate(arrays):
+                sender.send_result(i, attachments={"array": array})
+
+        client.register_function(function_name, poll_arrays)
+
+        self.server.sleep(0.1)
+
+        job = self.server.send_command_external(
+            client.session_id, function_name, is_polling=True
+        )
+
+        self.server.sleep(0.5)
+
+        # Check correctness of results and their attachments
+        self.assertEqual(job.raw_results, [0, 1, 2])
+        for i, result in enumerate(job.results):
+            np.testing.assert_array_equal(result.attachments["array"].to_ndarray(), arrays[i])
 
     def test_server_client_command_callback(self):
         """
@@ -403,15 +657,44 @@ class TestNetwork(unittest.TestCase):
         for i in range(3):
             self.assertIn(i, job.raw_results)
 
-        # Check if threads have closed
-        for thread in client.job_threads[job.job_id]:
-            self.assertFalse(thread.is_alive())
+        # Queued sends are released once the job has waited on them
+        job.wait_until_finished()
+        self.assertNotIn(job.job_id, client.job_sends)
 
         # Check if callback is called with all results:
         callback.assert_has_calls(
             [call(result) for result in job.results]
         )
 
+    def test_server_client_command_polling_ordered(self):
+        """
+        Tests if results of a polling command arrive in the order they were sent
+        """
+        client = EdgeNetClient(self.server_url)
+        client.run(run_forever=False)
+
+        function_name = "poll_many_times"
+        times = 100
+
+        @client.uses_sender
+        def poll_many_times(sender):
+            for i in range(times):
+                sender.send_result(i)
+
+        client.register_function(function_name, poll_many_times)
+
+        self.server.sleep(0.1)
+
+        job = self.server.send_command_external(
+            client.session_id, function_name, is_polling=True
+        )
+
+        self.server.sleep(0.5)
+
+        # Check if results are complete and in order
+        self.assertEqual(job.raw_results, list(range(times)))
+        job.wait_until_finished()
+
     def test_server_client_asyncio(self):
         """
         Tests if client can handle receiving commands simultaneously
@@ -449,6 +732,286 @@ class TestNetwork(unittest.TestCase):
             self.assertIn(expected_results[i], jobs[i].raw_results)
 
 
+    def test_server_client_command_polling_process(self):
+        """
+        Tests polling commands executed in a worker process, with metrics
+        """
+        client = EdgeNetClient(self.server_url)
+        client.run(run_forever=False)
+
+        function_name = "poll_in_process"
+
+        @client.uses_sender
+        @uses_timer
+        def poll_in_process(timer, sender):
+            for i in range(3):
+                timer.start_looped_section("looped")
+                sender.send_result((i, os.getpid()))
+                timer.end_looped_section("looped")
+            timer.end_function()
+            sender.send_metrics(timer)
+
+        client.register_function(function_name, poll_in_process, mode=EXECUTION_PROCESS)
+
+        self.server.sleep(0.1)
+
+        job = self.server.send_command_external(
+            client.session_id, function_name, is_polling=True
+        )
+
+        self.server.sleep(0.5)
+
+        job.wait_until_finished(timeout=1)
+        job.wait_for_metrics(timeout=1)
+
+        # Check results, which should come from another process
+        self.assertEqual([r[0] for r in job.raw_results], [0, 1, 2])
+        for _, pid in job.raw_results:
+            self.assertNotEqual(pid, os.getpid())
+
+        _timer = [*job.metrics.values()][0]
+        self.assertEqual(len(_timer.looped_sections["looped"]), 3)
+
+    def test_server_client_command_fails(self):
+        """
+        Tests if commands that raise fail their job with the client's traceback, instead of never finishing
+        """
+        client = EdgeNetClient(self.server_url)
+        client.run(run_forever=False)
+
+        def divide_by_zero(a):
+            return a / 0
+
+        client.register_function("divide_by_zero", divide_by_zero)
+
+        self.server.sleep(0.1)
+
+        job = self.server.send_command_external(
+            client.session_id, "divide_by_zero", 1, is_polling=False
+        )
+
+        self.server.sleep(0.2)
+
+        with self.assertRaises(EdgeNetJobException) as context:
+            job.wait_until_finished(timeout=1)
+        self.assertIn("ZeroDivisionError", str(context.exception))
+        self.assertTrue(job.failed)
+        self.assertEqual(job.raw_results, [])
+
+    def test_server_client_command_polling_process_fails(self):
+        """
+        Tests if polling commands whose worker process dies fail their job, with the results sent before
+        """
+        client = EdgeNetClient(self.server_url)
+        client.run(run_forever=False)
+
+        function_name = "poll_then_exit"
+
+        @client.uses_sender
+        def poll_then_exit(sender):
+            sender.send_result(0)
+            os._exit(3)
+
+        client.register_function(function_name, poll_then_exit, mode=EXECUTION_PROCESS)
+
+        self.server.sleep(0.1)
+
+        job = self.server.send_command_external(
+            client.session_id, function_name, is_polling=True
+        )
+
+        self.server.sleep(0.5)
+
+        with self.assertRaises(EdgeNetJobException) as context:
+            job.wait_until_finished(timeout=1)
+        self.assertIn("exited with code 3", str(context.exception))
+        self.assertEqual(job.raw_results, [0])
+        self.assertNotIn(job.job_id, client.job_sends)
+
+    def test_server_client_partial_metrics(self):
+        """
+        Tests if metrics sent while a polling command runs are merged into its Timer on the server
+        """
+        client = EdgeNetClient(self.server_url)
+        client.run(run_forever=False)
+
+        function_name = "poll_with_partial_metrics"
+
+        @client.uses_sender
+        @uses_timer
+        def poll_with_partial_metrics(timer, sender):
+            timer.aggregate = True
+            for i in range(6):
+                with timer.looped_section("looped"):
+                    time.sleep(0.01)
+                if i % 2: sender.send_metrics(timer, partial=True)
+            timer.end_function()
+            sender.send_metrics(timer)
+
+        client.register_function(function_name, poll_with_partial_metrics)
+        client.register_function(f"{function_name}_in_process", poll_with_partial_metrics, mode=EXECUTION_PROCESS)
+
+        self.server.sleep(0.1)
+
+        for name in (function_name, f"{function_name}_in_process"):
+            job = self.server.send_command_external(
+                client.session_id, name, is_polling=True
+            )
+
+            self.server.sleep(0.5)
+
+            job.wait_until_finished(timeout=1)
+            job.wait_for_metrics(timeout=1)
+
+            _timer = [*job.metrics.values()][0]
+            self.assertEqual(job.partial_metrics, {})
+            self.assertEqual(len(_timer.looped_sections["looped"]), 6)
+            self.assertGreaterEqual(_timer.looped_sections["looped"].min, 0.01)
+            self.assertIsInstance(_timer.function_ended, datetime.datetime)
+
+            # Each delta covers two iterations
+            self.assertLess(job.get_throughput("looped"), 2 / 0.02)
+
+    def test_server_client_large_metrics(self):
+        """
+        Tests if metrics too large to decode on the server's loop are decoded in a worker thread
+        """
+        client = EdgeNetClient(self.server_url)
+        client.run(run_forever=False)
+
+        function_name = "many_looped_sections"
+
+        @client.uses_sender
+        @uses_timer
+        def many_looped_sections(timer, sender):
+            for _ in range(20000):
+                timer.start_looped_section("looped")
+                timer.end_looped_section("looped")
+            timer.end_function()
+            sender.send_metrics(timer)
+
+        client.register_function(function_name, many_looped_sections)
+
+        self.server.sleep(0.1)
+
+        with patch("edgenet.message.EdgeNetMessage.create_from_frame", wraps=EdgeNetMessage.create_from_frame) as decode:
+            job = self.server.send_command_external(
+                client.session_id, function_name, is_polling=True
+            )
+            self.server.sleep(0.5)
+            job.wait_until_finished(timeout=1)
+            job.wait_for_metrics(timeout=1)
+
+        # Only the METRICS frame is large enough for a worker thread
+        decoded_in_thread = [c for c in decode.call_args_list if len(c.args[0]) >= DECODE_IN_THREAD_THRESHOLD_IN_BYTES]
+        self.assertEqual(len(decoded_in_thread), 1)
+
+        _timer = [*job.metrics.values()][0]
+        self.assertEqual(len(_timer.looped_sections["looped"]), 20000)
+
+    def test_server_client_command_polling_batched(self):
+        """
+        Tests if batched results are unpacked into individual results and callbacks
+        """
+        client = EdgeNetClient(self.server_url, batch_results=True, result_batch_size=4)
+        client.run(run_forever=False)
+
+        function_name = "poll_many_times"
+        times = 10
+
+        @client.uses_sender
+        def poll_many_times(sender):
+            for i in range(times):
+                sender.send_result(i)
+
+        client.register_function(function_name, poll_many_times)
+
+        self.server.sleep(0.1)
+
+        callback = Mock()
+
+        with patch.object(client, "send", wraps=client.send) as send:
+            job = self.server.send_command_external(
+                client.session_id, function_name, is_polling=True,
+                callback=callback
+            )
+
+            self.server.sleep(0.5)
+
+            # Check frames sent: 2 full batches, 1 partial batch, and FINISH
+            msg_types = [c.args[0].msg_type for c in send.call_args_list]
+            self.assertEqual(msg_types, [MSG_RESULT_BATCH] * 3 + [MSG_FINISH])
+
+        # Check if results are complete and in order
+        self.assertEqual(job.raw_results, list(range(times)))
+        callback.assert_has_calls([call(result) for result in job.results])
+        job.wait_until_finished(timeout=1)
+
+    def test_server_client_command_polling_batch_interval(self):
+        """
+        Tests if a partial batch of results is flushed after the flush interval
+        """
+        client = EdgeNetClient(
+            self.server_url, batch_results=True,
+            result_batch_size=100, result_flush_interval=0.05
+        )
+        client.run(run_forever=False)
+
+        function_name = "poll_then_sleep"
+        received = threading.Event()
+
+        @client.uses_sender
+        def poll_then_sleep(sender):
+            sender.send_result(0)
+            received.wait(timeout=1) # Stay alive until the batch arrives
+
+        client.register_function(function_name, poll_then_sleep)
+
+        self.server.sleep(0.1)
+
+        job = self.server.send_command_external(
+            client.session_id, function_name, is_polling=True,
+            callback=lambda _: received.set()
+        )
+
+        self.server.sleep(0.3)
+
+        self.assertTrue(received.is_set())
+        self.assertEqual(job.raw_results, [0])
+
+    def test_server_client_executor_stats(self):
+        """
+        Tests if the client's executor metrics are reported with FINISH messages
+        """
+        client = EdgeNetClient(self.server_url)
+        client.run(run_forever=False)
+
+        function_name = "sleep_for"
+        def sleep_for(i):
+            time.sleep(0.1)
+            return i*2
+
+        client.register_function(function_name, sleep_for, max_concurrency=1)
+
+        self.server.sleep(0.1)
+
+        jobs = [
+            self.server.send_command_external(
+                client.session_id, function_name, i, is_polling=False
+            ) for i in range(3)
+        ]
+
+        self.server.sleep(0.5)
+
+        for i, job in enumerate(jobs):
+            job.wait_until_finished(timeout=1)
+            self.assertIn(i*2, job.raw_results)
+
+        stats = self.server.sessions[client.session_id].executor_stats
+        self.assertIsNotNone(stats)
+        self.assertGreaterEqual(stats["completed"], 2)
+        self.assertGreaterEqual(stats["peak_queued"], 2)
+
     def test_server_client_metrics(self):
         """
         Tests asynchronous polling commands called to client (with args and kwargs)
@@ -495,9 +1058,9 @@ class TestNetwork(unittest.TestCase):
         for result in expected_results:
             self.assertIn(result, job.raw_results)
 
-        # Check if threads have closed
-        for thread in client.job_threads[job.job_id]:
-            self.assertFalse(thread.is_alive())
+        # Queued sends are released once the job has waited on them
+        job.wait_until_finished()
+        self.assertNotIn(job.job_id, client.job_sends)
 
         # Get metrics object
         _timer = [*job.metrics][0] # Get call ID
@@ -540,6 +1103,452 @@ class TestMessage(unittest.TestCase):
         self.assertEqual(message.msg_type, msg_type)
 
 
+class TestCodec(unittest.TestCase):
+    def test_codec_round_trip(self):
+        """
+        Tests if messages survive encoding and decoding with every available codec.
+        """
+        message = EdgeNetMessage.create_result_message(
+            "abcdef", "ghijkl", {"plate": "ABC1234", "lat": 14.649, "confidence": 87}
+        )
+
+        for name, codec in AVAILABLE_CODECS.items():
+            frame = message.encode(codec)
+            self.assertIsInstance(frame, bytes if codec.is_binary else str)
+
+            decoded = EdgeNetMessage.create_from_frame(frame, codec)
+            self.assertEqual(decoded.to_dict(), message.to_dict())
+
+    def test_codec_negotiation(self):
+        """
+        Tests if codec negotiation picks the first mutually supported codec.
+        """
+        self.assertIs(negotiate_codec([CODEC_JSON], WIRE_CODECS), JSONCodec)
+        self.assertIs(negotiate_codec(["unknown", CODEC_JSON], WIRE_CODECS), JSONCodec)
+        self.assertIs(negotiate_codec(["unknown"], WIRE_CODECS), JSONCodec)
+        self.assertIs(negotiate_codec(WIRE_CODECS, [CODEC_JSON]), JSONCodec)
+        self.assertRaises(EdgeNetCodecException, get_codec, "unknown")
+
+    def test_codec_text_frames_are_json(self):
+        """
+        Tests if text frames are decoded as JSON regardless of the negotiated codec.
+        """
+        raw_json = '{"session_id": "abcdef", "msg_type": "CONNECTION"}'
+        for codec in AVAILABLE_CODECS.values():
+            message = EdgeNetMessage.create_from_frame(raw_json, codec)
+            self.assertEqual(message.session_id, "abcdef")
+
+
+class TestCompression(unittest.TestCase):
+    def create_pair(self, threshold):
+        # An encoder and the decoder of its peer, with context takeover
+        compression = EdgeNetCompression(threshold=threshold)
+        encoder = ThresholdPerMessageDeflate(
+            False, False, compression.window_bits, compression.window_bits,
+            compression.compress_settings, threshold=threshold
+        )
+        decoder = ThresholdPerMessageDeflate(
+            False, False, compression.window_bits, compression.window_bits, threshold=threshold
+        )
+        return encoder, decoder
+
+    def test_threshold(self):
+        """
+        Tests if only frames at or above the threshold are compressed.
+        """
+        from websockets.frames import Frame, OP_TEXT
+
+        encoder, decoder = self.create_pair(threshold=64)
+        payloads = [b"x" * 63, b"y" * 64, b"x" * 10, b"y" * 1000]
+
+        for payload in payloads:
+            frame   = Frame(OP_TEXT, payload)
+            encoded = encoder.encode(frame)
+
+            self.assertEqual(encoded.rsv1, len(payload) >= 64)
+            self.assertEqual(decoder.decode(encoded).data, payload)
+
+        self.assertEqual(encoder.stats["frames_skipped"], 2)
+        self.assertEqual(encoder.stats["frames_compressed"], 2)
+        self.assertEqual(encoder.stats["bytes_in"], 1064)
+        self.assertLess(encoder.stats["bytes_out"], encoder.stats["bytes_in"])
+
+    def test_invalid_settings(self):
+        """
+        Tests if out-of-range settings are rejected.
+        """
+        with self.assertRaises(EdgeNetCompressionException):
+            EdgeNetCompression(window_bits=16)
+        with self.assertRaises(EdgeNetCompressionException):
+            EdgeNetCompression(level=10)
+
+        self.assertEqual(EdgeNetCompression(enabled=False).client_kwargs(), {"compression": None})
+
+
+class TestAttachment(unittest.TestCase):
+    def test_attachment_round_trip(self):
+        """
+        Tests if ndarray attachments survive encoding and decoding with every available codec.
+        """
+        array = np.arange(24*94*3, dtype=np.uint8).reshape((24, 94, 3))
+        message = EdgeNetMessage.create_result_message(
+            "abcdef", "ghijkl", {"confidence": 87}, attachments={"cropped_frame": array}
+        )
+
+        for name, codec in AVAILABLE_CODECS.items():
+            decoded = EdgeNetMessage.create_from_frame(message.encode(codec), codec)
+            attachment = decoded.attachments["cropped_frame"]
+
+            self.assertIsInstance(attachment, EdgeNetAttachment)
+            self.assertEqual(decoded.result, {"confidence": 87})
+            np.testing.assert_array_equal(attachment.to_ndarray(), array)
+            self.assertEqual(attachment.to_ndarray().dtype, np.uint8)
+
+    def test_attachment_zero_copy(self):
+        """
+        Tests if raw attachments are wrapped without copying their buffer.
+        """
+        array = np.ones((24, 94, 3), dtype=np.float32)
+        attachment = EdgeNetAttachment.create_from_ndarray(array)
+
+        wrapped = attachment.to_ndarray()
+        self.assertFalse(wrapped.flags.owndata)
+        self.assertFalse(wrapped.flags.writeable)
+        self.assertEqual(wrapped.shape, array.shape)
+
+    def test_attachment_unknown_encoding(self):
+        """
+        Tests for an exception when an unknown attachment encoding is used.
+        """
+        array = np.ones((24, 94, 3), dtype=np.uint8)
+        self.assertRaises(
+            EdgeNetAttachmentException, EdgeNetAttachment.create_from_ndarray,
+            array, encoding="unknown"
+        )
+
+    def test_result_message_without_attachments(self):
+        """
+        Tests if results without attachments keep the legacy message format.
+        """
+        message = EdgeNetMessage.create_result_message("abcdef", "ghijkl", 1)
+        self.assertNotIn("attachments", message.to_dict())
+
+
+class TestExecutor(unittest.TestCase):
+    def run_calls(self, executor, function_name, func, args_list):
+        async def run_all():
+            return await asyncio.gather(*[
+                executor.run(function_name, func, *args) for args in args_list
+            ])
+
+        loop = asyncio.new_event_loop()
+        results = loop.run_until_complete(run_all())
+        loop.close()
+        return results
+
+    def test_executor_concurrency_limit(self):
+        """
+        Tests if a function's concurrency limit is respected.
+        """
+        executor = EdgeNetExecutor(max_workers=4)
+        executor.configure("sleep_for", max_concurrency=2)
+
+        lock = threading.Lock()
+        concurrent = [0, 0] # Current, peak
+
+        def sleep_for(i):
+            with lock:
+                concurrent[0] += 1
+                concurrent[1] = max(concurrent)
+            time.sleep(0.05)
+            with lock:
+                concurrent[0] -= 1
+            return i*2
+
+        results = self.run_calls(executor, "sleep_for", sleep_for, [[i] for i in range(6)])
+
+        self.assertEqual(results, [i*2 for i in range(6)])
+        self.assertEqual(concurrent[1], 2)
+
+        # Check queue-depth metrics
+        stats = executor.stats
+        self.assertEqual(stats["queued"], 0)
+        self.assertEqual(stats["running"], 0)
+        self.assertEqual(stats["completed"], 6)
+        self.assertGreaterEqual(stats["peak_queued"], 4)
+
+        executor.shutdown()
+
+    def test_executor_process_mode(self):
+        """
+        Tests if functions can be executed in a worker process.
+        """
+        executor = EdgeNetExecutor(max_workers=1, max_processes=2)
+        executor.configure("pow", mode=EXECUTION_PROCESS)
+
+        results = self.run_calls(executor, "pow", pow, [[2, i] for i in range(4)])
+
+        self.assertEqual(results, [2**i for i in range(4)])
+        self.assertEqual(executor.stats["completed"], 4)
+
+        executor.shutdown()
+
+    def test_executor_call_in_process(self):
+        """
+        Tests if a worker process' results are relayed to the given sender.
+        """
+        sender = Mock()
+
+        def poll_pids(sender, times):
+            for i in range(times):
+                sender.send_result((i, os.getpid()))
+            return "done"
+
+        result = call_in_process(poll_pids, sender, 3)
+
+        self.assertEqual(result, "done")
+        self.assertEqual(sender.send_result.call_count, 3)
+        for i, _call in enumerate(sender.send_result.call_args_list):
+            index, pid = _call.args[0]
+            self.assertEqual(index, i)
+            self.assertNotEqual(pid, os.getpid())
+
+    def test_executor_call_in_process_exception(self):
+        """
+        Tests for an exception when the function fails in the worker process.
+        """
+        def fail(sender):
+            raise ValueError("Failed!")
+
+        self.assertRaises(EdgeNetExecutorException, call_in_process, fail, Mock())
+
+    def test_executor_call_in_process_exit(self):
+        """
+        Tests for an exception when the worker process exits without returning.
+        """
+        sender = Mock()
+
+        def crash(sender):
+            sender.send_result("partial")
+            os._exit(1)
+
+        self.assertRaises(EdgeNetExecutorException, call_in_process, crash, sender)
+        self.assertEqual(sender.send_result.call_count, 1)
+
+    def test_executor_invalid_configuration(self):
+        """
+        Tests for an exception when a function is configured incorrectly.
+        """
+        executor = EdgeNetExecutor()
+        self.assertRaises(EdgeNetExecutorException, executor.configure, "f", mode="unknown")
+        self.assertRaises(EdgeNetExecutorException, executor.configure, "f", max_concurrency=0)
+        executor.shutdown()
+
+
+class TestJob(unittest.TestCase):
+    def test_job_wait_until_finished(self):
+        """
+        Tests if waiting threads are released once the job is finished.
+        """
+        job = EdgeNetJob("abcdef", "my_function")
+        self.assertFalse(job.finished)
+
+        threading.Timer(0.05, job.finish_job).start()
+        job.wait_until_finished(timeout=1)
+
+        self.assertTrue(job.finished)
+
+    def test_job_fail_job(self):
+        """
+        Tests if waiting on a failed job raises its error, and failing a finished job does not.
+        """
+        job = EdgeNetJob("abcdef", "my_function")
+        job.fail_job("Traceback: ValueError")
+
+        self.assertTrue(job.finished)
+        self.assertTrue(job.failed)
+        self.assertRaisesRegex(EdgeNetJobException, "ValueError", job.wait_until_finished, timeout=1)
+
+        job = EdgeNetJob("abcdef", "my_function")
+        job.finish_job()
+        job.fail_job("Traceback: ValueError")
+        job.wait_until_finished(timeout=1)
+        self.assertFalse(job.failed)
+
+    def test_job_wait_until_finished_timeout(self):
+        """
+        Tests for an exception when a job does not finish in time.
+        """
+        job = EdgeNetJob("abcdef", "my_function")
+
+        self.assertRaises(EdgeNetJobException, job.wait_until_finished, timeout=0.05)
+
+    def test_job_wait_for_metrics(self):
+        """
+        Tests if waiting threads are released once enough metrics are registered.
+        """
+        job = EdgeNetJob("abcdef", "my_function")
+        timers = [Timer("my_function"), Timer("my_function")]
+
+        for i, timer in enumerate(timers):
+            threading.Timer(0.05 * (i+1), job.register_metrics, args=[timer]).start()
+        job.wait_for_metrics(number_of_metrics=2, timeout=1)
+
+        self.assertEqual(len(job.metrics), 2)
+        self.assertRaises(
+            EdgeNetJobException, job.wait_for_metrics, number_of_metrics=3, timeout=0.05
+        )
+
+    def test_job_partial_metrics(self):
+        """
+        Tests if metric deltas are merged apart until the delta of the ended function arrives.
+        """
+        job = EdgeNetJob("abcdef", "my_function")
+        timer = Timer("my_function")
+        for _ in range(3):
+            with timer.looped_section("1"): pass
+
+        job.register_metrics(timer.create_delta(), delta=True)
+        self.assertEqual(len(job.partial_metrics[timer.call_id].looped_sections["1"]), 3)
+        self.assertGreater(job.get_throughput("1"), 0.0)
+        self.assertRaises(
+            EdgeNetJobException, job.wait_for_metrics, number_of_metrics=1, timeout=0.05
+        )
+
+        for _ in range(2):
+            with timer.looped_section("1"): pass
+        timer.end_function()
+        job.register_metrics(timer.create_delta(), delta=True)
+        job.wait_for_metrics(number_of_metrics=1, timeout=1)
+
+        self.assertEqual(job.partial_metrics, {})
+        self.assertEqual(len(job.metrics[timer.call_id].looped_sections["1"]), 5)
+        self.assertEqual(job.metrics[timer.call_id].function_ended, timer.function_ended)
+
+    def test_job_awaitable(self):
+        """
+        Tests if a job can be awaited from an event loop.
+        """
+        job = EdgeNetJob("abcdef", "my_function")
+
+        async def wait_for_job():
+            return await asyncio.wait_for(job, timeout=1)
+
+        threading.Timer(0.05, job.finish_job).start()
+
+        loop = asyncio.new_event_loop()
+        self.assertIs(loop.run_until_complete(wait_for_job()), job)
+        loop.close()
+
+    def test_job_group_progress(self):
+        """
+        Tests if a job group tracks the progress of its jobs.
+        """
+        jobs = { f"session_{i}": EdgeNetJob(f"job_{i}", "my_function") for i in range(3) }
+        group = EdgeNetJobGroup("my_function", jobs)
+
+        self.assertEqual(len(group), 3)
+        self.assertEqual(group.progress, (0, 3))
+
+        jobs["session_1"].finish_job()
+        self.assertEqual(group.progress, (1, 3))
+        self.assertFalse(group.finished)
+
+        # Timeout applies to the whole group
+        self.assertRaises(EdgeNetJobException, group.wait_until_finished, timeout=0.05)
+
+        for i, job in enumerate([jobs["session_2"], jobs["session_0"]]):
+            threading.Timer(0.05 * (i+1), job.finish_job).start()
+
+        order = [job.job_id for job in group.as_completed(timeout=1)]
+        self.assertEqual(order, ["job_1", "job_2", "job_0"])
+        self.assertTrue(group.finished)
+
+    def test_job_group_awaitable(self):
+        """
+        Tests if a job group can be awaited from an event loop.
+        """
+        jobs = { f"session_{i}": EdgeNetJob(f"job_{i}", "my_function") for i in range(2) }
+        group = EdgeNetJobGroup("my_function", jobs)
+
+        for job in group:
+            threading.Timer(0.05, job.finish_job).start()
+
+        loop = asyncio.new_event_loop()
+        finished = loop.run_until_complete(asyncio.wait_for(group, timeout=1))
+        loop.close()
+
+        self.assertEqual(finished, list(jobs.values()))
+
+
+class TestResultBatch(unittest.TestCase):
+    def test_result_batch_round_trip(self):
+        """
+        Tests if batched results survive encoding and decoding with every available codec.
+        """
+        results = [
+            EdgeNetMessage.create_result_message("abcdef", "ghijkl", i)
+            for i in range(3)
+        ]
+        results.append(EdgeNetMessage.create_result_message(
+            "abcdef", "ghijkl", 3, attachments={"array": np.ones((2, 2), dtype=np.uint8)}
+        ))
+        batch = EdgeNetMessage.create_result_batch_message("abcdef", "ghijkl", results)
+
+        # Shared fields are not repeated per result
+        for result_dict in batch.to_dict()["results"]:
+            for field in BATCH_SHARED_FIELDS:
+                self.assertNotIn(field, result_dict)
+
+        for codec in AVAILABLE_CODECS.values():
+            decoded = EdgeNetMessage.create_from_frame(batch.encode(codec), codec)
+
+            self.assertEqual(decoded.msg_type, MSG_RESULT_BATCH)
+            self.assertEqual([m.result for m in decoded.results], [0, 1, 2, 3])
+            for m in decoded.results:
+                self.assertEqual(m.msg_type, MSG_RESULT)
+                self.assertEqual(m.session_id, "abcdef")
+                self.assertEqual(m.job_id, "ghijkl")
+            np.testing.assert_array_equal(
+                decoded.results[3].attachments["array"].to_ndarray(), np.ones((2, 2))
+            )
+
+
+class TestClock(unittest.TestCase):
+    def test_clock_offset(self):
+        """
+        Tests if the offset is taken from the sample with the shortest round trip.
+        """
+        clock = EdgeNetClock(window=3)
+        self.assertFalse(clock.synchronized)
+        self.assertRaises(EdgeNetClockException, lambda: clock.offset)
+
+        # The client is 100 seconds ahead, with symmetric delays of 10 ms
+        clock.register_sample(0.0, 100.01, 100.02, 0.03)
+        self.assertAlmostEqual(clock.offset, 100.0)
+        self.assertAlmostEqual(clock.round_trip_time, 0.02)
+
+        # A slower, asymmetric exchange is ignored
+        clock.register_sample(1.0, 101.5, 101.51, 1.52)
+        self.assertAlmostEqual(clock.offset, 100.0)
+
+        # Until it is pushed out of the window
+        clock.register_sample(2.0, 102.5, 102.51, 2.52)
+        clock.register_sample(3.0, 103.5, 103.51, 3.52)
+        self.assertAlmostEqual(clock.offset, 100.245)
+
+    def test_job_result_to_server_time(self):
+        """
+        Tests if edge datetimes of results are corrected with their clock offset.
+        """
+        job_result = EdgeNetJobResult("abcdef", {}, "2021-02-14T16:00:01", "2021-02-14T08:00:02", clock_offset=8 * 3600)
+        self.assertEqual(job_result.corrected_sent_dttm, datetime.datetime(2021, 2, 14, 8, 0, 1))
+        self.assertAlmostEqual(job_result.latency, 1.0)
+
+        job_result.clock_offset = None
+        self.assertEqual(job_result.to_server_time("2021-02-14T16:00:01"), datetime.datetime(2021, 2, 14, 16, 0, 1))
+
+
 class TestSession(unittest.TestCase):
     def test_session_create_from_handshake(self):
         """
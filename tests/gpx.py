@@ -1,10 +1,13 @@
 import unittest
-import datetime
+import datetime, os, tempfile, time
+import numpy as np
 from freezegun import freeze_time
 from unittest.mock import patch
 from dateutil import parser as dttm_parser
 from gpx import parser, uses_gpx
-from gpx.wrappers import GPXCollection, GPXEntry, GPXException
+from gpx.wrappers import GPXCollection, GPXEntry, GPXTrack, GPXException
+from gpx.constants import *
+from gpx.live import LiveGPXCollection, parse_nmea_datetime
 
 
 class TestGPX(unittest.TestCase):
@@ -167,3 +170,250 @@ class TestGPX(unittest.TestCase):
         # Check if results are correct
         for i, latlng in enumerate(first_five_latlng):
             self.assertEqual(result[i], latlng)
+
+    @freeze_time("2022-02-10T00:00:00Z")
+    def test_get_latest_latlngs(self):
+        gpx_collection = parser.parse_gpx_and_sync_now(
+            self.gpx_file_path
+        )
+
+        # Bulk lookup should match one-by-one lookups
+        test_times = [
+            dttm_parser.parse(f"2022-02-10T00:00:0{i}.5Z").replace(tzinfo=None)
+            for i in [9, 0, 3, 4]
+        ]
+        latlngs = gpx_collection.get_latest_latlngs(test_times)
+
+        self.assertEqual(latlngs.shape, (4, 2))
+        for test_time, latlng in zip(test_times, latlngs):
+            self.assertEqual(tuple(latlng), gpx_collection.get_latest_entry(test_time).latlng)
+
+        # Any time too early should fail the whole lookup
+        test_times.append(dttm_parser.parse("2022-02-09T00:00:05Z").replace(tzinfo=None))
+        self.assertRaises(
+            GPXException, gpx_collection.get_latest_latlngs, test_times
+        )
+
+    def test_get_latest_entry_unordered(self):
+        track = GPXTrack.create_from_points([
+            (self.dttms[0] + datetime.timedelta(seconds=i), i, i, None, None)
+            for i in [2, 0, 1]
+        ])
+        gpx_collection = GPXCollection("unordered.gpx", self.dttms[0], track=track)
+
+        # Points are sorted by time in the track
+        entry = gpx_collection.get_latest_entry(self.dttms[0] + datetime.timedelta(seconds=1.5))
+        self.assertEqual(entry.latlng, (1, 1))
+        self.assertEqual([e.lat for e in gpx_collection.entries], [0, 1, 2])
+
+    @freeze_time("2022-02-10T00:00:00Z")
+    def test_get_interpolated_latlngs(self):
+        gpx_collection = parser.parse_gpx_and_sync_now(
+            self.gpx_file_path
+        )
+        entries = gpx_collection.entries
+
+        # Halfway between 00:03 and 00:04 is the midpoint of their lat/lngs
+        test_time = dttm_parser.parse("2022-02-10T00:00:03.5Z").replace(tzinfo=None)
+        expected = (np.array(entries[3].latlng) + np.array(entries[4].latlng)) / 2
+
+        entry = gpx_collection.get_interpolated_entry(test_time)
+        np.testing.assert_allclose(entry.latlng, expected)
+        self.assertAlmostEqual(entry.ele, (entries[3].ele + entries[4].ele) / 2)
+        self.assertEqual(entry.dttm, test_time)
+
+        # Exact and out-of-range times
+        test_times = [
+            dttm_parser.parse(t).replace(tzinfo=None)
+            for t in ["2022-02-10T00:00:03.5Z", "2022-02-10T00:00:05Z", "2022-02-10T00:01:00Z"]
+        ]
+        latlngs = gpx_collection.get_interpolated_latlngs(test_times)
+        np.testing.assert_allclose(latlngs[0], expected)
+        np.testing.assert_allclose(latlngs[1], entries[5].latlng)
+        np.testing.assert_allclose(latlngs[2], entries[-1].latlng)
+
+        test_times.append(dttm_parser.parse("2022-02-09T00:00:05Z").replace(tzinfo=None))
+        self.assertRaises(
+            GPXException, gpx_collection.get_interpolated_latlngs, test_times
+        )
+
+    @freeze_time("2022-02-10T00:00:00Z")
+    def test_get_interpolated_latlngs_speed(self):
+        gpx_collection = parser.parse_gpx_and_sync_now(
+            self.gpx_file_path
+        )
+        entries = gpx_collection.entries
+
+        # Accelerating from 0 m/s at 00:01, only a quarter of the way is
+        # covered halfway through the segment
+        test_time = dttm_parser.parse("2022-02-10T00:00:01.5Z").replace(tzinfo=None)
+        start, end = np.array(entries[1].latlng), np.array(entries[2].latlng)
+
+        latlng = gpx_collection.get_interpolated_latlngs([test_time], mode=INTERPOLATE_SPEED)[0]
+        np.testing.assert_allclose(latlng, start + (end - start) * 0.25)
+
+        entry = gpx_collection.get_interpolated_entry(test_time, mode=INTERPOLATE_SPEED)
+        self.assertAlmostEqual(entry.speed, entries[2].speed / 2)
+
+        # Standing still falls back to linear interpolation
+        test_time = dttm_parser.parse("2022-02-10T00:00:00.5Z").replace(tzinfo=None)
+        np.testing.assert_allclose(
+            gpx_collection.get_interpolated_latlngs([test_time], mode=INTERPOLATE_SPEED),
+            gpx_collection.get_interpolated_latlngs([test_time])
+        )
+
+    def test_parse_gpx_cache(self):
+        parser.clear_gpx_cache()
+
+        with patch.object(parser, "read_track", wraps=parser.read_track) as read_track:
+            first  = parser.parse_gpx(self.gpx_file_path)
+            second = parser.parse_gpx_and_sync_now(self.gpx_file_path)
+
+            # The file is only parsed once, and its track is shared
+            self.assertEqual(read_track.call_count, 1)
+            self.assertIs(first.track, second.track)
+
+            # Modifying the file invalidates the cache
+            stat = os.stat(self.gpx_file_path)
+            os.utime(self.gpx_file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+            try:
+                third = parser.parse_gpx(self.gpx_file_path)
+            finally:
+                os.utime(self.gpx_file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+            self.assertEqual(read_track.call_count, 2)
+            self.assertIsNot(first.track, third.track)
+
+    def test_sync_offset(self):
+        first  = parser.parse_gpx(self.gpx_file_path)
+        second = parser.parse_gpx(self.gpx_file_path)
+
+        base_time = datetime.datetime(2022, 2, 10)
+        second.sync(base_time)
+
+        # Syncing one collection does not move the other's entries
+        self.assertEqual(first.entries[0].dttm, self.dttms[0])
+        self.assertEqual(second.entries[0].dttm, base_time)
+        self.assertEqual(second.entries[9].dttm, base_time + datetime.timedelta(seconds=9))
+        self.assertEqual(second.start_time, base_time)
+
+        entry = second.get_latest_entry(base_time + datetime.timedelta(seconds=4.5))
+        self.assertEqual(entry.latlng, self.latlngs[4])
+
+    def test_read_track_gpx_1_1(self):
+        gpx_file_contents = """<?xml version="1.0" encoding="UTF-8"?>
+<gpx version="1.1" xmlns="http://www.topografix.com/GPX/1/1"
+ xmlns:gpxtpx="http://www.garmin.com/xmlschemas/TrackPointExtension/v2">
+<metadata><time>2020-09-24T00:00:00Z</time></metadata>
+<trk>
+<trkseg>
+<trkpt lat="14.5" lon="121.0"><time>2020-09-24T12:09:25.5+08:00</time>
+  <extensions><gpxtpx:TrackPointExtension><gpxtpx:speed>3.5</gpxtpx:speed></gpxtpx:TrackPointExtension></extensions>
+</trkpt>
+</trkseg>
+<trkseg>
+<trkpt lat="14.6" lon="121.1"><ele>10</ele><time>2020-09-24T12:09:26+08:00</time></trkpt>
+</trkseg>
+</trk>
+<trk><trkseg><trkpt lat="0" lon="0"><time>2020-09-24T12:09:27Z</time></trkpt></trkseg></trk>
+</gpx>"""
+        with tempfile.NamedTemporaryFile("w", suffix=".gpx", delete=False) as gpx_file:
+            gpx_file.write(gpx_file_contents)
+        try:
+            gpx_collection = parser.parse_gpx(gpx_file.name, use_cache=False)
+        finally:
+            os.remove(gpx_file.name)
+
+        # All segments of the first track only, with times as logged
+        entries = list(gpx_collection.entries)
+        self.assertEqual(len(entries), 2)
+        self.assertEqual(entries[0].dttm, datetime.datetime(2020, 9, 24, 12, 9, 25, 500000))
+        self.assertEqual(entries[0].latlng, (14.5, 121.0))
+        self.assertEqual(entries[0].speed, 3.5)
+        self.assertIsNone(entries[0].ele)
+        self.assertEqual(entries[1].ele, 10)
+        self.assertIsNone(entries[1].speed)
+
+
+class TestLiveGPX(unittest.TestCase):
+    def setUp(self):
+        self.base_time = datetime.datetime(2020, 9, 24, 4, 9, 25)
+        self.sentences = [
+            "$GPGGA,040925.00,1438.94289,N,12104.13548,E,1,08,1.0,63.9,M,0.0,M,,*6E",
+            "$GPRMC,040925.00,A,1438.94289,N,12104.13548,E,10.0,0.0,240920,,,A*65",
+        ]
+
+    def test_ring_buffer(self):
+        gpx_collection = LiveGPXCollection(capacity=5, offset=datetime.timedelta(0))
+
+        snapshot = None
+        for i in range(12):
+            gpx_collection.append(self.base_time + datetime.timedelta(seconds=i), i, i)
+            if i == 6: snapshot = gpx_collection.track
+
+        # Only the latest fixes are kept, and memory stays bounded
+        self.assertEqual(len(gpx_collection.entries), 5)
+        self.assertEqual([e.lat for e in gpx_collection.entries], [7, 8, 9, 10, 11])
+        self.assertLessEqual(len(gpx_collection.buffer.times), 10)
+
+        # Snapshots taken before are not modified by later fixes
+        self.assertEqual(list(snapshot.latlngs[:, 0]), [2, 3, 4, 5, 6])
+
+        # Same lookups as a GPXCollection from a file
+        entry = gpx_collection.get_latest_entry(self.base_time + datetime.timedelta(seconds=9.5))
+        self.assertEqual(entry.latlng, (9, 9))
+        self.assertEqual(gpx_collection.get_latest_entry().latlng, (11, 11))
+        self.assertRaises(
+            GPXException, gpx_collection.get_latest_entry, self.base_time + datetime.timedelta(seconds=6)
+        )
+
+        # Fixes older than the latest one are dropped
+        self.assertFalse(gpx_collection.append(self.base_time, 0, 0))
+
+    def test_feed_nmea(self):
+        gpx_collection = LiveGPXCollection(offset=datetime.timedelta(hours=8))
+
+        self.assertFalse(gpx_collection.feed_line(self.sentences[0]))
+        self.assertTrue(gpx_collection.feed_line(self.sentences[1]))
+
+        # Bad checksums, void fixes and other sentences are ignored
+        self.assertFalse(gpx_collection.feed_line(self.sentences[1].replace("*65", "*00")))
+        self.assertFalse(gpx_collection.feed_line("$GPRMC,040926.00,V,,,,,,,240920,,,N*79"))
+        self.assertFalse(gpx_collection.feed_line("$GPGSV,1,1,00*79"))
+
+        # UTC times are shifted by the offset
+        entry = gpx_collection.get_latest_entry()
+        self.assertEqual(entry.dttm, self.base_time + datetime.timedelta(hours=8))
+        self.assertEqual(gpx_collection.start_time, entry.dttm)
+        self.assertAlmostEqual(entry.lat, 14 + 38.94289 / 60)
+        self.assertAlmostEqual(entry.lng, 121 + 4.13548 / 60)
+        self.assertEqual(entry.ele, 63.9)
+        self.assertAlmostEqual(entry.speed, 5.14444)
+
+    def test_parse_nmea_datetime(self):
+        self.assertEqual(parse_nmea_datetime("230394", "123519"), datetime.datetime(1994, 3, 23, 12, 35, 19))
+        self.assertEqual(parse_nmea_datetime("240920", "040925.50"), datetime.datetime(2020, 9, 24, 4, 9, 25, 500000))
+
+        # Two-digit years pivot at NMEA_CENTURY_PIVOT
+        self.assertEqual(parse_nmea_datetime("010179", "000000").year, 2079)
+        self.assertEqual(parse_nmea_datetime("010180", "000000").year, 1980)
+
+    def test_feed_from_file(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".nmea", delete=False) as nmea_file:
+            nmea_file.write(self.sentences[0] + "\n")
+        try:
+            gpx_collection = LiveGPXCollection.create_from_file(
+                nmea_file.name, from_start=True, offset=datetime.timedelta(0)
+            )
+            with open(nmea_file.name, "a") as nmea_file_appended:
+                nmea_file_appended.write(self.sentences[1] + "\n")
+
+            for _ in range(50):
+                if len(gpx_collection.entries): break
+                time.sleep(0.02)
+            gpx_collection.stop()
+        finally:
+            os.remove(nmea_file.name)
+
+        self.assertEqual(gpx_collection.get_latest_entry().dttm, self.base_time)
+        self.assertEqual(gpx_collection.get_latest_entry().ele, 63.9)
@@ -1,7 +1,14 @@
 from datetime import datetime
 import unittest
 import time
-from metrics.time import TimerException, uses_timer
+import threading
+import pickle
+import csv, os, tempfile
+import numpy as np
+from metrics.time import Timer, TimerException, LoopedTimerSections, AggregatedTimerSections, uses_timer, parse_isoformat
+from metrics.experiment import Experiment, SUMMARY_STATISTICS
+from metrics.constants import LOOPED_SECTIONS_INITIAL_CAPACITY, CSV_FORMAT_SECTIONS, CSV_FORMAT_SUMMARIES
+from edgenet.job import EdgeNetJob
 
 
 class TestMetrics(unittest.TestCase):
@@ -156,4 +163,267 @@ class TestMetrics(unittest.TestCase):
             return timer
 
         self.assertRaises(TimerException, sleeper)
-        
\ No newline at end of file
+
+    def test_working_context_managers(self):
+        """
+        Tests if sections can be timed with context managers.
+        """
+        @uses_timer
+        def sleeper(timer):
+            with timer.section("1"):
+                time.sleep(0.002)
+            for _ in range(3):
+                with timer.looped_section("2"):
+                    time.sleep(0.002)
+            timer.end_function()
+            return timer
+
+        timer = sleeper()
+
+        self.assertGreater(timer.sections["1"].elapsed, 0.0)
+        self.assertEqual(len(timer.looped_sections["2"]), 3)
+        self.assertTrue(all(timer.looped_sections["2"].elapsed > 0.0))
+
+    def test_looped_sections_growth(self):
+        """
+        Tests if looped sections keep every iteration beyond their initial capacity.
+        """
+        timer = Timer("my_function")
+        number = 3 * LOOPED_SECTIONS_INITIAL_CAPACITY + 1
+        for _ in range(number):
+            timer.start_looped_section("1")
+            timer.end_looped_section("1")
+        timer.end_function()
+
+        section_list = timer.looped_sections["1"]
+        self.assertEqual(len(section_list), number)
+        self.assertEqual(len(section_list.elapsed), number)
+        self.assertGreaterEqual(section_list[-1].start, section_list[0].end)
+        self.assertAlmostEqual(section_list[5].elapsed, section_list.elapsed[5])
+
+    def test_timer_dict_round_trip(self):
+        """
+        Tests if a Timer survives to_dict and create_from_dict, including older looped section dicts.
+        """
+        timer = Timer("my_function")
+        with timer.section("1"): pass
+        for _ in range(3):
+            with timer.looped_section("2"): pass
+        timer.end_function()
+
+        timer_dict = timer.to_dict()
+        copy = Timer.create_from_dict(timer_dict)
+
+        self.assertEqual(copy.call_id, timer.call_id)
+        self.assertEqual(copy.function_started, timer.function_started)
+        self.assertEqual(copy.sections["1"].elapsed, timer.sections["1"].elapsed)
+        self.assertEqual(list(copy.looped_sections["2"].elapsed), list(timer.looped_sections["2"].elapsed))
+
+        # Looped sections used to be sent as lists of TimerSection dicts
+        timer_dict["looped_sections"]["2"] = [
+            {"start": s.start, "end": s.end} for s in timer.looped_sections["2"]
+        ]
+        legacy_copy = Timer.create_from_dict(timer_dict)
+        self.assertIsInstance(legacy_copy.looped_sections["2"], LoopedTimerSections)
+        for legacy, section in zip(legacy_copy.looped_sections["2"], timer.looped_sections["2"]):
+            self.assertAlmostEqual(legacy.elapsed, section.elapsed, places=6)
+
+    def test_aggregated_looped_sections(self):
+        """
+        Tests if aggregated looped sections keep statistics and percentiles within 1%.
+        """
+        elapsed = np.random.default_rng(0).lognormal(mean=15, sigma=1, size=10000).astype(np.int64)
+        section_list = AggregatedTimerSections()
+        for elapsed_ns in elapsed.tolist():
+            section_list.record(elapsed_ns)
+
+        self.assertEqual(len(section_list), len(elapsed))
+        self.assertAlmostEqual(section_list.mean, elapsed.mean() / 1e9)
+        self.assertEqual(section_list.min, elapsed.min() / 1e9)
+        self.assertEqual(section_list.max, elapsed.max() / 1e9)
+        for q in (50, 90, 99, 100):
+            expected = np.percentile(elapsed, q, method="inverted_cdf") / 1e9
+            self.assertAlmostEqual(section_list.percentile(q), expected, delta=0.01 * expected)
+
+    def test_aggregated_timer(self):
+        """
+        Tests if an aggregated Timer sends summaries whose size does not grow with iterations.
+        """
+        def run(iterations):
+            timer = Timer("my_function", aggregate=True)
+            for _ in range(iterations):
+                with timer.looped_section("1"): pass
+            timer.end_function()
+            return timer
+
+        short_timer, long_timer = run(10), run(10000)
+        self.assertIsInstance(long_timer.looped_sections["1"], AggregatedTimerSections)
+        self.assertEqual(len(long_timer.looped_sections["1"]), 10000)
+        self.assertLess(
+            len(str(long_timer.to_dict())), 2 * len(str(short_timer.to_dict()))
+        )
+
+        copy = Timer.create_from_dict(long_timer.to_dict())
+        self.assertTrue(copy.aggregate)
+        self.assertEqual(copy.looped_sections["1"].summary(), long_timer.looped_sections["1"].summary())
+
+        # Summaries of several calls can be merged
+        merged = AggregatedTimerSections().merge(short_timer.looped_sections["1"]).merge(copy.looped_sections["1"])
+        self.assertEqual(len(merged), 10010)
+        self.assertEqual(merged.max, max(short_timer.looped_sections["1"].max, copy.looped_sections["1"].max))
+
+    def test_experiment_csv_summaries(self):
+        """
+        Tests if aggregated looped sections are written with their count to their own CSV, apart from iterations.
+        """
+        job = EdgeNetJob("abcdef", "my_function")
+        for aggregate in (False, True):
+            timer = Timer("my_function", aggregate=aggregate)
+            for _ in range(3):
+                with timer.looped_section("1"): pass
+            timer.end_function()
+            job.register_metrics(timer)
+
+        experiment = Experiment("edge_only")
+        experiment.jobs.append(job)
+        experiment.end_experiment()
+
+        with tempfile.TemporaryDirectory() as results_location:
+            experiment.to_csv(results_location + os.sep)
+            with open(os.path.join(results_location, experiment.experiment_id + CSV_FORMAT_SECTIONS)) as fp:
+                sections = list(csv.reader(fp))
+            with open(os.path.join(results_location, experiment.experiment_id + CSV_FORMAT_SUMMARIES)) as fp:
+                summaries = list(csv.reader(fp))
+
+        # Iterations of the plain Timer only
+        self.assertEqual([row[3] for row in sections if row[2] == "1"], ["0", "1", "2"])
+
+        self.assertEqual(len(summaries), 1)
+        self.assertEqual(len(summaries[0]), 3 + len(SUMMARY_STATISTICS))
+        self.assertEqual(summaries[0][2:4], ["1", "3"])
+
+    def test_partial_metrics(self):
+        """
+        Tests if a running Timer can be serialized, and flush_due fires once per interval.
+        """
+        timer = Timer("my_function", aggregate=True, flush_interval=0.05)
+        self.assertFalse(timer.flush_due())
+        with timer.looped_section("1"): pass
+
+        time.sleep(0.06)
+        self.assertTrue(timer.flush_due())
+        self.assertFalse(timer.flush_due())
+
+        copy = Timer.create_from_dict(timer.to_dict())
+        self.assertIsNone(copy.function_ended)
+        self.assertEqual(len(copy.looped_sections["1"]), 1)
+
+    def test_timer_deltas(self):
+        """
+        Tests if merging the deltas of a Timer gives the same Timer, for both kinds of looped sections.
+        """
+        for aggregate in (False, True):
+            timer  = Timer("my_function", aggregate=aggregate)
+            merged = Timer("my_function", timer.call_id, aggregate=aggregate)
+            deltas = []
+
+            with timer.section("1"): pass
+            for i in range(10):
+                timer.start_looped_section("2")
+                # The running iteration is left for the next delta
+                if i % 3 == 0: deltas.append(timer.create_delta())
+                timer.end_looped_section("2")
+            timer.end_function()
+            deltas.append(timer.create_delta())
+
+            self.assertEqual(sum("1" in delta.sections for delta in deltas), 1)
+            for delta in deltas:
+                merged.merge(Timer.create_from_dict(delta.to_dict()))
+
+            self.assertEqual(merged.function_ended, timer.function_ended)
+            self.assertEqual(merged.sections["1"].elapsed, timer.sections["1"].elapsed)
+            if aggregate:
+                self.assertEqual(merged.looped_sections["2"].summary(), timer.looped_sections["2"].summary())
+            else:
+                self.assertEqual(list(merged.looped_sections["2"].elapsed), list(timer.looped_sections["2"].elapsed))
+
+    def test_parse_isoformat(self):
+        """
+        Tests if Timer datetimes are parsed natively, with a fallback for other formats.
+        """
+        dttm = datetime(2021, 2, 14, 8, 30, 15, 123456)
+        self.assertEqual(parse_isoformat(dttm.isoformat()), dttm)
+        self.assertEqual(parse_isoformat("14 Feb 2021 08:30:15.123456"), dttm)
+
+    def test_record_looped_section_from_threads(self):
+        """
+        Tests if iterations timed in several threads are all recorded, along with counters.
+        """
+        for aggregate in (False, True):
+            timer = Timer("my_function", aggregate=aggregate)
+
+            def work():
+                for _ in range(1000):
+                    start = time.perf_counter_ns()
+                    timer.record_looped_section("1", start, time.perf_counter_ns())
+
+            threads = [threading.Thread(target=work) for _ in range(4)]
+            for thread in threads: thread.start()
+            for thread in threads: thread.join()
+            timer.counters["dropped"] = 3
+            timer.end_function()
+
+            copy = Timer.create_from_dict(timer.to_dict())
+            self.assertEqual(len(copy.looped_sections["1"]), 4000)
+            self.assertEqual(copy.counters, {"dropped": 3})
+
+    def test_timer_deltas_while_recording(self):
+        """
+        Tests if deltas and dicts can be made of a Timer while other threads record new looped sections.
+        """
+        for aggregate in (False, True):
+            timer  = Timer("my_function", aggregate=aggregate)
+            merged = Timer("my_function", timer.call_id, aggregate=aggregate)
+            errors = []
+
+            def work(worker):
+                try:
+                    for i in range(5000):
+                        start = time.perf_counter_ns()
+                        timer.record_looped_section(f"{worker}-{i}", start, time.perf_counter_ns())
+                except Exception as e:
+                    errors.append(e)
+
+            threads = [threading.Thread(target=work, args=(worker,)) for worker in range(2)]
+            for thread in threads: thread.start()
+            while any(thread.is_alive() for thread in threads):
+                merged.merge(timer.create_delta())
+                timer.to_dict()
+            for thread in threads: thread.join()
+            merged.merge(timer.create_delta())
+
+            self.assertEqual(errors, [])
+            self.assertEqual(sum(len(section_list) for section_list in merged.looped_sections.values()), 10000)
+
+    def test_timer_pickle(self):
+        """
+        Tests if Timers can be pickled, e.g. to be relayed from worker processes, and recorded into afterwards.
+        """
+        timer = Timer("my_function")
+        timer.record_looped_section("1", 0, 10)
+        copy = pickle.loads(pickle.dumps(timer))
+        copy.record_looped_section("1", 10, 30)
+        self.assertEqual(len(copy.looped_sections["1"]), 2)
+        self.assertNotIn("lock", copy.to_dict())
+
+    def test_record_looped_section_iterations(self):
+        """
+        Tests if several iterations timed together split their time evenly, e.g. the plates of a batch.
+        """
+        timer = Timer("my_function")
+        timer.record_looped_section("1", 1000, 1010, iterations=3)
+        section_list = timer.looped_sections["1"]
+
+        self.assertEqual(len(section_list), 3)
+        self.assertEqual(section_list.starts[:3].tolist(), [1000, 1003, 1006])
+        self.assertEqual(section_list.ends[:3].tolist(), [1003, 1006, 1010])
@@ -0,0 +1,124 @@
+import unittest
+import numpy as np
+from pipelines.experiments.recognition import PlateRecognizer, CHARS, SEQUENCE_LENGTH
+
+
+class StubRecognitionInterpreter:
+    """
+    Stands in for a TFLite recognition interpreter. Its output for each crop of
+    the batch is the character whose index is the crop's value, so crops of the
+    same value are recognized as the same plate. Like TFLite, allocate_tensors()
+    replaces the tensors, and tensor() views of the previous ones stop working.
+    """
+    def __init__(self, shape=(1, 24, 94, 3)):
+        self.input_shape = list(shape)
+        self.generation  = 0
+        self.resizes     = []
+        self.invocations = 0
+        self.allocate_tensors()
+
+    def get_input_details(self):
+        return [{ "index": 0, "shape": np.array(self.input_shape) }]
+
+    def get_output_details(self):
+        return [{ "index": 1 }]
+
+    def resize_tensor_input(self, index, shape):
+        self.resizes.append(list(shape))
+        self.input_shape = list(shape)
+
+    def allocate_tensors(self):
+        self.generation += 1
+        self.input  = np.zeros(self.input_shape, dtype=np.float32)
+        self.output = np.zeros((self.input_shape[0], SEQUENCE_LENGTH, len(CHARS) + 1), dtype=np.float32)
+
+    def tensor(self, index):
+        assert index == 0
+        generation = self.generation
+        def view():
+            if generation != self.generation:
+                raise RuntimeError("Tensor view used after allocate_tensors()")
+            return self.input
+        return view
+
+    def invoke(self):
+        # Every row of the batch, filled this time or left from earlier ones
+        self.invocations += 1
+        self.output[:] = 0
+        self.output[:, :, -1] = 1 # Blanks
+        for row, sample in enumerate(self.input):
+            self.output[row, 0, -1] = 0
+            self.output[row, 0, int(round(sample.mean() * 256))] = 1
+
+    def get_tensor(self, index):
+        assert index == 1
+        return self.output.copy()
+
+
+def create_crops(values):
+    # Crops of about the size that detection boxes cut out of 1080p frames
+    return [np.full((60, 200, 3), value, dtype=np.uint8) for value in values]
+
+
+class TestRecognition(unittest.TestCase):
+    def test_recognize_batch(self):
+        """
+        Tests if the crops of a batch are recognized in order, in one invocation.
+        """
+        interpreter = StubRecognitionInterpreter()
+        recognizer = PlateRecognizer(interpreter)
+
+        self.assertEqual(recognizer.recognize(create_crops([0])), [CHARS[0]])
+        self.assertEqual(recognizer.recognize([]), [])
+        self.assertEqual(interpreter.invocations, 1)
+
+    def test_recognize_capacity_growth(self):
+        """
+        Tests if the input grows in powers of two as batches of 1, 3 and 5 crops come, through fresh tensor views.
+        """
+        interpreter = StubRecognitionInterpreter()
+        recognizer = PlateRecognizer(interpreter)
+
+        for values in ([1], [2, 3, 4], [5, 6, 7, 8, 9]):
+            self.assertEqual(recognizer.recognize(create_crops(values)), [CHARS[value] for value in values])
+
+        self.assertEqual([shape[0] for shape in interpreter.resizes], [1, 4, 8])
+        self.assertEqual(recognizer.capacity, 8)
+        self.assertEqual(recognizer.stats, { "batches": 3, "crops": 9, "reallocations": 2, "allocations": 0 })
+
+        # Smaller batches reuse the tensors
+        recognizer.recognize(create_crops([10, 11]))
+        self.assertEqual(len(interpreter.resizes), 3)
+
+    def test_recognize_stale_rows(self):
+        """
+        Tests if rows of the input left from larger batches never make it into results.
+        """
+        interpreter = StubRecognitionInterpreter()
+        recognizer = PlateRecognizer(interpreter)
+
+        recognizer.recognize(create_crops([1, 2, 3, 4, 5]))
+        self.assertEqual(recognizer.recognize(create_crops([6, 7])), [CHARS[6], CHARS[7]])
+        self.assertEqual(recognizer.recognize(create_crops([8])), [CHARS[8]])
+
+        # The stale rows were still run through the interpreter
+        self.assertEqual(interpreter.output.shape[0], 8)
+        self.assertEqual(interpreter.output[2, 0].argmax(), 3)
+
+    def test_recognize_fallback_allocations(self):
+        """
+        Tests if float and 4-channel crops are still recognized, through a new array counted as an allocation.
+        """
+        interpreter = StubRecognitionInterpreter()
+        recognizer = PlateRecognizer(interpreter)
+
+        recognizer.recognize(create_crops([9, 9]))
+        crops = [
+            create_crops([3])[0].astype(np.float32),
+            np.full((60, 200, 4), 5, dtype=np.uint8),
+            create_crops([7])[0],
+        ]
+
+        # No row is left from the batch before
+        self.assertEqual(recognizer.recognize(crops), [CHARS[3], CHARS[5], CHARS[7]])
+        self.assertEqual(recognizer.stats["allocations"], 2)